@@ -0,0 +1,156 @@
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, exists, insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.models import AreaRestrita, AreaAcessoRole, AcessoConcedido
+
+# --- Matriz de acesso role → áreas ---
+# As permissões ficam normalizadas em areas_acesso_roles; a matriz em memória responde
+# "a role X pode entrar na área A?" em O(1). É invalidada pelas rotas que criam, editam ou
+# excluem áreas e recarregada a cada ACCESS_MATRIX_TTL segundos (mudanças em outros workers).
+ACCESS_MATRIX_TTL = float(os.getenv("ACCESS_MATRIX_TTL", "30"))
+
+_areas_por_role: Optional[Dict[str, FrozenSet[int]]] = None
+_roles_por_area: Dict[int, FrozenSet[str]] = {}
+_carregada_em = 0.0
+_lock = asyncio.Lock()
+
+
+def parse_roles(acesso_liberado_para: str) -> List[str]:
+    """Converte "administrador, gerente" em ["administrador", "gerente"] sem repetições."""
+    roles = []
+    for role in acesso_liberado_para.split(","):
+        role = role.strip()
+        if role and role not in roles:
+            roles.append(role)
+    return roles
+
+
+async def definir_roles_area(db: AsyncSession, area_id: int, roles: Iterable[str]):
+    """Substitui as roles com acesso à área. Não faz commit."""
+    await db.execute(delete(AreaAcessoRole).filter(AreaAcessoRole.area_id == area_id))
+    valores = [{"area_id": area_id, "role": role} for role in roles]
+    if valores:
+        await db.execute(insert(AreaAcessoRole), valores)
+
+
+def invalidar_matriz_acesso():
+    global _areas_por_role
+    _areas_por_role = None
+
+
+async def _carregar_matriz(db: AsyncSession):
+    global _areas_por_role, _roles_por_area, _carregada_em
+    async with _lock:
+        if _areas_por_role is not None and time.monotonic() - _carregada_em < ACCESS_MATRIX_TTL:
+            return
+        areas_por_role: Dict[str, set] = {}
+        roles_por_area: Dict[int, set] = {}
+        for area_id, role in (await db.execute(select(AreaAcessoRole.area_id, AreaAcessoRole.role))).all():
+            areas_por_role.setdefault(role, set()).add(area_id)
+            roles_por_area.setdefault(area_id, set()).add(role)
+        _areas_por_role = {role: frozenset(ids) for role, ids in areas_por_role.items()}
+        _roles_por_area = {area_id: frozenset(roles) for area_id, roles in roles_por_area.items()}
+        _carregada_em = time.monotonic()
+
+
+async def _garantir_matriz(db: AsyncSession):
+    if _areas_por_role is None or time.monotonic() - _carregada_em >= ACCESS_MATRIX_TTL:
+        await _carregar_matriz(db)
+
+
+async def role_tem_acesso(db: AsyncSession, role: str, area_id: int) -> bool:
+    await _garantir_matriz(db)
+    return area_id in _areas_por_role.get(role, frozenset())
+
+
+async def roles_da_area(db: AsyncSession, area_id: int) -> FrozenSet[str]:
+    await _garantir_matriz(db)
+    return _roles_por_area.get(area_id, frozenset())
+
+
+def filtro_acesso_role(role: str):
+    """Expressão SQL verdadeira para as áreas que `role` pode acessar."""
+    return exists().where(AreaAcessoRole.area_id == AreaRestrita.id, AreaAcessoRole.role == role)
+
+
+# --- Acessos concedidos por usuário (solicitações aprovadas) ---
+# A verificação "o usuário U tem acesso aprovado à área A?" consulta o índice único
+# (usuario_id, area_id) uma vez e guarda a resposta (inclusive negativa) num cache com TTL,
+# para que verificações repetidas (ex: catracas) não toquem no banco.
+GRANT_CACHE_TTL = float(os.getenv("GRANT_CACHE_TTL", "30"))
+GRANT_CACHE_MAX_SIZE = int(os.getenv("GRANT_CACHE_MAX_SIZE", "100000"))
+
+_SEM_ACESSO = False
+_SEM_EXPIRACAO = "sem_expiracao"
+grant_cache = TTLCache(maxsize=GRANT_CACHE_MAX_SIZE, ttl=GRANT_CACHE_TTL)
+
+
+async def conceder_acessos(
+    db: AsyncSession,
+    concessoes: Iterable[Tuple[int, int, Optional[int]]],
+    concedido_por: str,
+    expira_em: Optional[datetime] = None
+):
+    """
+    Cria ou renova acessos a partir de tuplas (usuario_id, area_id, solicitacao_id), com uma
+    única consulta para os acessos já existentes. Não faz commit; chame invalidar_concessao depois.
+    """
+    por_chave = {(usuario_id, area_id): solicitacao_id for usuario_id, area_id, solicitacao_id in concessoes}
+    if not por_chave:
+        return
+    existentes = (await db.execute(select(AcessoConcedido).filter(
+        AcessoConcedido.usuario_id.in_({usuario_id for usuario_id, _ in por_chave}),
+        AcessoConcedido.area_id.in_({area_id for _, area_id in por_chave})
+    ))).scalars().all()
+    existentes = {(acesso.usuario_id, acesso.area_id): acesso for acesso in existentes}
+    agora = datetime.now()
+    for (usuario_id, area_id), solicitacao_id in por_chave.items():
+        acesso = existentes.get((usuario_id, area_id))
+        if acesso is None:
+            acesso = AcessoConcedido(usuario_id=usuario_id, area_id=area_id)
+            db.add(acesso)
+        acesso.solicitacao_id = solicitacao_id
+        acesso.concedido_por = concedido_por
+        acesso.concedido_em = agora
+        acesso.expira_em = expira_em
+
+
+def invalidar_concessao(usuario_id: int, area_id: int):
+    grant_cache.invalidate((usuario_id, area_id))
+
+
+async def usuario_tem_concessao(db: AsyncSession, usuario_id: int, area_id: int) -> bool:
+    chave = (usuario_id, area_id)
+    expira_em = grant_cache.get(chave)
+    if expira_em is None:
+        row = (await db.execute(select(AcessoConcedido.expira_em).filter(
+            AcessoConcedido.usuario_id == usuario_id,
+            AcessoConcedido.area_id == area_id
+        ))).first()
+        expira_em = _SEM_ACESSO if row is None else (row.expira_em or _SEM_EXPIRACAO)
+        grant_cache.set(chave, expira_em)
+    if expira_em is _SEM_ACESSO:
+        return False
+    return expira_em == _SEM_EXPIRACAO or expira_em > datetime.now()
+
+
+async def usuario_pode_entrar(db: AsyncSession, usuario_id: int, role: str, area_id: int) -> bool:
+    """Acesso pela role (matriz) ou por uma solicitação aprovada e não expirada."""
+    return await role_tem_acesso(db, role, area_id) or await usuario_tem_concessao(db, usuario_id, area_id)
+
+
+def filtro_acesso_usuario(usuario_id: int, role: str):
+    """Expressão SQL verdadeira para as áreas que o usuário pode acessar (role ou concessão vigente)."""
+    concessao = exists().where(
+        AcessoConcedido.area_id == AreaRestrita.id,
+        AcessoConcedido.usuario_id == usuario_id,
+        or_(AcessoConcedido.expira_em.is_(None), AcessoConcedido.expira_em > datetime.now())
+    )
+    return or_(filtro_acesso_role(role), concessao)
@@ -0,0 +1,46 @@
+import sys
+import json
+import argparse
+from datetime import date, datetime
+
+from app.database import SessionLocal, create_db_and_tables
+from app.archiver import ALERTAS_RETENCAO_MESES, arquivar, consulta_partes, corte_retencao, ler_arquivados, proximo_mes
+
+# Move para arquivos .ndjson.gz os alertas mais antigos que a retenção (ver app/archiver.py).
+# Ex: python -m app.archive_alerts                  (mantém os últimos ALERTAS_RETENCAO_MESES meses)
+#     python -m app.archive_alerts --listar
+#     python -m app.archive_alerts --ler 2024-01 > alertas-2024-01.ndjson
+
+def _ler_mes(db, mes: str):
+    inicio = datetime.strptime(mes, "%Y-%m")
+    fim = proximo_mes(inicio)
+    partes = db.execute(consulta_partes(inicio, fim)).scalars().all()
+    for bloco in ler_arquivados(partes, inicio, fim):
+        for registro in bloco:
+            sys.stdout.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Retenção de alertas: arquiva os meses antigos em NDJSON comprimido.")
+    parser.add_argument("--meses", type=int, default=ALERTAS_RETENCAO_MESES, help="Meses completos mantidos na tabela, além do atual")
+    parser.add_argument("--listar", action="store_true", help="Lista os arquivos existentes e sai")
+    parser.add_argument("--ler", metavar="AAAA-MM", help="Escreve no stdout, em NDJSON, os alertas arquivados do mês")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    db = SessionLocal()
+    try:
+        if args.ler:
+            _ler_mes(db, args.ler)
+            return
+        if args.listar:
+            for parte in db.execute(consulta_partes(concluidas=False)).scalars():
+                print(f"{parte.mes} parte {parte.parte}: {parte.linhas} alertas, {parte.tamanho_bytes / 2 ** 20:.1f} MB, {parte.status} ({parte.caminho})")
+            return
+        corte = corte_retencao(date.today(), args.meses)
+        resultados = arquivar(db, corte)
+        print(json.dumps({"arquivados_antes_de": corte.date().isoformat(), "arquivos": resultados}, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import gzip
+import json
+import hashlib
+from array import array
+from datetime import date, datetime
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Alert, ArquivoAlertas
+
+# --- Retenção e arquivamento de alertas ---
+# A tabela alerts guarda só o mês atual e os ALERTAS_RETENCAO_MESES meses anteriores. O job
+# (python -m app.archive_alerts) grava cada mês mais antigo num arquivo NDJSON comprimido com
+# gzip em ALERTAS_ARQUIVO_DIR, registra o arquivo em alertas_arquivos e só então remove as
+# linhas de alerts, em lotes. Se o job parar no meio, a próxima execução termina a remoção a
+# partir dos ids gravados no arquivo. Os meses arquivados continuam consultáveis: a exportação
+# de alertas (/exportar/alertas) lê os arquivos do período antes da tabela. Os rollups dos
+# relatórios não são alterados, então as séries temporais continuam incluindo esses meses
+# (e app/rebuild_rollups.py também conta os alertas arquivados).
+ALERTAS_ARQUIVO_DIR = os.getenv("ALERTAS_ARQUIVO_DIR", "arquivo/alertas")
+ALERTAS_RETENCAO_MESES = int(os.getenv("ALERTAS_RETENCAO_MESES", "6"))
+ARQUIVO_LOTE = 5000
+CAMPOS_ARQUIVO = ["id", "titulo", "descricao", "nivel", "criado_por", "data_criacao", "ocorrencias", "ultima_ocorrencia"]
+
+
+def serializar(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def inicio_mes(momento: datetime) -> datetime:
+    return datetime(momento.year, momento.month, 1)
+
+
+def proximo_mes(momento: datetime) -> datetime:
+    return datetime(momento.year + momento.month // 12, momento.month % 12 + 1, 1)
+
+
+def corte_retencao(hoje: date, meses: int = ALERTAS_RETENCAO_MESES) -> datetime:
+    """Primeiro dia do mês mais antigo mantido em alerts; tudo antes dele é arquivado."""
+    total = hoje.year * 12 + (hoje.month - 1) - meses
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def caminho_absoluto(parte: ArquivoAlertas) -> str:
+    return os.path.join(ALERTAS_ARQUIVO_DIR, parte.caminho)
+
+
+def _sha256(caminho: str) -> str:
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _remover_de_alerts(db: Session, ids: Iterable[int]):
+    ids = list(ids)
+    for i in range(0, len(ids), ARQUIVO_LOTE):
+        db.execute(
+            delete(Alert).where(Alert.id.in_(ids[i:i + ARQUIVO_LOTE])).execution_options(synchronize_session=False)
+        )
+        db.commit()  # lotes curtos: não segura locks na tabela quente durante o mês inteiro
+
+
+def _resumo(parte: ArquivoAlertas) -> dict:
+    return {
+        "mes": parte.mes, "parte": parte.parte, "caminho": parte.caminho, "linhas": parte.linhas,
+        "tamanho_bytes": parte.tamanho_bytes, "sha256": parte.sha256, "status": parte.status,
+    }
+
+
+def ler_registros(parte: ArquivoAlertas) -> Iterator[dict]:
+    with gzip.open(caminho_absoluto(parte), "rt", encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def concluir_remocao(db: Session, parte: ArquivoAlertas) -> dict:
+    """Retira de alerts as linhas de uma parte já gravada em disco (execução anterior interrompida)."""
+    _remover_de_alerts(db, (registro["id"] for registro in ler_registros(parte)))
+    parte.status = "concluido"
+    db.commit()
+    return _resumo(parte)
+
+
+def arquivar_mes(db: Session, inicio: datetime) -> Optional[dict]:
+    """Move para um arquivo .ndjson.gz os alertas do mês que começa em `inicio`. None se o mês estiver vazio."""
+    fim = proximo_mes(inicio)
+    mes = f"{inicio:%Y-%m}"
+    numero = (db.execute(select(func.max(ArquivoAlertas.parte)).filter(ArquivoAlertas.mes == mes)).scalar() or 0) + 1
+    relativo = os.path.join(f"{inicio:%Y}", f"alertas-{mes}-p{numero}.ndjson.gz")
+    caminho = os.path.join(ALERTAS_ARQUIVO_DIR, relativo)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    query = (
+        select(*[getattr(Alert, campo) for campo in CAMPOS_ARQUIVO])
+        .filter(Alert.data_criacao >= inicio, Alert.data_criacao < fim)
+        .order_by(Alert.data_criacao, Alert.id)
+        .execution_options(yield_per=ARQUIVO_LOTE)
+    )
+    ids = array("q")
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as bruto:
+        with gzip.GzipFile(fileobj=bruto, mode="wb", compresslevel=6, mtime=0) as arquivo:
+            for particao in db.execute(query).partitions():
+                linhas = []
+                for row in particao:
+                    ids.append(row.id)
+                    linhas.append(json.dumps(dict(zip(CAMPOS_ARQUIVO, map(serializar, row))), ensure_ascii=False))
+                arquivo.write(("\n".join(linhas) + "\n").encode("utf-8"))
+        bruto.flush()
+        os.fsync(bruto.fileno())
+    if not ids:
+        os.remove(temporario)
+        return None
+    os.replace(temporario, caminho)  # o arquivo só aparece com o nome final depois de completo
+
+    parte = ArquivoAlertas(
+        mes=mes, parte=numero, caminho=relativo, linhas=len(ids), primeiro_id=min(ids), ultimo_id=max(ids),
+        tamanho_bytes=os.path.getsize(caminho), sha256=_sha256(caminho), status="removendo"
+    )
+    db.add(parte)
+    db.commit()
+    _remover_de_alerts(db, ids)
+    parte.status = "concluido"
+    db.commit()
+    return _resumo(parte)
+
+
+def arquivar(db: Session, corte: datetime) -> List[dict]:
+    """Arquiva, mês a mês, todos os alertas anteriores a `corte` (ver corte_retencao)."""
+    resultados = [
+        concluir_remocao(db, parte)
+        for parte in db.execute(select(ArquivoAlertas).filter(ArquivoAlertas.status == "removendo")).scalars().all()
+    ]
+    mais_antigo = db.execute(select(func.min(Alert.data_criacao)).filter(Alert.data_criacao < corte)).scalar()
+    mes = inicio_mes(mais_antigo) if mais_antigo else corte
+    while mes < corte:
+        resultado = arquivar_mes(db, mes)
+        if resultado:
+            resultados.append(resultado)
+        mes = proximo_mes(mes)
+    return resultados
+
+
+def consulta_partes(inicio: Optional[datetime] = None, fim: Optional[datetime] = None, concluidas: bool = True):
+    """
+    Select das partes arquivadas que podem ter alertas em [inicio, fim), da mais antiga para a mais nova.
+    Por padrão só as concluídas: numa parte "removendo" as linhas ainda podem estar também em alerts,
+    e quem lê os alertas as contaria duas vezes. As listagens de arquivos usam concluidas=False.
+    """
+    query = select(ArquivoAlertas).order_by(ArquivoAlertas.mes, ArquivoAlertas.parte)
+    if concluidas:
+        query = query.filter(ArquivoAlertas.status == "concluido")
+    if inicio:
+        query = query.filter(ArquivoAlertas.mes >= f"{inicio:%Y-%m}")
+    if fim:
+        query = query.filter(ArquivoAlertas.mes < f"{proximo_mes(fim):%Y-%m}")
+    return query
+
+
+def ler_arquivados(partes: List[ArquivoAlertas], inicio: Optional[datetime] = None, fim: Optional[datetime] = None) -> Iterator[List[dict]]:
+    """
+    Lê os alertas arquivados das partes, filtrando por data_criacao em [inicio, fim), em blocos de
+    ARQUIVO_LOTE registros (para quem consome rodar cada bloco fora do event loop).
+    """
+    # As datas ficam no arquivo em ISO 8601, que ordena como texto
+    de = inicio.isoformat() if inicio else None
+    ate = fim.isoformat() if fim else None
+    bloco = []
+    for parte in partes:
+        for registro in ler_registros(parte):
+            data = registro.get("data_criacao") or ""
+            if (de and data < de) or (ate and data >= ate):
+                continue
+            bloco.append(registro)
+            if len(bloco) >= ARQUIVO_LOTE:
+                yield bloco
+                bloco = []
+    if bloco:
+        yield bloco
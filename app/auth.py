@@ -1,17 +1,282 @@
-from sqlalchemy.orm import Session
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal, get_user_by_email_async
+from app.metrics import bcrypt_verificacao, registrar_login
 from app.models import User
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# --- Pool de hashing (bcrypt fora do event loop) ---
+# O bcrypt consome dezenas a centenas de ms de CPU; por isso o hash e a verificação
+# das rotas rodam num pool limitado, com limite de fila e back-pressure (HTTP 503).
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "4"))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", "64"))
+HASH_POOL_RETRY_AFTER = int(os.getenv("HASH_POOL_RETRY_AFTER", "2"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0  # alterado apenas no event loop
+_hash_stats_lock = threading.Lock()
+_hash_stats = {"tarefas": 0, "rejeitadas": 0, "espera_total_s": 0.0, "espera_max_s": 0.0}
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def login_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if user and verify_password(password, user.hashed_password):
+
+async def _run_in_hash_pool(func, *args, rejeitar: bool = True):
+    """
+    Executa `func` no pool de hashing, rejeitando com 503 quando a fila está cheia. Com
+    rejeitar=False (importações) a tarefa entra mesmo assim, mas conta na fila e nas métricas.
+    """
+    global _hash_pending
+    if rejeitar and _hash_pending >= HASH_POOL_MAX_PENDING:
+        with _hash_stats_lock:
+            _hash_stats["rejeitadas"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(HASH_POOL_RETRY_AFTER)}
+        )
+
+    enfileirado_em = time.perf_counter()
+
+    def tarefa():
+        espera = time.perf_counter() - enfileirado_em
+        with _hash_stats_lock:
+            _hash_stats["tarefas"] += 1
+            _hash_stats["espera_total_s"] += espera
+            _hash_stats["espera_max_s"] = max(_hash_stats["espera_max_s"], espera)
+        return func(*args)
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, tarefa)
+    finally:
+        _hash_pending -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    def verificar_medindo():
+        inicio = time.perf_counter()
+        valida = verify_password(plain_password, hashed_password)
+        return valida, time.perf_counter() - inicio
+
+    valida, duracao = await _run_in_hash_pool(verificar_medindo)
+    bcrypt_verificacao.observar(duracao)  # registrado no event loop, sem lock
+    return valida
+
+
+async def get_password_hashes_async(passwords) -> list:
+    """
+    Gera hashes em lote (importações) no mesmo pool, em blocos do tamanho do pool, para
+    paralelizar sem ocupar toda a fila usada pelas rotas de login. Os hashes contam na fila:
+    durante uma importação grande, o login recebe 503 quando a fila passa do limite.
+    """
+    hashes = []
+    for i in range(0, len(passwords), HASH_POOL_WORKERS):
+        bloco = passwords[i:i + HASH_POOL_WORKERS]
+        hashes.extend(await asyncio.gather(*(_run_in_hash_pool(get_password_hash, p, rejeitar=False) for p in bloco)))
+    return hashes
+
+
+def get_hash_pool_stats() -> dict:
+    """Métricas do pool de hashing: fila atual, rejeições e tempo de espera."""
+    with _hash_stats_lock:
+        tarefas = _hash_stats["tarefas"]
+        return {
+            "workers": HASH_POOL_WORKERS,
+            "fila_maxima": HASH_POOL_MAX_PENDING,
+            "pendentes": _hash_pending,
+            "tarefas": tarefas,
+            "rejeitadas": _hash_stats["rejeitadas"],
+            "espera_media_ms": (_hash_stats["espera_total_s"] / tarefas * 1000) if tarefas else 0.0,
+            "espera_max_ms": _hash_stats["espera_max_s"] * 1000,
+        }
+
+
+async def login_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email_async(email, db)
+    if user and await verify_password_async(password, user.hashed_password):
+        registrar_login(True)
         return user
+    registrar_login(False)
     return None
+
+
+# --- Token de sessão assinado (HMAC-SHA256) ---
+# O cookie de sessão carrega id, nome, role e o instante de emissão, assinados com
+# SESSION_SECRET, para que a autorização não precise consultar o MySQL a cada request.
+# Sem SESSION_SECRET a aplicação não sobe: quem conhecesse uma chave padrão poderia forjar uma
+# sessão de administrador. Com SESSION_SECRET_DEV=true (só desenvolvimento) cada processo gera
+# uma chave aleatória; as sessões não valem entre workers nem sobrevivem a um reinício.
+SESSION_COOKIE_NAME = "session"
+SESSION_SECRET_DEV = os.getenv("SESSION_SECRET_DEV", "false").lower() in ("1", "true", "sim")
+SESSION_SECRET = os.getenv("SESSION_SECRET", "") or (secrets.token_urlsafe(32) if SESSION_SECRET_DEV else "")
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(8 * 60 * 60)))
+USER_STATE_REFRESH_SECONDS = float(os.getenv("USER_STATE_REFRESH_SECONDS", "5"))
+
+
+@dataclass(frozen=True)
+class SessionUser:
+    """Usuário autenticado conforme o token de sessão (sem consulta ao banco)."""
+    id: int
+    full_name: str
+    role: str
+    issued_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def verificar_session_secret():
+    """Impede a inicialização sem uma chave de assinatura das sessões."""
+    if not SESSION_SECRET:
+        raise RuntimeError(
+            "SESSION_SECRET não definido: configure uma chave aleatória e secreta, igual em todos os workers "
+            "(ex.: python -c \"import secrets; print(secrets.token_urlsafe(32))\"), "
+            "ou use SESSION_SECRET_DEV=true apenas em desenvolvimento."
+        )
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SECRET.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def create_session_token(user: User) -> str:
+    payload = _b64encode(json.dumps(
+        {"id": user.id, "nome": user.full_name, "role": user.role, "iat": int(time.time())},
+        separators=(",", ":")
+    ).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_session_token(token: Optional[str]) -> Optional[SessionUser]:
+    """Valida assinatura e validade do token; retorna None se for inválido ou expirado."""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+        session_user = SessionUser(id=int(data["id"]), full_name=data["nome"], role=data["role"], issued_at=int(data["iat"]))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if time.time() - session_user.issued_at > SESSION_MAX_AGE:
+        return None
+    return session_user
+
+
+# --- Cache de estado dos usuários (revogação de sessões) ---
+# Guarda (is_active, role) por id. É atualizado na hora pelas rotas que alteram usuários
+# e recarregado do banco a cada USER_STATE_REFRESH_SECONDS, para que mudanças feitas em
+# outros workers também invalidem os tokens em poucos segundos. A recarga roda numa tarefa
+# em segundo plano do worker, então nenhuma requisição espera pela leitura da tabela users;
+# só a primeira, se chegar antes da carga inicial, ou um processo sem a tarefa, carregam na hora.
+# Cada alteração local recebe uma geração: a recarga não sobrescreve com a leitura do banco as
+# entradas alteradas depois que essa leitura começou (o valor local é o mais novo).
+_user_states: Dict[int, Tuple[bool, str]] = {}
+_user_states_loaded_at = 0.0
+_user_states_lock = asyncio.Lock()
+_user_states_tasks = set()
+_user_states_generation = 0
+_user_states_changed: Dict[int, int] = {}  # id -> geração da última alteração local
+
+
+def _mark_user_state_changed(user_id: int):
+    global _user_states_generation
+    _user_states_generation += 1
+    _user_states_changed[user_id] = _user_states_generation
+
+def set_user_state(user: User):
+    _user_states[user.id] = (bool(user.is_active), user.role)
+    _mark_user_state_changed(user.id)
+
+def forget_user_state(user_id: int):
+    _user_states.pop(user_id, None)
+    _mark_user_state_changed(user_id)
+
+
+async def _refresh_user_states(force: bool = False):
+    global _user_states, _user_states_loaded_at
+    async with _user_states_lock:
+        if not force and time.monotonic() - _user_states_loaded_at < USER_STATE_REFRESH_SECONDS:
+            return
+        generation = _user_states_generation
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(User.id, User.is_active, User.role))).all()
+        states = {row.id: (bool(row.is_active), row.role) for row in rows}
+        for user_id, changed in list(_user_states_changed.items()):
+            if changed <= generation:
+                del _user_states_changed[user_id]  # já refletida na leitura
+            elif user_id in _user_states:
+                states[user_id] = _user_states[user_id]
+            else:
+                states.pop(user_id, None)
+        _user_states = states
+        _user_states_loaded_at = time.monotonic()
+
+
+async def _user_state_refresher():
+    while True:
+        try:
+            await _refresh_user_states(force=True)
+        except Exception:
+            pass  # banco indisponível ou sem migrar: mantém o último estado e tenta de novo no próximo ciclo
+        await asyncio.sleep(USER_STATE_REFRESH_SECONDS)
+
+
+def start_user_state_refresh():
+    if not _user_states_tasks:
+        task = asyncio.get_running_loop().create_task(_user_state_refresher())
+        _user_states_tasks.add(task)
+        task.add_done_callback(_user_states_tasks.discard)
+
+
+def stop_user_state_refresh():
+    for task in list(_user_states_tasks):
+        task.cancel()
+
+
+async def is_session_valid(session_user: SessionUser) -> bool:
+    """Rejeita tokens de usuários desativados, excluídos ou com role alterada."""
+    if not _user_states_loaded_at or (
+        not _user_states_tasks and time.monotonic() - _user_states_loaded_at >= USER_STATE_REFRESH_SECONDS
+    ):
+        await _refresh_user_states()
+    state = _user_states.get(session_user.id)
+    return state is not None and state[0] and state[1] == session_user.role
+
+
+# --- Cache de objetos User autenticados ---
+# Evita buscar no MySQL, a cada página, a linha do usuário logado. As rotas que alteram
+# usuários invalidam a entrada explicitamente; o TTL limita a defasagem entre workers.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
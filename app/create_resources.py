@@ -1,21 +1,27 @@
 from app.database import get_db, create_db_and_tables
 from app.models import Resource
 
+# Recursos iniciais
+RECURSOS_INICIAIS = [
+    {"name": "Câmera de Segurança", "type": "equipamento", "description": "Câmera 8k para monitoramento", "quantity": 10},
+    {"name": "Veículo de Patrulha", "type": "veículo", "description": "Veículo utilitário para ronda", "quantity": 3},
+    {"name": "Detector de Incêndio", "type": "dispositivo", "description": "Sensor de fumaça e calor", "quantity": 15},
+]
+
+def criar_recursos_iniciais(db):
+    """Insere os recursos iniciais se ainda não houver nenhum recurso (não faz commit). Retorna quantos inseriu."""
+    # Checa se já tem recursos para não duplicar
+    if db.query(Resource.id).first():
+        return 0
+    db.add_all([Resource(**dados, is_active=True) for dados in RECURSOS_INICIAIS])
+    return len(RECURSOS_INICIAIS)
+
 def main():
     create_db_and_tables()  # garante que as tabelas estejam criadas
 
     db = next(get_db())  # pega a sessão do banco
 
-    # Recursos iniciais
-    recursos_iniciais = [
-        Resource(name="Câmera de Segurança", type="equipamento", description="Câmera 8k para monitoramento", quantity=10, is_active=True),
-        Resource(name="Veículo de Patrulha", type="veículo", description="Veículo utilitário para ronda", quantity=3, is_active=True),
-        Resource(name="Detector de Incêndio", type="dispositivo", description="Sensor de fumaça e calor", quantity=15, is_active=True),
-    ]
-
-    # Checa se já tem recursos para não duplicar
-    if db.query(Resource).count() == 0:
-        db.add_all(recursos_iniciais)
+    if criar_recursos_iniciais(db):
         db.commit()
         print("Recursos criados com sucesso!")
     else:
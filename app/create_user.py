@@ -2,23 +2,28 @@ from app.database import SessionLocal, create_db_and_tables
 from app.models import User
 from app.auth import get_password_hash
 
-def main():
-    create_db_and_tables()
-    db = SessionLocal()
-
+def criar_usuario(db, email, full_name, senha, role="administrador"):
+    """Cria o usuário se o email ainda não existir (não faz commit). Retorna None se já existir."""
+    if db.query(User.id).filter(User.email == email).first():
+        return None
     user = User(
-        email="bruce@wayne.com",
-        full_name="Bruce Wayne",
-        hashed_password=get_password_hash("batman123"),
-        role="administrador",
+        email=email,
+        full_name=full_name,
+        hashed_password=get_password_hash(senha),
+        role=role,
         is_active=True
     )
-
     db.add(user)
+    return user
+
+def main():
+    create_db_and_tables()
+    db = SessionLocal()
+
+    user = criar_usuario(db, "bruce@wayne.com", "Bruce Wayne", "batman123")
     db.commit()
-    db.refresh(user)
     db.close()
-    print(f"Usuário criado: {user.email}")
+    print("Usuário criado: bruce@wayne.com" if user else "Usuário bruce@wayne.com já existe.")
 
 if __name__ == "__main__":
     main()
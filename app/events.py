@@ -0,0 +1,83 @@
+import os
+import json
+import asyncio
+from typing import Optional, Set
+
+from app.models import Alert
+
+# --- Broker de eventos de alertas (pub/sub em memória) ---
+# Cada cliente conectado em /alertas/stream recebe uma fila limitada. Se um cliente lento
+# deixar a fila encher, ele é desconectado em vez de atrasar os demais ou acumular memória.
+ALERT_STREAM_BUFFER = int(os.getenv("ALERT_STREAM_BUFFER", "100"))
+ALERT_STREAM_KEEPALIVE_SECONDS = float(os.getenv("ALERT_STREAM_KEEPALIVE_SECONDS", "15"))
+
+
+class AlertBroker:
+    """Distribui eventos de alertas para as filas dos assinantes conectados."""
+
+    def __init__(self, buffer_size: int = ALERT_STREAM_BUFFER):
+        self.buffer_size = buffer_size
+        self.descartados = 0
+        self._assinantes: Set[asyncio.Queue] = set()
+
+    def assinar(self) -> asyncio.Queue:
+        fila = asyncio.Queue(maxsize=self.buffer_size)
+        self._assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila: asyncio.Queue):
+        self._assinantes.discard(fila)
+
+    def publicar(self, tipo: str, dados: dict):
+        mensagem = f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+        for fila in list(self._assinantes):
+            try:
+                fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                self._descartar(fila)
+
+    def _descartar(self, fila: asyncio.Queue):
+        """Remove um assinante lento; o None sinaliza ao stream que deve encerrar."""
+        self._assinantes.discard(fila)
+        self.descartados += 1
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {"assinantes": len(self._assinantes), "descartados": self.descartados, "buffer": self.buffer_size}
+
+
+alert_broker = AlertBroker()
+
+
+def alerta_para_evento(alerta: Alert) -> dict:
+    return {
+        "id": alerta.id,
+        "titulo": alerta.titulo,
+        "descricao": alerta.descricao,
+        "nivel": alerta.nivel,
+        "criado_por": alerta.criado_por,
+        "data_criacao": alerta.data_criacao.isoformat() if alerta.data_criacao else None,
+        "ocorrencias": alerta.ocorrencias or 1,
+        "ultima_ocorrencia": alerta.ultima_ocorrencia.isoformat() if alerta.ultima_ocorrencia else None,
+    }
+
+
+async def stream_alertas(fila: asyncio.Queue, is_disconnected):
+    """Gera o fluxo Server-Sent Events de uma fila de assinante, com keepalive periódico."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                mensagem: Optional[str] = await asyncio.wait_for(fila.get(), timeout=ALERT_STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if mensagem is None:
+                break
+            yield mensagem
+    finally:
+        alert_broker.cancelar(fila)
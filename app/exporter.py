@@ -0,0 +1,113 @@
+import io
+import os
+import csv
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import select
+from starlette.concurrency import iterate_in_threadpool
+
+from app.archiver import consulta_partes, ler_arquivados, serializar
+from app.database import AsyncSessionLocal
+from app.models import User, Resource, Alert, Solicitacao
+
+# --- Exportação em streaming (CSV / NDJSON) ---
+# As linhas são lidas com cursor no servidor (stream + yield_per) e escritas na resposta
+# em blocos, opcionalmente comprimidas com gzip, para exportar tabelas grandes com memória constante.
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+# tipo -> (modelo, campos exportáveis, coluna usada no filtro por período)
+EXPORTAVEIS = {
+    "alertas": (Alert, ["id", "titulo", "descricao", "nivel", "criado_por", "data_criacao", "ocorrencias", "ultima_ocorrencia"], Alert.data_criacao),
+    "solicitacoes": (Solicitacao, ["id", "usuario_id", "area_solicitada", "justificativa", "status", "data_criacao", "data_atualizacao"], Solicitacao.data_criacao),
+    "recursos": (Resource, ["id", "name", "type", "description", "quantity", "is_active"], None),
+    "usuarios": (User, ["id", "email", "full_name", "is_active", "role"], None),
+}
+FORMATOS_EXPORTACAO = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def resolver_campos(tipo: str, campos: Optional[str]) -> List[str]:
+    """Valida a lista de campos pedida (separada por vírgula); sem lista, exporta todos."""
+    permitidos = EXPORTAVEIS[tipo][1]
+    if not campos:
+        return list(permitidos)
+    pedidos = [c.strip() for c in campos.split(",") if c.strip()]
+    invalidos = [c for c in pedidos if c not in permitidos]
+    if invalidos or not pedidos:
+        raise ValueError(f"Campos inválidos: {', '.join(invalidos) or 'nenhum informado'}. Campos disponíveis: {', '.join(permitidos)}.")
+    return pedidos
+
+
+async def gerar_exportacao(
+    tipo: str,
+    campos: List[str],
+    formato: str,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    comprimir: bool = False,
+    incluir_arquivo: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    Gera o conteúdo da exportação em blocos de bytes. Abre a própria sessão do banco.
+    Para alertas, os meses já arquivados no período vêm antes, lidos dos arquivos (ver app/archiver.py).
+    """
+    modelo, _, coluna_data = EXPORTAVEIS[tipo]
+    query = select(*[getattr(modelo, campo) for campo in campos])
+    if coluna_data is not None and inicio:
+        query = query.filter(coluna_data >= inicio)
+    if coluna_data is not None and fim:
+        query = query.filter(coluna_data < fim)
+    # Com período, ordena pela data para aproveitar o índice (data_criacao, id) dos alertas
+    if coluna_data is not None and (inicio or fim):
+        query = query.order_by(coluna_data, modelo.id)
+    else:
+        query = query.order_by(modelo.id)
+    query = query.execution_options(yield_per=EXPORT_YIELD_PER)
+
+    compressor = zlib.compressobj(wbits=31) if comprimir else None  # wbits=31: formato gzip
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer) if formato == "csv" else None
+
+    def esvaziar() -> bytes:
+        dados = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(dados) if compressor else dados
+
+    if escritor:
+        escritor.writerow(campos)
+
+    async with AsyncSessionLocal() as db:
+        if tipo == "alertas" and incluir_arquivo:
+            partes = (await db.execute(consulta_partes(inicio, fim))).scalars().all()
+            # Leitura e descompressão dos arquivos rodam no threadpool, um bloco de registros por vez
+            async for registros in iterate_in_threadpool(ler_arquivados(partes, inicio, fim)):
+                for registro in registros:
+                    if escritor:
+                        escritor.writerow([registro.get(campo) for campo in campos])
+                    else:
+                        buffer.write(json.dumps({campo: registro.get(campo) for campo in campos}, ensure_ascii=False))
+                        buffer.write("\n")
+                bloco = esvaziar()
+                if bloco:
+                    yield bloco
+
+        resultado = await db.stream(query)
+        async for particao in resultado.partitions():
+            for row in particao:
+                if escritor:
+                    escritor.writerow([serializar(v) for v in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(campos, map(serializar, row))), ensure_ascii=False))
+                    buffer.write("\n")
+            bloco = esvaziar()
+            if bloco:
+                yield bloco
+
+    final = esvaziar()
+    if compressor:
+        final += compressor.flush()
+    if final:
+        yield final
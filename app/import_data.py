@@ -0,0 +1,32 @@
+import sys
+import json
+import asyncio
+import argparse
+
+from app.database import AsyncSessionLocal, create_db_and_tables
+from app.importer import TIPOS_IMPORTACAO, detectar_formato, ler_registros, importar, IMPORT_BATCH_SIZE
+
+# Importa recursos, usuários ou áreas de um arquivo CSV ou JSON Lines.
+# Ex: python -m app.import_data usuarios equipe.csv
+
+async def _executar(tipo, caminho, formato, batch_size):
+    with open(caminho, "rb") as arquivo:
+        async with AsyncSessionLocal() as db:
+            return await importar(db, tipo, ler_registros(arquivo, formato), batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de recursos, usuários e áreas.")
+    parser.add_argument("tipo", choices=list(TIPOS_IMPORTACAO))
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "jsonl"])
+    parser.add_argument("--lote", type=int, default=IMPORT_BATCH_SIZE, help="Registros por transação")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    resultado = asyncio.run(_executar(args.tipo, args.arquivo, detectar_formato(args.arquivo, args.formato), args.lote))
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    if resultado["total_erros"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import os
+import csv
+import json
+import codecs
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.access import definir_roles_area, invalidar_matriz_acesso, parse_roles
+from app.auth import get_password_hashes_async
+from app.models import User, Resource, AreaRestrita
+
+# --- Importação em massa (recursos, usuários e áreas) ---
+# Lê CSV (com cabeçalho) ou JSON Lines linha a linha, valida cada registro e insere em
+# lotes de IMPORT_BATCH_SIZE com um INSERT de várias linhas por lote e um commit por lote.
+# Erros de validação ou de banco são reportados por linha sem interromper a carga.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERROS_REPORTADOS = 1000
+ROLES_VALIDAS = ("usuario", "gerente", "administrador")
+ERRO_UTF8 = "A linha não está em UTF-8."
+
+
+def _texto(registro: dict, campo: str, obrigatorio: bool = True, padrao: str = "") -> str:
+    valor = registro.get(campo)
+    valor = "" if valor is None else str(valor).strip()
+    if obrigatorio and not valor:
+        raise ValueError(f"Campo obrigatório ausente: '{campo}'.")
+    return valor or padrao
+
+
+def _booleano(registro: dict, campo: str, padrao: bool = True) -> bool:
+    valor = registro.get(campo)
+    if valor is None or valor == "":
+        return padrao
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ("1", "true", "sim", "s", "yes"):
+        return True
+    if texto in ("0", "false", "nao", "não", "n", "no"):
+        return False
+    raise ValueError(f"Valor booleano inválido em '{campo}': {valor!r}.")
+
+
+def _inteiro(registro: dict, campo: str, padrao: int = 0) -> int:
+    valor = registro.get(campo)
+    if valor is None or valor == "":
+        return padrao
+    # int() truncaria 2.7 para 2 e aceitaria true como 1 (JSON Lines)
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ValueError(f"Valor inteiro inválido em '{campo}': {valor!r}.")
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Valor inteiro inválido em '{campo}': {valor!r}.")
+
+
+def _validar_recurso(registro: dict) -> dict:
+    quantidade = _inteiro(registro, "quantity")
+    if quantidade < 0:
+        raise ValueError("Quantidade não pode ser negativa.")
+    return {
+        "name": _texto(registro, "name"),
+        "type": _texto(registro, "type"),
+        "description": _texto(registro, "description", obrigatorio=False),
+        "quantity": quantidade,
+        "is_active": _booleano(registro, "is_active"),
+    }
+
+
+def _validar_usuario(registro: dict) -> dict:
+    email = _texto(registro, "email").lower()
+    if "@" not in email:
+        raise ValueError(f"E-mail inválido: {email!r}.")
+    role = _texto(registro, "role", obrigatorio=False, padrao="usuario")
+    if role not in ROLES_VALIDAS:
+        raise ValueError(f"Role inválida: {role!r}. Roles válidas: {', '.join(ROLES_VALIDAS)}.")
+    return {
+        "email": email,
+        "full_name": _texto(registro, "full_name"),
+        "password": _texto(registro, "password"),
+        "role": role,
+        "is_active": _booleano(registro, "is_active"),
+    }
+
+
+def _validar_area(registro: dict) -> dict:
+    roles = [r.strip() for r in _texto(registro, "acesso_liberado_para").split(",") if r.strip()]
+    invalidas = [r for r in roles if r not in ROLES_VALIDAS]
+    if invalidas or not roles:
+        raise ValueError(f"Roles inválidas em 'acesso_liberado_para': {', '.join(invalidas) or 'nenhuma informada'}.")
+    return {
+        "nome": _texto(registro, "nome"),
+        "descricao": _texto(registro, "descricao", obrigatorio=False),
+        "acesso_liberado_para": ",".join(roles),
+        "is_ativa": _booleano(registro, "is_ativa"),
+    }
+
+
+def _conferir_tamanhos(modelo, valores: dict):
+    # Valores maiores que a coluna seriam recusados pelo MySQL em modo estrito (DataError)
+    colunas = modelo.__table__.c
+    for campo, valor in valores.items():
+        tamanho = getattr(colunas[campo].type, "length", None) if campo in colunas else None
+        if tamanho and isinstance(valor, str) and len(valor) > tamanho:
+            raise ValueError(f"Campo '{campo}' excede {tamanho} caracteres ({len(valor)}).")
+
+
+# tipo -> (modelo, validador, coluna única usada para detectar duplicados)
+TIPOS_IMPORTACAO = {
+    "recursos": (Resource, _validar_recurso, None),
+    "usuarios": (User, _validar_usuario, "email"),
+    "areas": (AreaRestrita, _validar_area, "nome"),
+}
+
+
+def detectar_formato(nome_arquivo: Optional[str], formato: Optional[str] = None) -> str:
+    if formato:
+        formato = formato.lower()
+    elif nome_arquivo and nome_arquivo.lower().endswith((".jsonl", ".ndjson", ".json")):
+        formato = "jsonl"
+    else:
+        formato = "csv"
+    if formato not in ("csv", "jsonl"):
+        raise ValueError("Formato inválido. Use 'csv' ou 'jsonl'.")
+    return formato
+
+
+def _linhas_utf8(arquivo_binario, invalidas: Set[int]) -> Iterator[str]:
+    """Decodifica o arquivo linha a linha; as linhas que não são UTF-8 válido entram em `invalidas`."""
+    for numero, linha in enumerate(arquivo_binario, start=1):
+        if numero == 1 and linha.startswith(codecs.BOM_UTF8):
+            linha = linha[len(codecs.BOM_UTF8):]
+        try:
+            yield linha.decode("utf-8")
+        except UnicodeDecodeError:
+            invalidas.add(numero)
+            yield linha.decode("utf-8", errors="replace")
+
+
+def ler_registros(arquivo_binario, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Gera (número da linha, registro, erro) lendo o arquivo de forma incremental. Uma linha fora de
+    UTF-8 vira erro da própria linha: os lotes anteriores já podem ter sido gravados.
+    """
+    invalidas: Set[int] = set()
+    linhas = _linhas_utf8(arquivo_binario, invalidas)
+    if formato == "csv":
+        leitor = csv.DictReader(linhas)
+        anterior = 1  # cabeçalho
+        for registro in leitor:
+            # Um registro CSV pode ocupar várias linhas (campo entre aspas com quebra de linha)
+            if any(numero in invalidas for numero in range(anterior + 1, leitor.line_num + 1)):
+                yield leitor.line_num, None, ERRO_UTF8
+            else:
+                yield leitor.line_num, registro, None
+            anterior = leitor.line_num
+        return
+    for numero, linha in enumerate(linhas, start=1):
+        if numero in invalidas:
+            yield numero, None, ERRO_UTF8
+            continue
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, None, f"JSON inválido: {e.msg}."
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON."
+            continue
+        yield numero, registro, None
+
+
+class _ResultadoImportacao:
+    def __init__(self, tipo: str):
+        self.tipo = tipo
+        self.inseridos = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def erro(self, linha: int, mensagem: str):
+        self.total_erros += 1
+        if len(self.erros) < IMPORT_MAX_ERROS_REPORTADOS:
+            self.erros.append({"linha": linha, "erro": mensagem})
+
+    def como_dict(self) -> dict:
+        erros = sorted(self.erros, key=lambda erro: erro["linha"])
+        return {"tipo": self.tipo, "inseridos": self.inseridos, "total_erros": self.total_erros, "erros": erros}
+
+
+async def _gravar_roles_areas(db: AsyncSession, valores_areas: list):
+    """Grava as linhas de areas_acesso_roles das áreas recém-inseridas (mesma transação)."""
+    nomes = [valores["nome"] for valores in valores_areas]
+    ids = dict((await db.execute(select(AreaRestrita.nome, AreaRestrita.id).filter(AreaRestrita.nome.in_(nomes)))).all())
+    for valores in valores_areas:
+        await definir_roles_area(db, ids[valores["nome"]], parse_roles(valores["acesso_liberado_para"]))
+
+
+async def _gravar_lote(db: AsyncSession, tipo: str, lote: list, resultado: _ResultadoImportacao):
+    modelo, _, campo_unico = TIPOS_IMPORTACAO[tipo]
+
+    if campo_unico:
+        coluna = getattr(modelo, campo_unico)
+        existentes = set((await db.execute(
+            select(coluna).filter(coluna.in_([valores[campo_unico] for _, valores in lote]))
+        )).scalars().all())
+        filtrado, vistos = [], set()
+        for linha, valores in lote:
+            chave = valores[campo_unico]
+            if chave in existentes or chave in vistos:
+                resultado.erro(linha, f"Já existe um registro com {campo_unico} '{chave}'.")
+                continue
+            vistos.add(chave)
+            filtrado.append((linha, valores))
+        lote = filtrado
+        if not lote:
+            return
+
+    if tipo == "usuarios":
+        hashes = await get_password_hashes_async([valores.pop("password") for _, valores in lote])
+        for (_, valores), hashed in zip(lote, hashes):
+            valores["hashed_password"] = hashed
+
+    try:
+        await db.execute(insert(modelo), [valores for _, valores in lote])
+        if tipo == "areas":
+            await _gravar_roles_areas(db, [valores for _, valores in lote])
+        await db.commit()
+        resultado.inseridos += len(lote)
+        return
+    except DBAPIError:
+        await db.rollback()
+
+    # O lote falhou como um todo (ex: corrida com outra inserção ou valor recusado pelo banco): grava linha a linha
+    for linha, valores in lote:
+        try:
+            await db.execute(insert(modelo), [valores])
+            if tipo == "areas":
+                await _gravar_roles_areas(db, [valores])
+            await db.commit()
+            resultado.inseridos += 1
+        except IntegrityError as e:
+            await db.rollback()
+            resultado.erro(linha, f"Erro de integridade no banco: {e.orig}.")
+        except DBAPIError as e:
+            await db.rollback()
+            resultado.erro(linha, f"Erro no banco: {e.orig}.")
+
+
+async def importar(db: AsyncSession, tipo: str, registros: Iterable[Tuple[int, Optional[dict], Optional[str]]], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Valida e insere os registros em lotes; retorna contagens e erros por linha."""
+    modelo, validar, _ = TIPOS_IMPORTACAO[tipo]
+    resultado = _ResultadoImportacao(tipo)
+    lote = []
+    for linha, registro, erro in registros:
+        if erro:
+            resultado.erro(linha, erro)
+            continue
+        try:
+            valores = validar(registro)
+            _conferir_tamanhos(modelo, valores)
+            lote.append((linha, valores))
+        except ValueError as e:
+            resultado.erro(linha, str(e))
+            continue
+        if len(lote) >= batch_size:
+            await _gravar_lote(db, tipo, lote, resultado)
+            lote = []
+    if lote:
+        await _gravar_lote(db, tipo, lote, resultado)
+    if tipo == "areas" and resultado.inseridos:
+        invalidar_matriz_acesso()
+    return resultado.como_dict()
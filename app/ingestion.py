@@ -0,0 +1,375 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal
+from app.events import alert_broker, alerta_para_evento
+from app.models import Alert, Resource, TokenIngestao
+from app.reports import registrar_rollup
+from app.search import ALERTA, indexar_documento
+
+# --- Ingestão de alertas por dispositivos (write-behind) ---
+# Câmeras e sensores cadastrados como recursos enviam eventos para POST /api/alertas com
+# "Authorization: Bearer <token>". A rota só valida e enfileira (HTTP 202); uma tarefa em
+# segundo plano grava a fila na tabela alerts em lotes de até INGESTAO_FLUSH_SIZE eventos, com
+# um INSERT de várias linhas e um commit por lote, no máximo INGESTAO_FLUSH_INTERVAL segundos
+# depois do primeiro evento. A fila é limitada a INGESTAO_FILA_MAX eventos por worker: uma
+# requisição que não cabe inteira é recusada com 503 e Retry-After, e o dispositivo reenvia.
+# Se o banco falhar, o lote é regravado com espera crescente e a fila enche até o 503.
+# Eventos aceitos e ainda não gravados se perdem se o processo morrer sem o shutdown.
+#
+# Agrupamento de repetições: um sensor instável manda o mesmo alerta (mesmo título, nível e
+# dispositivo) centenas de vezes por minuto. Cada worker lembra o id do último alerta de cada
+# combinação; uma repetição que chega até INGESTAO_DEDUP_JANELAS[nível] segundos depois da
+# anterior (janela deslizante) só soma em ocorrencias e atualiza ultima_ocorrencia, sem nova
+# linha. Janela 0 desliga o agrupamento do nível (padrão para "critico": cada um vira uma linha).
+INGESTAO_FILA_MAX = int(os.getenv("INGESTAO_FILA_MAX", "10000"))
+INGESTAO_FLUSH_SIZE = int(os.getenv("INGESTAO_FLUSH_SIZE", "500"))
+INGESTAO_FLUSH_INTERVAL = float(os.getenv("INGESTAO_FLUSH_INTERVAL", "0.5"))
+INGESTAO_MAX_EVENTOS = int(os.getenv("INGESTAO_MAX_EVENTOS", "1000"))  # por requisição
+INGESTAO_RETRY_AFTER = int(os.getenv("INGESTAO_RETRY_AFTER", "1"))
+INGESTAO_TOKEN_CACHE_TTL = float(os.getenv("INGESTAO_TOKEN_CACHE_TTL", "60"))
+INGESTAO_DEDUP_MAX_CHAVES = int(os.getenv("INGESTAO_DEDUP_MAX_CHAVES", "50000"))
+INGESTAO_ESPERA_MAX_ERRO = 30.0
+INGESTAO_SHUTDOWN_TIMEOUT = 10.0
+
+NIVEIS_ALERTA = ("baixo", "medio", "alto", "critico")
+
+
+def _parse_janelas(valor: str) -> Dict[str, float]:
+    """'baixo=60,critico=0' -> {'baixo': 60.0, 'critico': 0.0}; níveis ausentes não são agrupados."""
+    janelas = {}
+    for item in valor.split(","):
+        nivel, _, segundos = item.partition("=")
+        if nivel.strip():
+            janelas[nivel.strip().lower()] = float(segundos or 0)
+    return janelas
+
+
+INGESTAO_DEDUP_JANELAS = _parse_janelas(os.getenv("INGESTAO_DEDUP_JANELAS", "baixo=60,medio=60,alto=60,critico=0"))
+_JANELA_MAXIMA = max(INGESTAO_DEDUP_JANELAS.values(), default=0.0)
+
+# hash do token -> criado_por do dispositivo ("" = token inválido, também guardado para não consultar o banco)
+token_cache = TTLCache(maxsize=1024, ttl=INGESTAO_TOKEN_CACHE_TTL)
+
+_fila: Deque[dict] = deque()
+_gravando: List[dict] = []
+_tem_eventos = asyncio.Event()
+_lote_cheio = asyncio.Event()
+_encerrando = False
+_tarefas: Set[asyncio.Task] = set()
+# (titulo, nivel, criado_por) -> [id do alerta, visto_em]; do menos para o mais recente
+_recentes: "OrderedDict[Tuple[str, str, str], list]" = OrderedDict()
+_stats = {
+    "aceitos": 0, "recusados": 0, "gravados": 0, "linhas_inseridas": 0, "agrupados": 0, "lotes": 0,
+    "erros_gravacao": 0, "ultimo_erro": None, "erros_pos_gravacao": 0, "duracao_gravacao_s": 0.0, "atraso_max_s": 0.0,
+}
+logger = logging.getLogger(__name__)
+
+
+class FilaCheia(Exception):
+    """Os eventos da requisição não cabem na fila de ingestão."""
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def gerar_token(db: AsyncSession, resource_id: int, criado_por: str) -> str:
+    """Cria um token para o recurso e revoga os anteriores. Retorna o token em texto (só existe aqui)."""
+    token = secrets.token_urlsafe(32)
+    anteriores = (await db.execute(
+        select(TokenIngestao.token_hash).filter(TokenIngestao.resource_id == resource_id, TokenIngestao.is_active)
+    )).scalars().all()
+    await db.execute(update(TokenIngestao).filter(TokenIngestao.resource_id == resource_id).values(is_active=False))
+    db.add(TokenIngestao(resource_id=resource_id, token_hash=hash_token(token), criado_por=criado_por))
+    await db.commit()
+    for anterior in anteriores:
+        token_cache.invalidate(anterior)  # outros workers deixam de aceitá-los em até INGESTAO_TOKEN_CACHE_TTL
+    return token
+
+
+async def autenticar_dispositivo(db: AsyncSession, authorization: str) -> Optional[str]:
+    """Retorna o nome do dispositivo (usado em criado_por) dono do token Bearer, ou None."""
+    esquema, _, token = authorization.partition(" ")
+    if esquema.lower() != "bearer" or not token.strip():
+        return None
+    chave = hash_token(token.strip())
+    origem = token_cache.get(chave)
+    if origem is None:
+        recurso = (await db.execute(
+            select(Resource.id, Resource.name)
+            .join(TokenIngestao, TokenIngestao.resource_id == Resource.id)
+            .filter(TokenIngestao.token_hash == chave, TokenIngestao.is_active, Resource.is_active)
+        )).first()
+        origem = f"{recurso.name} (recurso {recurso.id})"[:100] if recurso else ""
+        token_cache.set(chave, origem)
+    return origem or None
+
+
+def validar_evento(evento) -> dict:
+    if not isinstance(evento, dict):
+        raise ValueError("Cada evento deve ser um objeto JSON.")
+    campos = {}
+    for campo in ("titulo", "descricao", "nivel"):
+        valor = evento.get(campo)
+        if not isinstance(valor, str) or not valor.strip():
+            raise ValueError(f"Campo obrigatório ausente: '{campo}'.")
+        campos[campo] = valor.strip()
+    if len(campos["titulo"]) > 100:
+        raise ValueError("O título deve ter no máximo 100 caracteres.")
+    campos["nivel"] = campos["nivel"].lower()
+    if campos["nivel"] not in NIVEIS_ALERTA:
+        raise ValueError(f"Nível inválido: {evento['nivel']!r}. Níveis válidos: {', '.join(NIVEIS_ALERTA)}.")
+    return campos
+
+
+def enfileirar(eventos: List[dict], criado_por: str):
+    """Enfileira todos os eventos ou nenhum (FilaCheia), para o dispositivo poder reenviar a requisição inteira."""
+    if len(_fila) + len(_gravando) + len(eventos) > INGESTAO_FILA_MAX:
+        _stats["recusados"] += len(eventos)
+        raise FilaCheia()
+    agora = time.monotonic()
+    for evento in eventos:
+        _fila.append({**evento, "criado_por": criado_por, "_recebido_em": agora})
+    _stats["aceitos"] += len(eventos)
+    _tem_eventos.set()
+    if len(_fila) >= INGESTAO_FLUSH_SIZE:
+        _lote_cheio.set()
+
+
+def _recente(impressao: tuple, janela: float, agora: float) -> Optional[int]:
+    item = _recentes.get(impressao)
+    if item is None or agora - item[1] > janela:
+        return None
+    return item[0]
+
+
+def _lembrar(impressao: tuple, alerta_id: int, agora: float):
+    _recentes[impressao] = [alerta_id, agora]
+    _recentes.move_to_end(impressao)
+    while _recentes and (len(_recentes) > INGESTAO_DEDUP_MAX_CHAVES or agora - next(iter(_recentes.values()))[1] > _JANELA_MAXIMA):
+        _recentes.popitem(last=False)
+
+
+def esquecer_alerta(alerta_id: int):
+    """Chamado quando um alerta é editado ou excluído: as próximas repetições criam uma linha nova."""
+    for impressao in [impressao for impressao, (recente_id, _) in _recentes.items() if recente_id == alerta_id]:
+        del _recentes[impressao]
+
+
+_COLUNAS_EVENTO = (
+    Alert.id, Alert.titulo, Alert.descricao, Alert.nivel, Alert.criado_por, Alert.data_criacao,
+    Alert.ocorrencias, Alert.ultima_ocorrencia
+)
+
+
+async def _inserir(db: AsyncSession, valores: List[dict]) -> list:
+    """Grava o lote e retorna as linhas gravadas (com os atributos usados por alerta_para_evento)."""
+    if db.bind.dialect.insert_executemany_returning:
+        # SQLite, PostgreSQL, MariaDB: um único INSERT ... VALUES (...), (...) RETURNING. As colunas vêm
+        # de volta com o id porque a ordem das linhas do RETURNING não é garantida (pedir a ordem dos
+        # parâmetros faria o SQLAlchemy gravar linha a linha no SQLite)
+        return (await db.execute(insert(Alert).returning(*_COLUNAS_EVENTO), valores)).all()
+    # MySQL (sem RETURNING): um único INSERT ... VALUES (...), (...). Num INSERT simples de várias linhas
+    # o InnoDB reserva ids consecutivos (innodb_autoinc_lock_mode padrão, auto_increment_increment=1) e
+    # lastrowid é o da primeira linha; as linhas são relidas por essa faixa da chave primária
+    resultado = await db.execute(insert(Alert).values(valores))
+    primeiro_id = resultado.lastrowid
+    return (await db.execute(
+        select(*_COLUNAS_EVENTO)
+        .filter(Alert.id.between(primeiro_id, primeiro_id + resultado.rowcount - 1))
+        .order_by(Alert.id)
+    )).all()
+
+
+def _agrupar(lote: List[dict], agora: float) -> Tuple[List[dict], Dict[int, Tuple[dict, int]]]:
+    """
+    Separa o lote em linhas novas (com as repetições do próprio lote já somadas em "ocorrencias")
+    e repetições de alertas já gravados: {id do alerta: (primeiro evento, ocorrências)}.
+    """
+    novos: List[dict] = []
+    por_impressao: Dict[tuple, dict] = {}
+    repeticoes: Dict[int, Tuple[dict, int]] = {}
+    for evento in lote:
+        janela = INGESTAO_DEDUP_JANELAS.get(evento["nivel"], 0.0)
+        impressao = (evento["titulo"], evento["nivel"], evento["criado_por"])
+        if janela > 0:
+            alerta_id = _recente(impressao, janela, agora)
+            if alerta_id is not None:
+                primeiro, ocorrencias = repeticoes.get(alerta_id, (evento, 0))
+                repeticoes[alerta_id] = (primeiro, ocorrencias + 1)
+                continue
+            if impressao in por_impressao:
+                por_impressao[impressao]["ocorrencias"] += 1
+                continue
+        linha = {"titulo": evento["titulo"], "descricao": evento["descricao"], "nivel": evento["nivel"],
+                 "criado_por": evento["criado_por"], "ocorrencias": 1}
+        novos.append(linha)
+        if janela > 0:
+            por_impressao[impressao] = linha
+    return novos, repeticoes
+
+
+async def _gravar(lote: List[dict]) -> tuple:
+    """
+    Grava o lote numa única transação. É a parte que o escritor repete em caso de erro; o que vem
+    depois do commit (índice de busca, SSE, janelas de repetição) fica em _depois_do_commit.
+    """
+    inicio = time.perf_counter()
+    agora = time.monotonic()
+    novos, repeticoes = _agrupar(lote, agora)
+    async with AsyncSessionLocal() as db:
+        # O mesmo relógio do server_default de data_criacao, para os alertas da API e do formulário serem comparáveis
+        momento = (await db.execute(select(func.now()))).scalar_one()
+
+        totais = []
+        if repeticoes:
+            # Um único executemany para todas as repetições do lote (na tabela, não no modelo, para o
+            # ORM não tratar como atualização em massa por chave primária)
+            tabela = Alert.__table__
+            await db.execute(
+                update(tabela).where(tabela.c.id == bindparam("alerta_id"))
+                .values(ocorrencias=tabela.c.ocorrencias + bindparam("repeticoes"), ultima_ocorrencia=momento),
+                [{"alerta_id": alerta_id, "repeticoes": ocorrencias} for alerta_id, (_, ocorrencias) in repeticoes.items()]
+            )
+            totais = (await db.execute(select(Alert.id, Alert.ocorrencias).filter(Alert.id.in_(list(repeticoes))))).all()
+            for alerta_id in set(repeticoes) - {alerta_id for alerta_id, _ in totais}:
+                # Excluído (por outro worker, por exemplo): as repetições viram uma linha nova
+                primeiro, ocorrencias = repeticoes.pop(alerta_id)
+                _recentes.pop((primeiro["titulo"], primeiro["nivel"], primeiro["criado_por"]), None)
+                novos.append({"titulo": primeiro["titulo"], "descricao": primeiro["descricao"], "nivel": primeiro["nivel"],
+                              "criado_por": primeiro["criado_por"], "ocorrencias": ocorrencias})
+
+        alertas = []
+        if novos:
+            for linha in novos:
+                linha["data_criacao"] = momento
+                linha["ultima_ocorrencia"] = momento if linha["ocorrencias"] > 1 else None
+            alertas = await _inserir(db, novos)
+            for nivel, total in Counter(linha["nivel"] for linha in novos).items():
+                await registrar_rollup(db, "alertas", nivel, momento, total)
+        await db.commit()
+
+    _stats["gravados"] += len(lote)
+    _stats["linhas_inseridas"] += len(novos)
+    _stats["agrupados"] += len(lote) - len(novos)
+    _stats["lotes"] += 1
+    _stats["duracao_gravacao_s"] += time.perf_counter() - inicio
+    _stats["atraso_max_s"] = max(_stats["atraso_max_s"], time.monotonic() - lote[0]["_recebido_em"])
+    return alertas, totais, repeticoes, momento, agora
+
+
+def _depois_do_commit(alertas: list, totais: list, repeticoes: Dict[int, Tuple[dict, int]], momento, agora: float):
+    """Efeitos de um lote já gravado; uma falha é registrada e não interrompe os demais alertas do lote."""
+    ultima = momento.isoformat()
+    efeitos = [(alerta.id, _efeitos_novo, (alerta, agora)) for alerta in alertas]
+    efeitos += [(alerta_id, _efeitos_repeticao, (alerta_id, ocorrencias, repeticoes[alerta_id][0], ultima, agora))
+                for alerta_id, ocorrencias in totais]
+    for alerta_id, efeito, argumentos in efeitos:
+        try:
+            efeito(*argumentos)
+        except Exception:
+            _stats["erros_pos_gravacao"] += 1
+            logger.exception("Erro ao indexar ou publicar o alerta %s já gravado (o lote não é regravado)", alerta_id)
+
+
+def _efeitos_novo(alerta, agora: float):
+    if INGESTAO_DEDUP_JANELAS.get(alerta.nivel, 0.0) > 0:
+        _lembrar((alerta.titulo, alerta.nivel, alerta.criado_por), alerta.id, agora)
+    indexar_documento(ALERTA, alerta.id, alerta.titulo, alerta.descricao)
+    alert_broker.publicar("criado", alerta_para_evento(alerta))
+
+
+def _efeitos_repeticao(alerta_id: int, ocorrencias: int, primeiro: dict, ultima: str, agora: float):
+    _lembrar((primeiro["titulo"], primeiro["nivel"], primeiro["criado_por"]), alerta_id, agora)
+    alert_broker.publicar("repetido", {"id": alerta_id, "ocorrencias": ocorrencias, "ultima_ocorrencia": ultima})
+
+
+async def _proximo_lote() -> List[dict]:
+    """Espera o primeiro evento e, depois dele, até INGESTAO_FLUSH_INTERVAL para o lote encher."""
+    await _tem_eventos.wait()
+    prazo = time.monotonic() + INGESTAO_FLUSH_INTERVAL
+    while len(_fila) < INGESTAO_FLUSH_SIZE and not _encerrando:
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            break
+        _lote_cheio.clear()
+        try:
+            await asyncio.wait_for(_lote_cheio.wait(), restante)
+        except asyncio.TimeoutError:
+            break
+    lote = [_fila.popleft() for _ in range(min(INGESTAO_FLUSH_SIZE, len(_fila)))]
+    if not _fila:
+        _tem_eventos.clear()
+    return lote
+
+
+async def _escritor():
+    espera_erro = 0.5
+    while not (_encerrando and not _fila):
+        _gravando[:] = await _proximo_lote()
+        while _gravando:
+            try:
+                gravado = await _gravar(_gravando)
+            except Exception as e:  # banco fora do ar, deadlock, etc.: o lote é mantido e regravado
+                _stats["erros_gravacao"] += 1
+                _stats["ultimo_erro"] = f"{type(e).__name__}: {e}"[:300]
+                if _encerrando:
+                    return
+                await asyncio.sleep(espera_erro)
+                espera_erro = min(espera_erro * 2, INGESTAO_ESPERA_MAX_ERRO)
+                continue
+            # Já está no banco: daqui em diante nada pode fazer o lote ser gravado de novo
+            _gravando.clear()
+            espera_erro = 0.5
+            _depois_do_commit(*gravado)
+
+
+def iniciar_ingestao():
+    global _encerrando, _tem_eventos, _lote_cheio
+    _encerrando = False
+    # Os eventos são recriados no loop atual (o servidor de testes usa um loop por ciclo de vida)
+    _tem_eventos, _lote_cheio = asyncio.Event(), asyncio.Event()
+    if _fila:
+        _tem_eventos.set()
+    if not _tarefas:
+        tarefa = asyncio.get_running_loop().create_task(_escritor())
+        _tarefas.add(tarefa)
+        tarefa.add_done_callback(_tarefas.discard)
+
+
+async def encerrar_ingestao():
+    """Grava o que ainda está na fila antes de o processo terminar (até INGESTAO_SHUTDOWN_TIMEOUT)."""
+    global _encerrando
+    _encerrando = True
+    _tem_eventos.set()
+    _lote_cheio.set()
+    if _tarefas:
+        _, pendentes = await asyncio.wait(set(_tarefas), timeout=INGESTAO_SHUTDOWN_TIMEOUT)
+        for tarefa in pendentes:
+            tarefa.cancel()
+
+
+def get_ingestao_stats() -> dict:
+    return {
+        **_stats,
+        "na_fila": len(_fila),
+        "gravando": len(_gravando),
+        "fila_max": INGESTAO_FILA_MAX,
+        "flush_size": INGESTAO_FLUSH_SIZE,
+        "flush_interval_s": INGESTAO_FLUSH_INTERVAL,
+        "eventos_por_lote": round(_stats["gravados"] / _stats["lotes"], 1) if _stats["lotes"] else 0.0,
+        "janelas_agrupamento_s": INGESTAO_DEDUP_JANELAS,
+        "impressoes_recentes": len(_recentes),
+        "tokens": token_cache.stats(),
+    }
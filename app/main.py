@@ -1,18 +1,58 @@
 
+import time
+_inicio_importacao = time.perf_counter()  # início da importação do worker (ver app/startup.py)
+
 import os
+import hmac
 from typing import List, Dict, Optional
-from datetime import datetime 
+from datetime import datetime, date, timedelta
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, Request, Depends, Form, HTTPException, status # <-- status está importado
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Depends, Form, File, UploadFile, HTTPException, status # <-- status está importado
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session, configure_mappers 
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 # Importações do seu projeto
-from app.auth import login_user, get_password_hash
-from app.database import create_db_and_tables, get_db
+from app.auth import (
+    login_user, get_password_hash_async, get_hash_pool_stats,
+    SessionUser, SESSION_COOKIE_NAME, SESSION_MAX_AGE, create_session_token, decode_session_token,
+    is_session_valid, set_user_state, forget_user_state, user_cache, verificar_session_secret,
+    start_user_state_refresh, stop_user_state_refresh
+)
+from app.database import (
+    get_async_db, get_async_db_leitura, get_pool_stats, verificar_prontidao,
+    EscritaRecenteMiddleware, engine, async_engine, replica_engines
+)
+from app.profiler import ProfilerSQLMiddleware, instrumentar_engine, get_relatorio_sql, limpar_relatorio_sql
+from app.metrics import MetricasMiddleware, METRICS_TOKEN, gerar_metricas
+from app.render_cache import pagina_em_cache, fragmento_em_cache, resposta_com_etag, invalidar_dominio
+from app.search import (
+    ALERTA, COMUNICADO, TIPOS_BUSCA, RESULTADOS_POR_PAGINA, buscar, garantir_indice,
+    indexar_documento, remover_documento, iniciar_indexacao, get_busca_stats
+)
 from app.models import User, Resource, Alert, AreaRestrita, Comunicado, Solicitacao
+from app.access import (
+    parse_roles, definir_roles_area, invalidar_matriz_acesso, roles_da_area,
+    usuario_pode_entrar, filtro_acesso_usuario
+)
+from app.solicitacoes import ACOES_LOTE, LOTE_MAX_SOLICITACOES, ConflitoConcorrencia, processar_solicitacoes
+from app.startup import inicializar, esquema_pendente, get_inicializacao_stats
+from app.archiver import ALERTAS_RETENCAO_MESES, consulta_partes, proximo_mes
+from app.exporter import EXPORTAVEIS, FORMATOS_EXPORTACAO, resolver_campos, gerar_exportacao
+from app.importer import TIPOS_IMPORTACAO, detectar_formato, ler_registros, importar
+from app.events import alert_broker, alerta_para_evento, stream_alertas
+from app.ingestion import (
+    INGESTAO_MAX_EVENTOS, INGESTAO_RETRY_AFTER, FilaCheia, autenticar_dispositivo, validar_evento,
+    enfileirar, esquecer_alerta, gerar_token, iniciar_ingestao, encerrar_ingestao, get_ingestao_stats
+)
+from app.reports import (
+    get_metricas_gerais, METRICS_SNAPSHOT_TTL, SERIES, GRANULARIDADES,
+    registrar_rollup, mover_rollup, get_serie_temporal
+)
 
 
 # --- Configuração da Aplicação FastAPI ---
@@ -20,135 +60,99 @@ app = FastAPI()
 
 # Configuração de templates e arquivos estáticos
 templates = Jinja2Templates(directory="app/templates")
+# Templates compilados ficam em memória; em desenvolvimento, TEMPLATES_AUTO_RELOAD=true
+# faz o Jinja conferir a data de modificação dos arquivos a cada renderização
+templates.env.auto_reload = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "sim")
 app.mount("/static", StaticFiles(directory="static"), name="static")
+app.add_middleware(EscritaRecenteMiddleware)
+app.add_middleware(MetricasMiddleware)  # dentro do profiler, para ler o tempo de banco da requisição
+app.add_middleware(ProfilerSQLMiddleware)
+for _engine in (engine, async_engine.sync_engine, *(replica.sync_engine for replica in replica_engines)):
+    instrumentar_engine(_engine)
 
 # --- Funções Auxiliares para Autenticação e Autorização ---
 
-async def get_current_user_from_cookies(request: Request) -> Optional[Dict[str, str]]:
-    """Obtém o ID, nome completo e a role do usuário dos cookies."""
-    user_id = request.cookies.get("user_id")
-    user_full_name = request.cookies.get("user")
-    user_role = request.cookies.get("role")
-    
-    if not user_id or not user_full_name or not user_role:
-        return None
-    try:
-        return {"id": int(user_id), "full_name": user_full_name, "role": user_role}
-    except ValueError:
-        return None
+async def get_current_user_from_cookies(request: Request) -> Optional[SessionUser]:
+    """Obtém o ID, nome completo e a role do usuário a partir do token de sessão assinado."""
+    return decode_session_token(request.cookies.get(SESSION_COOKIE_NAME))
 
 
-async def get_authenticated_user_db(request: Request, db: Session = Depends(get_db)) -> User:
+async def get_session_user(request: Request) -> SessionUser:
     """
-    Verifica se o usuário está autenticado via cookies e retorna o objeto User completo do banco de dados.
-    Redireciona para a página de login se o usuário não estiver autenticado ou não for encontrado no DB.
+    Valida o token de sessão sem consultar o banco de dados.
+    Redireciona para o login se o token for inválido e para o logout se a sessão foi revogada
+    (usuário desativado, excluído ou com role alterada).
     """
-    user_info = await get_current_user_from_cookies(request)
-    if user_info is None:
+    session_user = await get_current_user_from_cookies(request)
+    if session_user is None:
         raise HTTPException(
-            status_code=status.HTTP_302_FOUND, # <-- Uso correto
+            status_code=status.HTTP_302_FOUND,
             detail="Não autenticado. Por favor, faça login.",
             headers={"Location": "/"}
         )
-    
-    user = db.query(User).filter(
-        User.id == user_info["id"],
-        User.full_name == user_info["full_name"],
-        User.role == user_info["role"]
-    ).first()
+
+    if not await is_session_valid(session_user):
+        raise HTTPException(
+            status_code=status.HTTP_302_FOUND,
+            detail="Sessão inválida ou usuário inativo. Faça login novamente.",
+            headers={"Location": "/logout"}
+        )
+    return session_user
+
+
+async def get_authenticated_user_db(session_user: SessionUser = Depends(get_session_user), db: AsyncSession = Depends(get_async_db)) -> User:
+    """
+    Retorna o objeto User completo do banco de dados para o usuário do token de sessão.
+    Redireciona para o logout se o usuário não for encontrado ou estiver inativo.
+    """
+    user = user_cache.get(session_user.id)
+    if user is None:
+        user = await db.get(User, session_user.id)
+        if user:
+            db.expunge(user)
+            user_cache.set(user.id, user)
 
     if not user or not user.is_active:
-        response = RedirectResponse(url="/logout", status_code=status.HTTP_302_FOUND) # <-- Uso correto
         raise HTTPException(
-            status_code=status.HTTP_302_FOUND, # <-- Uso correto
+            status_code=status.HTTP_302_FOUND,
             detail="Sessão inválida ou usuário inativo. Faça login novamente.",
-            headers={"Location": response.headers["location"]}
+            headers={"Location": "/logout"}
         )
     return user
 
 
-async def admin_required(current_user: User = Depends(get_authenticated_user_db)):
-    """Verifica se o usuário é um administrador e retorna o objeto User."""
+async def admin_required(current_user: SessionUser = Depends(get_session_user)):
+    """Verifica se o usuário é um administrador e retorna os dados da sessão."""
     if current_user.role != "administrador":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado. Apenas administradores podem acessar esta funcionalidade.")
     return current_user
 
 
-async def manager_or_admin_required(current_user: User = Depends(get_authenticated_user_db)):
-    """Verifica se o usuário é um gerente ou administrador e retorna o objeto User."""
+async def manager_or_admin_required(current_user: SessionUser = Depends(get_session_user)):
+    """Verifica se o usuário é um gerente ou administrador e retorna os dados da sessão."""
     if current_user.role not in ["administrador", "gerente"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado. Apenas administradores e gerentes podem acessar esta funcionalidade.")
     return current_user
 
 
-# --- Evento de Inicialização (Popula o DB com usuários e comunicados de exemplo) ---
+# --- Eventos de Inicialização e Encerramento ---
+# O worker não cria tabelas nem insere dados de exemplo ao iniciar (python -m app.migrate e
+# python -m app.seed, uma vez por deploy): só aquece o pool e compila os templates (app/startup.py).
 
 @app.on_event("startup")
-def startup_event():
-    """Cria o banco de dados e insere usuários e comunicados de exemplo se não existirem."""
-    create_db_and_tables()
-    db = next(get_db())
-
-    configure_mappers() 
+async def startup_event():
+    verificar_session_secret()
+    await inicializar(templates, _inicio_importacao)
+    if not await esquema_pendente():  # sem as tabelas, o índice é construído na primeira busca
+        iniciar_indexacao()
+    iniciar_ingestao()
+    start_user_state_refresh()
 
-    example_users = [
-        {"email": "bruce@wayne.com", "full_name": "Bruce Wayne", "password": "batman123", "role": "administrador"},
-        {"email": "dick@grayson.com", "full_name": "Dick Grayson", "password": "asanoturna123", "role": "gerente"},
-        {"email": "damian@wayne.com", "full_name": "Damian Wayne", "password": "robin123", "role": "usuario"}
-    ]
 
-    for user_data in example_users:
-        user = db.query(User).filter(User.email == user_data["email"]).first()
-        if not user:
-            new_user = User(
-                email=user_data["email"],
-                full_name=user_data["full_name"],
-                hashed_password=get_password_hash(user_data["password"]),
-                role=user_data["role"],
-                is_active=True
-            )
-            db.add(new_user)
-    
-    example_comunicado = db.query(Comunicado).filter(Comunicado.titulo == "Comunicado de Boas-Vindas").first()
-    if not example_comunicado:
-        new_comunicado = Comunicado(
-            titulo="Comunicado de Boas-Vindas",
-            descricao="Bem-vindo(a) ao sistema! Explore as novas funcionalidades.",
-            criado_por="Sistema"
-        )
-        db.add(new_comunicado)
-    
-    example_area = db.query(AreaRestrita).filter(AreaRestrita.nome == "Sala de Servidores").first()
-    if not example_area:
-        new_area = AreaRestrita(
-            nome="Sala de Servidores",
-            descricao="Acesso a servidores críticos.",
-            acesso_liberado_para="administrador,gerente"
-        )
-        db.add(new_area)
-    
-    db.commit()
-
-    bruce = db.query(User).filter(User.full_name == "Bruce Wayne").first()
-    servidores = db.query(AreaRestrita).filter(AreaRestrita.nome == "Sala de Servidores").first()
-
-    if bruce and servidores and 'Solicitacao' in globals():
-        example_solicitacao = db.query(Solicitacao).filter(
-            Solicitacao.usuario_id == bruce.id, 
-            Solicitacao.area_solicitada == servidores.nome
-        ).first()
-        if not example_solicitacao:
-            new_solicitacao = Solicitacao(
-                usuario_id=bruce.id,
-                usuario_nome=bruce.full_name,
-                area_solicitada=servidores.nome,
-                justificativa="Necessário para manutenção de rotina.",
-                status="pendente"
-            )
-            db.add(new_solicitacao)
-            db.commit()
-
-    db.close()
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_user_state_refresh()
+    await encerrar_ingestao()
 
 
 # --- Rotas de Autenticação ---
@@ -164,15 +168,14 @@ async def post_login(
     request: Request,
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Processa o formulário de login."""
-    user = login_user(db, email, password)
+    user = await login_user(db, email, password)
     if user:
         response = RedirectResponse(url="/dashboard", status_code=status.HTTP_302_FOUND) # <-- Uso correto
-        response.set_cookie(key="user", value=user.full_name, httponly=True)
-        response.set_cookie(key="role", value=user.role, httponly=True)
-        response.set_cookie(key="user_id", value=str(user.id), httponly=True)
+        set_user_state(user)
+        response.set_cookie(key=SESSION_COOKIE_NAME, value=create_session_token(user), max_age=SESSION_MAX_AGE, httponly=True, samesite="lax")
         return response
     return templates.TemplateResponse("login.html", {"request": request, "message": "Credenciais inválidas. Verifique seu email e senha."})
 
@@ -181,71 +184,84 @@ async def post_login(
 async def logout():
     """Realiza o logout do usuário, removendo os cookies de sessão."""
     response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND) # <-- Uso correto
-    response.delete_cookie("user")
-    response.delete_cookie("role")
-    response.delete_cookie("user_id")
+    response.delete_cookie(SESSION_COOKIE_NAME)
     return response
 
 
 # --- Rotas do Dashboard ---
 
+# Atalhos do dashboard por role (fixos; os botões são renderizados uma vez por role)
+RECURSOS_POR_ROLE = {
+    "administrador": [
+        {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
+        {"nome": "Acessar Comunicados", "url": "/comunicados"},
+        {"nome": "Buscar Alertas e Comunicados", "url": "/busca"},
+        {"nome": "Gerenciar Usuários", "url": "/usuarios"},
+        {"nome": "Gerenciar Equipe", "url": "/equipe"},
+        {"nome": "Configurar Permissões", "url": "/permissoes"},
+        {"nome": "Relatórios e Análises", "url": "/relatorios"},
+        {"nome": "Gerenciar Recursos", "url": "/recursos"},
+        {"nome": "Gerenciar Áreas Restritas", "url": "/areas"},
+        {"nome": "Gerenciar Solicitações de Acesso", "url": "/solicitacoes"}
+    ],
+    "gerente": [
+        {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
+        {"nome": "Acessar Comunicados", "url": "/comunicados"},
+        {"nome": "Buscar Alertas e Comunicados", "url": "/busca"},
+        {"nome": "Gerenciar Equipe", "url": "/equipe"},
+        {"nome": "Gerar Relatórios", "url": "/relatorios"},
+        {"nome": "Visualizar Recursos", "url": "/recursos"},
+        {"nome": "Visualizar Áreas Restritas", "url": "/areas"},
+        {"nome": "Gerenciar Solicitações de Acesso", "url": "/solicitacoes"}
+    ],
+    "usuario": [
+        {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
+        {"nome": "Acessar Comunicados", "url": "/comunicados"},
+        {"nome": "Buscar Alertas e Comunicados", "url": "/busca"},
+        {"nome": "Solicitar Acesso a Áreas", "url": "/solicitacoes"},
+        {"nome": "Ver Áreas Restritas Disponíveis", "url": "/areas"}
+    ]
+}
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
 async def get_dashboard(request: Request, current_user: User = Depends(get_authenticated_user_db)):
     """Página do dashboard."""
     role = current_user.role
-    user_full_name = current_user.full_name
-    current_server_time = datetime.now() 
-
-    resources_by_role = {
-        "administrador": [
-            {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
-            {"nome": "Acessar Comunicados", "url": "/comunicados"},
-            {"nome": "Gerenciar Usuários", "url": "/usuarios"},
-            {"nome": "Gerenciar Equipe", "url": "/equipe"},
-            {"nome": "Configurar Permissões", "url": "/permissoes"},
-            {"nome": "Relatórios e Análises", "url": "/relatorios"},
-            {"nome": "Gerenciar Recursos", "url": "/recursos"},
-            {"nome": "Gerenciar Áreas Restritas", "url": "/areas"},
-            {"nome": "Gerenciar Solicitações de Acesso", "url": "/solicitacoes"}
-        ],
-        "gerente": [
-            {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
-            {"nome": "Acessar Comunicados", "url": "/comunicados"},
-            {"nome": "Gerenciar Equipe", "url": "/equipe"},
-            {"nome": "Gerar Relatórios", "url": "/relatorios"},
-            {"nome": "Visualizar Recursos", "url": "/recursos"},
-            {"nome": "Visualizar Áreas Restritas", "url": "/areas"},
-            {"nome": "Gerenciar Solicitações de Acesso", "url": "/solicitacoes"}
-        ],
-        "usuario": [
-            {"nome": "Visualizar Alertas de Segurança", "url": "/alertas"},
-            {"nome": "Acessar Comunicados", "url": "/comunicados"},
-            {"nome": "Solicitar Acesso a Áreas", "url": "/solicitacoes"},
-            {"nome": "Ver Áreas Restritas Disponíveis", "url": "/areas"}
-        ]
-    }
-    recursos = resources_by_role.get(role, [])
+    recursos_html = fragmento_em_cache(
+        templates.env, "fragmentos/dashboard_recursos.html", role, {"recursos": RECURSOS_POR_ROLE.get(role, [])}
+    )
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
-        "user": user_full_name,
-        "recursos": recursos,
+        "user": current_user.full_name,
+        "recursos_html": recursos_html,
         "role": role,
-        "current_time": current_server_time 
+        "current_time": datetime.now()
     })
 
 
 # --- CRUD de Áreas Restritas ---
 
 @app.get("/areas", response_class=HTMLResponse)
-async def listar_areas(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_authenticated_user_db)):
-    """Lista todas as áreas restritas."""
-    areas = db.query(AreaRestrita).all()
-    return templates.TemplateResponse("areas.html", {"request": request, "areas": areas, "role": current_user.role})
+async def listar_areas(request: Request, somente_acessiveis: bool = False, db: AsyncSession = Depends(get_async_db_leitura), current_user: User = Depends(get_authenticated_user_db)):
+    """Lista as áreas restritas, indicando (via SQL) quais o usuário pode acessar pela role ou por concessão."""
+    pode_entrar = filtro_acesso_usuario(current_user.id, current_user.role)
+    query = select(AreaRestrita, pode_entrar.label("pode_entrar"))
+    if somente_acessiveis:
+        query = query.filter(pode_entrar)
+    rows = (await db.execute(query)).all()
+    return templates.TemplateResponse("areas.html", {
+        "request": request,
+        "areas": [row.AreaRestrita for row in rows],
+        "areas_acessiveis": {row.AreaRestrita.id for row in rows if row.pode_entrar},
+        "somente_acessiveis": somente_acessiveis,
+        "role": current_user.role
+    })
 
 
 @app.get("/areas/nova", response_class=HTMLResponse)
-async def nova_area_form(request: Request, current_user: User = Depends(admin_required)):
+async def nova_area_form(request: Request, current_user: SessionUser = Depends(admin_required)):
     """Formulário para criar uma nova área restrita (apenas admin)."""
     return templates.TemplateResponse("nova_area.html", {"request": request})
 
@@ -256,25 +272,28 @@ async def criar_area(
     nome: str = Form(...),
     descricao: str = Form(""),
     acesso_liberado_para: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Cria uma nova área restrita."""
+    roles = parse_roles(acesso_liberado_para)
     new_area = AreaRestrita(
         nome=nome,
         descricao=descricao,
-        acesso_liberado_para=acesso_liberado_para
+        acesso_liberado_para=",".join(roles)
     )
     db.add(new_area)
-    db.commit()
-    db.refresh(new_area)
+    await db.flush()
+    await definir_roles_area(db, new_area.id, roles)
+    await db.commit()
+    invalidar_matriz_acesso()
     return RedirectResponse(url="/areas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/areas/{area_id}/editar", response_class=HTMLResponse)
-async def editar_area_form(area_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def editar_area_form(area_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Formulário de edição de área restrita (apenas admin)."""
-    area = db.query(AreaRestrita).filter(AreaRestrita.id == area_id).first()
+    area = (await db.execute(select(AreaRestrita).filter(AreaRestrita.id == area_id))).scalars().first()
     if not area:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Área não encontrada.")
     return templates.TemplateResponse("editar_area.html", {"request": request, "area": area})
@@ -287,42 +306,45 @@ async def editar_area(
     nome: str = Form(...),
     descricao: str = Form(...),
     acesso_liberado_para: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Salva as edições de uma área restrita."""
-    area = db.query(AreaRestrita).filter(AreaRestrita.id == area_id).first()
+    area = (await db.execute(select(AreaRestrita).filter(AreaRestrita.id == area_id))).scalars().first()
     if not area:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Área não encontrada.")
     
+    roles = parse_roles(acesso_liberado_para)
     area.nome = nome
     area.descricao = descricao
-    area.acesso_liberado_para = acesso_liberado_para
-    db.commit()
-    db.refresh(area)
+    area.acesso_liberado_para = ",".join(roles)
+    await definir_roles_area(db, area.id, roles)
+    await db.commit()
+    invalidar_matriz_acesso()
     return RedirectResponse(url="/areas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/areas/{area_id}/excluir")
-async def excluir_area(area_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def excluir_area(area_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Exclui uma área restrita."""
-    area = db.query(AreaRestrita).filter(AreaRestrita.id == area_id).first()
+    area = (await db.execute(select(AreaRestrita).filter(AreaRestrita.id == area_id))).scalars().first()
     if not area:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Área não encontrada.")
-    db.delete(area)
-    db.commit()
+    await db.delete(area)
+    await db.commit()
+    invalidar_matriz_acesso()
     return RedirectResponse(url="/areas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/areas/{area_id}/entrar", response_class=HTMLResponse)
-async def entrar_area(area_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_authenticated_user_db)):
-    """Permite que um usuário entre em uma área restrita se tiver a role necessária."""
-    area = db.query(AreaRestrita).filter(AreaRestrita.id == area_id).first()
+async def entrar_area(area_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_authenticated_user_db)):
+    """Permite que um usuário entre em uma área restrita se tiver a role necessária ou um acesso aprovado."""
+    area = (await db.execute(select(AreaRestrita).filter(AreaRestrita.id == area_id))).scalars().first()
     if not area:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Área não encontrada.")
 
-    allowed_roles = [role.strip() for role in area.acesso_liberado_para.split(",")]
-    if current_user.role not in allowed_roles:
+    if not await usuario_pode_entrar(db, current_user.id, current_user.role, area.id):
+        allowed_roles = sorted(await roles_da_area(db, area.id))
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Acesso não autorizado a esta área para a sua role ({current_user.role}). Roles permitidas: {', '.join(allowed_roles)}.")
 
     return templates.TemplateResponse("area_detalhe.html", {"request": request, "area": area, "user": current_user.full_name})
@@ -331,15 +353,17 @@ async def entrar_area(area_id: int, request: Request, db: Session = Depends(get_
 # --- CRUD de Recursos ---
 
 @app.get("/recursos", response_class=HTMLResponse)
-async def listar_recursos(request: Request, db: Session = Depends(get_db), current_user: User = Depends(manager_or_admin_required)):
-    """Lista todos os recursos (apenas gerente e admin)."""
-    recursos = db.query(Resource).all()
-    current_user_info_for_template = await get_current_user_from_cookies(request) 
-    return templates.TemplateResponse("resources.html", {"request": request, "recursos": recursos, "role": current_user_info_for_template["role"]})
+async def listar_recursos(request: Request, db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(manager_or_admin_required)):
+    """Lista todos os recursos (apenas gerente e admin). A página fica em cache por role até um recurso mudar."""
+    async def carregar():
+        return {"recursos": (await db.execute(select(Resource))).scalars().all()}
+
+    pagina = await pagina_em_cache(templates.env, "resources.html", current_user.role, "recursos", carregar)
+    return resposta_com_etag(request, pagina)
 
 
 @app.get("/recursos/novo", response_class=HTMLResponse)
-async def novo_recurso_form(request: Request, current_user: User = Depends(admin_required)):
+async def novo_recurso_form(request: Request, current_user: SessionUser = Depends(admin_required)):
     """Formulário para criar um novo recurso (apenas admin)."""
     return templates.TemplateResponse("novo_recurso.html", {"request": request})
 
@@ -351,21 +375,21 @@ async def criar_recurso(
     type: str = Form(...),
     description: str = Form(""),
     quantity: int = Form(0),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Cria um novo recurso."""
     recurso = Resource(name=name, type=type, description=description, quantity=quantity, is_active=True)
     db.add(recurso)
-    db.commit()
-    db.refresh(recurso)
+    await db.commit()
+    invalidar_dominio("recursos")
     return RedirectResponse(url="/recursos", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/recursos/{resource_id}/editar", response_class=HTMLResponse)
-async def editar_recurso_form(resource_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def editar_recurso_form(resource_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Formulário de edição de recurso (apenas admin)."""
-    recurso = db.query(Resource).filter(Resource.id == resource_id).first()
+    recurso = (await db.execute(select(Resource).filter(Resource.id == resource_id))).scalars().first()
     if not recurso:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso não encontrado.")
     return templates.TemplateResponse("editar_recurso.html", {"request": request, "recurso": recurso})
@@ -379,11 +403,11 @@ async def salvar_edicao_recurso(
     type: str = Form(...),
     description: str = Form(""),
     quantity: int = Form(0),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Salva as edições de um recurso."""
-    recurso = db.query(Resource).filter(Resource.id == resource_id).first()
+    recurso = (await db.execute(select(Resource).filter(Resource.id == resource_id))).scalars().first()
     if not recurso:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso não encontrado.")
 
@@ -391,37 +415,169 @@ async def salvar_edicao_recurso(
     recurso.type = type
     recurso.description = description
     recurso.quantity = quantity
-    db.commit()
-    db.refresh(recurso)
+    await db.commit()
+    invalidar_dominio("recursos")
     return RedirectResponse(url="/recursos", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/recursos/{resource_id}/excluir")
-async def excluir_recurso(resource_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def excluir_recurso(resource_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Exclui um recurso."""
-    recurso = db.query(Resource).filter(Resource.id == resource_id).first()
+    recurso = (await db.execute(select(Resource).filter(Resource.id == resource_id))).scalars().first()
     if not recurso:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso não encontrado.")
 
-    db.delete(recurso)
-    db.commit()
+    await db.delete(recurso)
+    await db.commit()
+    invalidar_dominio("recursos")
     return RedirectResponse(url="/recursos", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
+@app.post("/recursos/{resource_id}/token-ingestao")
+async def gerar_token_ingestao(resource_id: int, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
+    """Gera o token com que o dispositivo envia alertas para /api/alertas; os tokens anteriores do recurso são revogados."""
+    recurso = (await db.execute(select(Resource).filter(Resource.id == resource_id))).scalars().first()
+    if not recurso:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso não encontrado.")
+    token = await gerar_token(db, resource_id, current_user.full_name)
+    return JSONResponse(
+        {"recurso_id": resource_id, "recurso": recurso.name, "token": token,
+         "aviso": "Guarde este token: ele não será exibido novamente."},
+        headers={"Cache-Control": "no-store"}
+    )
+
+
 # --- CRUD de Alertas ---
 
+ALERTAS_POR_PAGINA = 50
+
+
+def _parse_data_filtro(valor: Optional[str], campo: str) -> Optional[date]:
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Data inválida em '{campo}'. Use o formato AAAA-MM-DD.")
+
+
+def _parse_cursor(cursor: Optional[str]):
+    """O cursor é '<data_criacao ISO>_<id>' do último item da página anterior."""
+    if not cursor:
+        return None
+    try:
+        data_iso, alerta_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(data_iso), int(alerta_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+
+
 @app.get("/alertas", response_class=HTMLResponse)
-async def alertas(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_authenticated_user_db)):
-    """Lista todos os alertas."""
-    alertas_list = db.query(Alert).order_by(Alert.data_criacao.desc()).all()
+async def alertas(
+    request: Request,
+    nivel: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db_leitura),
+    current_user: User = Depends(get_authenticated_user_db)
+):
+    """Lista os alertas com paginação por cursor (data_criacao, id) e filtros por nível e período."""
+    inicio = _parse_data_filtro(data_inicio, "data_inicio")
+    fim = _parse_data_filtro(data_fim, "data_fim")
+    posicao = _parse_cursor(cursor)
+
+    query = select(Alert)
+    if nivel:
+        query = query.filter(Alert.nivel == nivel)
+    if inicio:
+        query = query.filter(Alert.data_criacao >= datetime.combine(inicio, datetime.min.time()))
+    if fim:
+        query = query.filter(Alert.data_criacao < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+    if posicao:
+        ultima_data, ultimo_id = posicao
+        query = query.filter(or_(
+            Alert.data_criacao < ultima_data,
+            and_(Alert.data_criacao == ultima_data, Alert.id < ultimo_id)
+        ))
+    query = query.order_by(Alert.data_criacao.desc(), Alert.id.desc()).limit(ALERTAS_POR_PAGINA + 1)
+
+    alertas_list = (await db.execute(query)).scalars().all()
+
+    filtros = {k: v for k, v in {"nivel": nivel, "data_inicio": data_inicio, "data_fim": data_fim}.items() if v}
+    proxima_pagina = None
+    if len(alertas_list) > ALERTAS_POR_PAGINA:
+        alertas_list = alertas_list[:ALERTAS_POR_PAGINA]
+        ultimo = alertas_list[-1]
+        proxima_pagina = "/alertas?" + urlencode({**filtros, "cursor": f"{ultimo.data_criacao.isoformat()}_{ultimo.id}"})
+
     return templates.TemplateResponse(
         "alertas.html", 
-        {"request": request, "alertas": alertas_list, "role": current_user.role}
+        {
+            "request": request,
+            "alertas": alertas_list,
+            "role": current_user.role,
+            "filtros": filtros,
+            "primeira_pagina": "/alertas?" + urlencode(filtros) if cursor else None,
+            "proxima_pagina": proxima_pagina
+        }
+    )
+
+
+@app.get("/alertas/stream")
+async def alertas_stream(request: Request, current_user: SessionUser = Depends(get_session_user)):
+    """Fluxo Server-Sent Events com alertas criados, editados e excluídos (sem sessão de banco aberta)."""
+    fila = alert_broker.assinar()
+    return StreamingResponse(
+        stream_alertas(fila, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+@app.post("/api/alertas", status_code=status.HTTP_202_ACCEPTED)
+async def ingerir_alertas(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Recebe alertas de dispositivos (um objeto ou uma lista de objetos com titulo, descricao e nivel),
+    autenticados por 'Authorization: Bearer <token>'. Os eventos são gravados em lote logo depois
+    da resposta; 503 com Retry-After indica que a fila está cheia e a requisição deve ser reenviada.
+    """
+    origem = await autenticar_dispositivo(db, request.headers.get("authorization", ""))
+    if not origem:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de ingestão inválido.", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        corpo = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O corpo deve ser um JSON válido.")
+    eventos = corpo if isinstance(corpo, list) else [corpo]
+    if not eventos:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhum evento enviado.")
+    if len(eventos) > INGESTAO_MAX_EVENTOS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Máximo de {INGESTAO_MAX_EVENTOS} eventos por requisição.")
+
+    validos, erros = [], []
+    for indice, evento in enumerate(eventos):
+        try:
+            validos.append(validar_evento(evento))
+        except ValueError as e:
+            erros.append({"indice": indice, "erro": str(e)})
+    if erros:
+        # Nada é enfileirado: o dispositivo corrige e reenvia a requisição inteira
+        return JSONResponse({"detail": "Eventos inválidos.", "erros": erros}, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    try:
+        enfileirar(validos, origem)
+    except FilaCheia:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Fila de ingestão cheia. Tente novamente em instantes.",
+            headers={"Retry-After": str(INGESTAO_RETRY_AFTER)}
+        )
+    return {"aceitos": len(validos)}
+
+
 @app.get("/criar-alerta", response_class=HTMLResponse)
-async def get_criar_alerta(request: Request, current_user: User = Depends(manager_or_admin_required)):
+async def get_criar_alerta(request: Request, current_user: SessionUser = Depends(manager_or_admin_required)):
     """Formulário para criar um novo alerta (apenas gerente e admin)."""
     return templates.TemplateResponse("criar_alerta.html", {"request": request})
 
@@ -432,8 +588,8 @@ async def post_criar_alerta(
     titulo: str = Form(...),
     descricao: str = Form(...),
     nivel: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
     """Cria um novo alerta."""
     alerta = Alert(
@@ -443,15 +599,19 @@ async def post_criar_alerta(
         criado_por=current_user.full_name
     )
     db.add(alerta)
-    db.commit()
-    db.refresh(alerta)
+    await db.flush()
+    await db.refresh(alerta)
+    await registrar_rollup(db, "alertas", alerta.nivel, alerta.data_criacao)
+    await db.commit()
+    indexar_documento(ALERTA, alerta.id, alerta.titulo, alerta.descricao)
+    alert_broker.publicar("criado", alerta_para_evento(alerta))
     return RedirectResponse(url="/alertas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/alertas/{alerta_id}/editar", response_class=HTMLResponse)
-async def editar_alerta_form(alerta_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(manager_or_admin_required)):
+async def editar_alerta_form(alerta_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(manager_or_admin_required)):
     """Formulário de edição de alerta (apenas gerente e admin)."""
-    alerta = db.query(Alert).filter(Alert.id == alerta_id).first()
+    alerta = (await db.execute(select(Alert).filter(Alert.id == alerta_id))).scalars().first()
     if not alerta:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alerta não encontrado.")
     return templates.TemplateResponse("editar_alerta.html", {"request": request, "alerta": alerta})
@@ -463,44 +623,53 @@ async def editar_alerta(
     titulo: str = Form(...),
     descricao: str = Form(...),
     nivel: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
     """Salva as edições de um alerta."""
-    alerta = db.query(Alert).filter(Alert.id == alerta_id).first()
+    alerta = (await db.execute(select(Alert).filter(Alert.id == alerta_id))).scalars().first()
     if not alerta:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alerta não encontrado.")
 
+    await mover_rollup(db, "alertas", alerta.nivel, nivel, alerta.data_criacao)
+    anterior = (alerta.titulo, alerta.descricao)
     alerta.titulo = titulo
     alerta.descricao = descricao
     alerta.nivel = nivel
-    db.commit()
-    db.refresh(alerta)
+    await db.commit()
+    await db.refresh(alerta)
+    indexar_documento(ALERTA, alerta.id, alerta.titulo, alerta.descricao, anterior)
+    esquecer_alerta(alerta.id)
+    alert_broker.publicar("editado", alerta_para_evento(alerta))
     return RedirectResponse(url="/alertas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/alertas/{alerta_id}/excluir")
-async def excluir_alerta(alerta_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(manager_or_admin_required)):
+async def excluir_alerta(alerta_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(manager_or_admin_required)):
     """Exclui um alerta."""
-    alerta = db.query(Alert).filter(Alert.id == alerta_id).first()
+    alerta = (await db.execute(select(Alert).filter(Alert.id == alerta_id))).scalars().first()
     if not alerta:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alerta não encontrado.")
-    db.delete(alerta)
-    db.commit()
+    await registrar_rollup(db, "alertas", alerta.nivel, alerta.data_criacao, -1)
+    await db.delete(alerta)
+    await db.commit()
+    remover_documento(ALERTA, alerta_id, alerta.titulo, alerta.descricao)
+    esquecer_alerta(alerta_id)
+    alert_broker.publicar("excluido", {"id": alerta_id})
     return RedirectResponse(url="/alertas", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 # --- CRUD de Usuários e Permissões ---
 
 @app.get("/usuarios", response_class=HTMLResponse)
-async def usuarios(request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def usuarios(request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Lista todos os usuários (apenas admin)."""
-    users = db.query(User).all()
+    users = (await db.execute(select(User))).scalars().all()
     return templates.TemplateResponse("usuarios.html", {"request": request, "usuarios": users, "role": current_user.role, "usuario_logado_id": current_user.id})
 
 
 @app.get("/adicionar-usuario", response_class=HTMLResponse)
-async def get_add_user(request: Request, current_user: User = Depends(admin_required)):
+async def get_add_user(request: Request, current_user: SessionUser = Depends(admin_required)):
     """Formulário para adicionar um novo usuário (apenas admin)."""
     return templates.TemplateResponse("add_user.html", {"request": request, "message": ""})
 
@@ -512,31 +681,31 @@ async def post_add_user(
     full_name: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Adiciona um novo usuário."""
-    existing_user = db.query(User).filter(User.email == email).first()
+    existing_user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
     if existing_user:
         return templates.TemplateResponse("add_user.html", {"request": request, "message": "Já existe um usuário com este e-mail."})
 
     new_user = User(
         email=email,
         full_name=full_name,
-        hashed_password=get_password_hash(password),
+        hashed_password=await get_password_hash_async(password),
         role=role,
         is_active=True
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return RedirectResponse(url="/usuarios", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/usuarios/{user_id}/desativar")
-async def desativar_usuario(user_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def desativar_usuario(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Desativa um usuário."""
-    user_to_deactivate = db.query(User).filter(User.id == user_id).first()
+    user_to_deactivate = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not user_to_deactivate:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
 
@@ -544,50 +713,56 @@ async def desativar_usuario(user_id: int, request: Request, db: Session = Depend
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Você não pode desativar sua própria conta.")
 
     user_to_deactivate.is_active = False
-    db.commit()
-    db.refresh(user_to_deactivate)
+    await db.commit()
+    await db.refresh(user_to_deactivate)
+    set_user_state(user_to_deactivate)
+    user_cache.invalidate(user_to_deactivate.id)
     return RedirectResponse(url="/usuarios", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/usuarios/{user_id}/ativar")
-async def ativar_usuario(user_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def ativar_usuario(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Ativa um usuário."""
-    user_to_activate = db.query(User).filter(User.id == user_id).first()
+    user_to_activate = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not user_to_activate:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
 
     user_to_activate.is_active = True
-    db.commit()
-    db.refresh(user_to_activate)
+    await db.commit()
+    await db.refresh(user_to_activate)
+    set_user_state(user_to_activate)
+    user_cache.invalidate(user_to_activate.id)
     return RedirectResponse(url="/usuarios", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.post("/usuarios/{user_id}/excluir")
-async def excluir_usuario(user_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def excluir_usuario(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Exclui um usuário."""
-    user_to_delete = db.query(User).filter(User.id == user_id).first()
+    user_to_delete = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not user_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
 
     if user_to_delete.id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Você não pode excluir sua própria conta.")
 
-    db.delete(user_to_delete)
-    db.commit()
+    await db.delete(user_to_delete)
+    await db.commit()
+    forget_user_state(user_to_delete.id)
+    user_cache.invalidate(user_to_delete.id)
     return RedirectResponse(url="/usuarios", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/permissoes", response_class=HTMLResponse)
-async def configurar_permissoes(request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def configurar_permissoes(request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Exibe a página para configurar permissões de usuário (apenas admin)."""
-    usuarios_list = db.query(User).all()
+    usuarios_list = (await db.execute(select(User))).scalars().all()
     return templates.TemplateResponse("permissoes.html", {"request": request, "usuarios": usuarios_list, "role": current_user.role, "usuario_logado_id": current_user.id})
 
 
 @app.post("/permissoes/{user_id}/alterar")
-async def alterar_permissao(user_id: int, novo_role: str = Form(...), db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def alterar_permissao(user_id: int, novo_role: str = Form(...), db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Altera a role de um usuário."""
-    user_to_update = db.query(User).filter(User.id == user_id).first()
+    user_to_update = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not user_to_update:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
     
@@ -598,44 +773,240 @@ async def alterar_permissao(user_id: int, novo_role: str = Form(...), db: Sessio
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Você não pode remover seu próprio acesso de administrador.")
 
     user_to_update.role = novo_role
-    db.commit()
-    db.refresh(user_to_update)
+    await db.commit()
+    await db.refresh(user_to_update)
+    set_user_state(user_to_update)
+    user_cache.invalidate(user_to_update.id)
     return RedirectResponse(url="/permissoes", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
+@app.get("/metricas/hash-pool")
+async def metricas_hash_pool(current_user: SessionUser = Depends(admin_required)):
+    """Métricas do pool de hashing de senhas (apenas admin)."""
+    return get_hash_pool_stats()
+
+
+@app.get("/metricas/db-pool")
+async def metricas_db_pool(current_user: SessionUser = Depends(admin_required)):
+    """Uso do pool de conexões do banco e tempo de espera por conexão (apenas admin)."""
+    return get_pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Métricas no formato do Prometheus. Se METRICS_TOKEN estiver definido, exige 'Authorization: Bearer <token>'."""
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido.")
+    return PlainTextResponse(gerar_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/sql")
+async def debug_sql(current_user: SessionUser = Depends(admin_required)):
+    """Consultas SQL por rota: percentis de duração, tempo de banco e suspeitas de N+1 (apenas admin)."""
+    return get_relatorio_sql()
+
+
+@app.post("/debug/sql/limpar")
+async def debug_sql_limpar(current_user: SessionUser = Depends(admin_required)):
+    """Zera as estatísticas do profiler de SQL (apenas admin)."""
+    limpar_relatorio_sql()
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: 200 se o banco responde, há conexões livres e o esquema está migrado; 503 caso contrário."""
+    motivo = await verificar_prontidao()
+    if motivo == "ok":
+        motivo = await esquema_pendente() or "ok"
+    if motivo != "ok":
+        return JSONResponse({"status": "indisponivel", "motivo": motivo}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ok"}
+
+
+@app.get("/metricas/inicializacao")
+async def metricas_inicializacao(current_user: SessionUser = Depends(admin_required)):
+    """Duração de cada etapa da inicialização deste worker e versão do esquema do banco."""
+    return get_inicializacao_stats()
+
+
+@app.get("/metricas/ingestao")
+async def metricas_ingestao(current_user: SessionUser = Depends(admin_required)):
+    """Fila de ingestão de alertas deste worker: eventos aceitos, recusados, gravados e lotes."""
+    return get_ingestao_stats()
+
+
+@app.get("/metricas/busca")
+async def metricas_busca(current_user: SessionUser = Depends(admin_required)):
+    """Tamanho e estado do índice de busca deste worker."""
+    return get_busca_stats()
+
+
+@app.get("/metricas/cache-usuarios")
+async def metricas_cache_usuarios(current_user: SessionUser = Depends(admin_required)):
+    """Acertos e falhas do cache de usuários autenticados (apenas admin)."""
+    return user_cache.stats()
+
+
+@app.get("/metricas/stream-alertas")
+async def metricas_stream_alertas(current_user: SessionUser = Depends(admin_required)):
+    """Assinantes conectados e descartados do fluxo de alertas (apenas admin)."""
+    return alert_broker.stats()
+
+
+# --- Importação em Massa ---
+
+@app.post("/importar/{tipo}")
+async def importar_dados(
+    tipo: str,
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
+):
+    """
+    Importa recursos, usuários ou áreas a partir de um arquivo CSV ou JSON Lines (apenas admin).
+    Retorna a quantidade inserida e os erros por linha; linhas inválidas não interrompem a carga.
+    """
+    if tipo not in TIPOS_IMPORTACAO:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Tipo de importação inválido. Use: {', '.join(TIPOS_IMPORTACAO)}.")
+    try:
+        formato = detectar_formato(arquivo.filename, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    resultado = await importar(db, tipo, ler_registros(arquivo.file, formato))
+    if tipo == "recursos" and resultado["inseridos"]:
+        invalidar_dominio("recursos")
+    return resultado
+
+
+# --- Exportação em Streaming ---
+
+@app.get("/exportar/{tipo}")
+async def exportar_dados(
+    tipo: str,
+    formato: str = "csv",
+    campos: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    gzip: bool = False,
+    incluir_arquivo: bool = True,
+    current_user: SessionUser = Depends(admin_required)
+):
+    """
+    Exporta alertas, solicitações, recursos ou usuários em CSV ou NDJSON (apenas admin),
+    com seleção de campos, filtro por período e compressão gzip opcional. Para alertas,
+    inclui os meses arquivados do período (incluir_arquivo=false exporta só a tabela).
+    """
+    if tipo not in EXPORTAVEIS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Tipo de exportação inválido. Use: {', '.join(EXPORTAVEIS)}.")
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Formato inválido. Use: {', '.join(FORMATOS_EXPORTACAO)}.")
+    try:
+        campos_exportados = resolver_campos(tipo, campos)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    inicio = _parse_data_filtro(data_inicio, "data_inicio")
+    fim = _parse_data_filtro(data_fim, "data_fim")
+    nome_arquivo = f"{tipo}.{formato}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+
+    return StreamingResponse(
+        gerar_exportacao(
+            tipo, campos_exportados, formato,
+            datetime.combine(inicio, datetime.min.time()) if inicio else None,
+            datetime.combine(fim + timedelta(days=1), datetime.min.time()) if fim else None,
+            comprimir=gzip,
+            incluir_arquivo=incluir_arquivo
+        ),
+        media_type="application/gzip" if gzip else FORMATOS_EXPORTACAO[formato],
+        headers=headers
+    )
+
+
+@app.get("/alertas/arquivos")
+async def listar_arquivos_alertas(db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(admin_required)):
+    """Meses de alertas arquivados fora da tabela alerts (apenas admin); o conteúdo sai em /exportar/alertas."""
+    partes = (await db.execute(consulta_partes(concluidas=False))).scalars().all()
+    arquivos = []
+    for parte in partes:
+        inicio = datetime.strptime(parte.mes, "%Y-%m")
+        ultimo_dia = (proximo_mes(inicio) - timedelta(days=1)).date().isoformat()
+        arquivos.append({
+            "mes": parte.mes, "parte": parte.parte, "linhas": parte.linhas,
+            "tamanho_bytes": parte.tamanho_bytes, "status": parte.status,
+            "exportar": "/exportar/alertas?" + urlencode({"formato": "ndjson", "data_inicio": f"{parte.mes}-01", "data_fim": ultimo_dia}),
+        })
+    return {"retencao_meses": ALERTAS_RETENCAO_MESES, "arquivos": arquivos}
+
+
 # --- Rotas de Relatórios ---
 
 @app.get("/relatorios", response_class=HTMLResponse)
-async def relatorios(request: Request, db: Session = Depends(get_db), current_user: User = Depends(manager_or_admin_required)):
+async def relatorios(request: Request, db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(manager_or_admin_required)):
     """Página de relatórios (apenas gerente e admin)."""
-    total_alertas = db.query(Alert).count()
-    alertas_criticos = db.query(Alert).filter(Alert.nivel == "crítico").count()
-    total_recursos = db.query(Resource).count()
-    total_usuarios = db.query(User).count()
-    total_areas = db.query(AreaRestrita).count()
-
-    current_user_info_for_template = await get_current_user_from_cookies(request) 
+    metricas = await get_metricas_gerais(db)
 
     return templates.TemplateResponse("relatorios.html", {
         "request": request,
-        "total_alertas": total_alertas,
-        "alertas_criticos": alertas_criticos,
-        "total_recursos": total_recursos,
-        "total_usuarios": total_usuarios,
-        "total_areas": total_areas,
-        "role": current_user_info_for_template["role"]
+        "total_alertas": metricas["total_alertas"],
+        "alertas_criticos": metricas["alertas_criticos"],
+        "total_recursos": metricas["total_recursos"],
+        "total_usuarios": metricas["total_usuarios"],
+        "total_areas": metricas["total_areas"],
+        "alertas_arquivados": metricas["alertas_arquivados"],
+        "intervalo_atualizacao": int(METRICS_SNAPSHOT_TTL),
+        "role": current_user.role
     })
 
 
+@app.get("/relatorios/dados")
+async def relatorios_dados(db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(manager_or_admin_required)):
+    """Métricas gerais em JSON para o gráfico da página de relatórios (apenas gerente e admin)."""
+    return await get_metricas_gerais(db)
+
+
+@app.get("/relatorios/series")
+async def relatorios_series(
+    serie: str = "alertas",
+    granularidade: str = "dia",
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db_leitura),
+    current_user: SessionUser = Depends(manager_or_admin_required)
+):
+    """
+    Série temporal de alertas por nível ou de solicitações por status, agregada por hora, dia ou semana
+    (apenas gerente e admin). Sem datas, retorna os últimos 30 dias.
+    """
+    if serie not in SERIES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Série inválida. Use: {', '.join(SERIES)}.")
+    if granularidade not in GRANULARIDADES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Granularidade inválida. Use: {', '.join(GRANULARIDADES)}.")
+
+    fim = _parse_data_filtro(data_fim, "data_fim") or date.today()
+    inicio = _parse_data_filtro(data_inicio, "data_inicio") or fim - timedelta(days=29)
+    try:
+        return await get_serie_temporal(
+            db, serie, granularidade,
+            datetime.combine(inicio, datetime.min.time()),
+            datetime.combine(fim + timedelta(days=1), datetime.min.time())
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 # --- Gerenciamento de Equipe ---
 
 @app.get("/equipe", response_class=HTMLResponse)
-async def equipe(request: Request, db: Session = Depends(get_db), current_user: User = Depends(manager_or_admin_required)):
+async def equipe(request: Request, db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(manager_or_admin_required)):
     """Página de equipe com informações de todos os usuários (visível por gerentes e administradores)."""
     if current_user.role not in ["administrador", "gerente"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito.")
     
-    equipe_list = db.query(User).all()
+    equipe_list = (await db.execute(select(User))).scalars().all()
     return templates.TemplateResponse("equipe.html", {
         "request": request,
         "equipe": equipe_list,
@@ -648,11 +1019,11 @@ async def equipe(request: Request, db: Session = Depends(get_db), current_user:
 async def alternar_status_usuario_equipe(
     user_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
     """Ativa ou desativa um membro da equipe (permitido para gerentes e admins, menos eles mesmos)."""
-    usuario_to_update = db.query(User).filter(User.id == user_id).first()
+    usuario_to_update = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not usuario_to_update:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
     
@@ -660,8 +1031,10 @@ async def alternar_status_usuario_equipe(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Você não pode alterar seu próprio status.")
 
     usuario_to_update.is_active = not usuario_to_update.is_active
-    db.commit()
-    db.refresh(usuario_to_update)
+    await db.commit()
+    await db.refresh(usuario_to_update)
+    set_user_state(usuario_to_update)
+    user_cache.invalidate(usuario_to_update.id)
     return RedirectResponse(url="/equipe", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
@@ -669,36 +1042,37 @@ async def alternar_status_usuario_equipe(
 async def excluir_membro_equipe(
     user_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
-    usuario_to_delete = db.query(User).filter(User.id == user_id).first()
+    usuario_to_delete = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
     if not usuario_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
     
     if usuario_to_delete.id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Você não pode excluir sua própria conta.")
 
-    db.delete(usuario_to_delete)
-    db.commit()
+    await db.delete(usuario_to_delete)
+    await db.commit()
+    forget_user_state(usuario_to_delete.id)
+    user_cache.invalidate(usuario_to_delete.id)
     return RedirectResponse(url="/equipe", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 # --- CRUD de Comunicados ---
 
 @app.get("/comunicados", response_class=HTMLResponse)
-async def listar_comunicados(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_authenticated_user_db)):
-    """Lista comunicados - aberto para qualquer usuário autenticado."""
-    comunicados = db.query(Comunicado).order_by(Comunicado.data_criacao.desc()).all()
-    return templates.TemplateResponse("comunicados.html", {
-        "request": request,
-        "comunicados": comunicados,
-        "role": current_user.role
-    })
+async def listar_comunicados(request: Request, db: AsyncSession = Depends(get_async_db_leitura), current_user: SessionUser = Depends(get_session_user)):
+    """Lista comunicados - aberto para qualquer usuário autenticado. A página fica em cache por role até um comunicado mudar."""
+    async def carregar():
+        return {"comunicados": (await db.execute(select(Comunicado).order_by(Comunicado.data_criacao.desc()))).scalars().all()}
+
+    pagina = await pagina_em_cache(templates.env, "comunicados.html", current_user.role, "comunicados", carregar)
+    return resposta_com_etag(request, pagina)
 
 
 @app.get("/comunicados/novo", response_class=HTMLResponse)
-async def novo_comunicado_form(request: Request, current_user: User = Depends(manager_or_admin_required)):
+async def novo_comunicado_form(request: Request, current_user: SessionUser = Depends(manager_or_admin_required)):
     """Formulário para novo comunicado - só gerente e administrador."""
     return templates.TemplateResponse("novo_comunicado.html", {"request": request})
 
@@ -708,8 +1082,8 @@ async def criar_comunicado(
     request: Request,
     titulo: str = Form(...),
     descricao: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
     """Cria comunicado - só gerente e administrador."""
     comunicado_obj = Comunicado(
@@ -718,15 +1092,16 @@ async def criar_comunicado(
         criado_por=current_user.full_name
     )
     db.add(comunicado_obj)
-    db.commit()
-    db.refresh(comunicado_obj)
+    await db.commit()
+    invalidar_dominio("comunicados")
+    indexar_documento(COMUNICADO, comunicado_obj.id, titulo, descricao)
     return RedirectResponse(url="/comunicados", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
 @app.get("/comunicados/{comunicado_id}/editar", response_class=HTMLResponse)
-async def editar_comunicado_form(comunicado_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
+async def editar_comunicado_form(comunicado_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: SessionUser = Depends(admin_required)):
     """Formulário para editar comunicado - só administrador."""
-    comunicado = db.query(Comunicado).filter(Comunicado.id == comunicado_id).first()
+    comunicado = (await db.execute(select(Comunicado).filter(Comunicado.id == comunicado_id))).scalars().first()
     if not comunicado:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comunicado não encontrado.")
     
@@ -739,52 +1114,158 @@ async def editar_comunicado(
     request: Request,
     titulo: str = Form(...),
     descricao: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
     """Salvar edição do comunicado - só administrador."""
-    comunicado = db.query(Comunicado).filter(Comunicado.id == comunicado_id).first()
+    comunicado = (await db.execute(select(Comunicado).filter(Comunicado.id == comunicado_id))).scalars().first()
     if not comunicado:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comunicado não encontrado.")
     
+    anterior = (comunicado.titulo, comunicado.descricao)
     comunicado.titulo = titulo
     comunicado.descricao = descricao
-    db.commit()
-    db.refresh(comunicado)
+    await db.commit()
+    invalidar_dominio("comunicados")
+    indexar_documento(COMUNICADO, comunicado_id, titulo, descricao, anterior)
     return RedirectResponse(url="/comunicados", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 @app.post("/comunicados/{comunicado_id}/excluir")
 async def excluir_comunicado(
     comunicado_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(admin_required)
 ):
-    comunicado = db.query(Comunicado).filter(Comunicado.id == comunicado_id).first()
+    comunicado = (await db.execute(select(Comunicado).filter(Comunicado.id == comunicado_id))).scalars().first()
     if not comunicado:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comunicado não encontrado.")
     
-    db.delete(comunicado)
-    db.commit()
+    await db.delete(comunicado)
+    await db.commit()
+    invalidar_dominio("comunicados")
+    remover_documento(COMUNICADO, comunicado_id, comunicado.titulo, comunicado.descricao)
     return RedirectResponse(url="/comunicados", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
+
+# --- Busca em Alertas e Comunicados ---
+
+async def _executar_busca(db: AsyncSession, q: str, tipo: str, pagina: int) -> dict:
+    """Consulta o índice (app/search.py) e carrega do banco os documentos da página, na ordem do ranking."""
+    if tipo != "todos" and tipo not in TIPOS_BUSCA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tipo de busca inválido. Use todos, alertas ou comunicados.")
+    if pagina < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Página inválida.")
+
+    await garantir_indice()
+    total, encontrados = buscar(q, TIPOS_BUSCA.get(tipo), (pagina - 1) * RESULTADOS_POR_PAGINA, RESULTADOS_POR_PAGINA)
+
+    ids = {ALERTA: [], COMUNICADO: []}
+    for chave, _ in encontrados:
+        ids[chave & 1].append(chave >> 1)
+    documentos = {}
+    if ids[ALERTA]:
+        for alerta in (await db.execute(select(Alert).filter(Alert.id.in_(ids[ALERTA])))).scalars():
+            documentos[(ALERTA, alerta.id)] = {"tipo": "alerta", "nivel": alerta.nivel, "objeto": alerta}
+    if ids[COMUNICADO]:
+        for comunicado in (await db.execute(select(Comunicado).filter(Comunicado.id.in_(ids[COMUNICADO])))).scalars():
+            documentos[(COMUNICADO, comunicado.id)] = {"tipo": "comunicado", "nivel": None, "objeto": comunicado}
+
+    resultados = []
+    for chave, pontuacao in encontrados:
+        documento = documentos.get((chave & 1, chave >> 1))
+        if documento is None:
+            continue  # excluído por outro worker desde a última atualização do índice
+        objeto = documento["objeto"]
+        resultados.append({
+            "tipo": documento["tipo"],
+            "id": objeto.id,
+            "titulo": objeto.titulo,
+            "trecho": objeto.descricao if len(objeto.descricao) <= 240 else objeto.descricao[:240].rstrip() + "…",
+            "nivel": documento["nivel"],
+            "criado_por": objeto.criado_por,
+            "data_criacao": objeto.data_criacao.isoformat() if objeto.data_criacao else None,
+            "pontuacao": round(pontuacao, 3)
+        })
+
+    return {
+        "q": q,
+        "tipo": tipo,
+        "pagina": pagina,
+        "por_pagina": RESULTADOS_POR_PAGINA,
+        "total": total,
+        "paginas": (total + RESULTADOS_POR_PAGINA - 1) // RESULTADOS_POR_PAGINA,
+        "resultados": resultados
+    }
+
+
+@app.get("/busca", response_class=HTMLResponse)
+async def busca(
+    request: Request,
+    q: str = "",
+    tipo: str = "todos",
+    pagina: int = 1,
+    db: AsyncSession = Depends(get_async_db_leitura),
+    current_user: SessionUser = Depends(get_session_user)
+):
+    """Busca textual em alertas e comunicados, com ranking, prefixos e sem distinção de acentos."""
+    dados = await _executar_busca(db, q, tipo, pagina) if q.strip() else None
+
+    def link_pagina(numero: int) -> str:
+        return "/busca?" + urlencode({"q": q, "tipo": tipo, "pagina": numero})
+
+    return templates.TemplateResponse("busca.html", {
+        "request": request,
+        "role": current_user.role,
+        "q": q,
+        "tipo": tipo,
+        "dados": dados,
+        "pagina_anterior": link_pagina(pagina - 1) if dados and pagina > 1 else None,
+        "proxima_pagina": link_pagina(pagina + 1) if dados and pagina < dados["paginas"] else None
+    })
+
+
+@app.get("/busca/dados")
+async def busca_dados(
+    q: str,
+    tipo: str = "todos",
+    pagina: int = 1,
+    db: AsyncSession = Depends(get_async_db_leitura),
+    current_user: SessionUser = Depends(get_session_user)
+):
+    """Mesma busca de /busca em JSON."""
+    return await _executar_busca(db, q, tipo, pagina)
+
+
 # --- Gerenciamento de Solicitações de Acesso ---
 
+SOLICITACOES_POR_PAGINA = 50
+
+
+async def _areas_solicitaveis(db: AsyncSession, user: User):
+    """Áreas às quais o usuário ainda não tem acesso, nem pela role nem por concessão (filtradas no banco)."""
+    return (await db.execute(select(AreaRestrita).filter(~filtro_acesso_usuario(user.id, user.role)))).scalars().all()
+
+
+STATUS_SOLICITACAO = ["pendente", "aprovada", "rejeitada"]
+
+
 @app.get("/solicitacoes", response_class=HTMLResponse)
 async def get_solicitacoes(
     request: Request,
-    db: Session = Depends(get_db),
+    status_filtro: str = "pendente",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_authenticated_user_db)
 ):
     """
     Página para usuários solicitarem acesso ou para admins/gerentes gerenciarem solicitações.
-    Apresenta o formulário de solicitação para "usuario" e a lista de solicitações para "gerente" e "administrador".
+    Apresenta o formulário de solicitação para "usuario" e, para "gerente" e "administrador",
+    a fila paginada de solicitações de um status (pendentes primeiro, das mais antigas às mais novas).
     """
-    
-    areas_disponiveis = db.query(AreaRestrita).all()
-
     if current_user.role == "usuario":
+        areas_disponiveis = await _areas_solicitaveis(db, current_user)
         return templates.TemplateResponse("solicitacoes.html", {
             "request": request,
             "areas_disponiveis": areas_disponiveis,
@@ -793,16 +1274,54 @@ async def get_solicitacoes(
             "message_type": ""
         })
     elif current_user.role in ["administrador", "gerente"]:
-        if 'Solicitacao' in globals():
-            solicitacoes_list = db.query(Solicitacao).order_by(Solicitacao.data_criacao.desc()).all()
+        if status_filtro not in STATUS_SOLICITACAO:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Status inválido. Use: {', '.join(STATUS_SOLICITACAO)}.")
+        posicao = _parse_cursor(cursor)
+
+        # Pendentes em ordem de chegada (fila); processadas das mais recentes às mais antigas
+        mais_antigas_primeiro = status_filtro == "pendente"
+        query = (
+            select(Solicitacao)
+            .options(joinedload(Solicitacao.solicitante))
+            .filter(Solicitacao.status == status_filtro)
+        )
+        if posicao:
+            ultima_data, ultimo_id = posicao
+            if mais_antigas_primeiro:
+                query = query.filter(or_(
+                    Solicitacao.data_criacao > ultima_data,
+                    and_(Solicitacao.data_criacao == ultima_data, Solicitacao.id > ultimo_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    Solicitacao.data_criacao < ultima_data,
+                    and_(Solicitacao.data_criacao == ultima_data, Solicitacao.id < ultimo_id)
+                ))
+        if mais_antigas_primeiro:
+            query = query.order_by(Solicitacao.data_criacao.asc(), Solicitacao.id.asc())
         else:
-            solicitacoes_list = []
-            print("WARNING: Solicitacao model not available. Check app/models.py import.")
+            query = query.order_by(Solicitacao.data_criacao.desc(), Solicitacao.id.desc())
+        solicitacoes_list = (await db.execute(query.limit(SOLICITACOES_POR_PAGINA + 1))).scalars().all()
+
+        proxima_pagina = None
+        if len(solicitacoes_list) > SOLICITACOES_POR_PAGINA:
+            solicitacoes_list = solicitacoes_list[:SOLICITACOES_POR_PAGINA]
+            ultima = solicitacoes_list[-1]
+            proxima_pagina = "/solicitacoes?" + urlencode({"status_filtro": status_filtro, "cursor": f"{ultima.data_criacao.isoformat()}_{ultima.id}"})
+
+        contagens = dict.fromkeys(STATUS_SOLICITACAO, 0)
+        contagens.update((await db.execute(
+            select(Solicitacao.status, func.count()).group_by(Solicitacao.status)
+        )).all())
 
         return templates.TemplateResponse("solicitacoes_admin.html", {
             "request": request,
             "solicitacoes": solicitacoes_list,
-            "role": current_user.role
+            "role": current_user.role,
+            "status_filtro": status_filtro,
+            "contagens": contagens,
+            "primeira_pagina": "/solicitacoes?" + urlencode({"status_filtro": status_filtro}) if cursor else None,
+            "proxima_pagina": proxima_pagina
         })
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado para esta página.")
@@ -814,12 +1333,12 @@ async def create_solicitacao(
     area_id: int = Form(...),
     justificativa: str = Form(...),
     current_user: User = Depends(get_authenticated_user_db),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Processa a submissão de uma nova solicitação de acesso de um usuário."""
-    area = db.query(AreaRestrita).filter(AreaRestrita.id == area_id).first()
+    area = (await db.execute(select(AreaRestrita).filter(AreaRestrita.id == area_id))).scalars().first()
     if not area:
-        areas = db.query(AreaRestrita).all()
+        areas = await _areas_solicitaveis(db, current_user)
         return templates.TemplateResponse("solicitacoes.html", {
             "request": request,
             "areas_disponiveis": areas,
@@ -828,9 +1347,8 @@ async def create_solicitacao(
             "message_type": "error"
         })
 
-    allowed_roles_for_area = [r.strip() for r in area.acesso_liberado_para.split(",")]
-    if current_user.role in allowed_roles_for_area:
-        areas = db.query(AreaRestrita).all()
+    if await usuario_pode_entrar(db, current_user.id, current_user.role, area.id):
+        areas = await _areas_solicitaveis(db, current_user)
         return templates.TemplateResponse("solicitacoes.html", {
             "request": request,
             "areas_disponiveis": areas,
@@ -839,14 +1357,15 @@ async def create_solicitacao(
             "message_type": "info"
         })
 
-    existing_solicitation = db.query(Solicitacao).filter(
+    result = await db.execute(select(Solicitacao).filter(
         Solicitacao.usuario_id == current_user.id,
-        Solicitacao.area_solicitada == area.nome,
+        Solicitacao.area_id == area.id,
         Solicitacao.status == "pendente"
-    ).first()
+    ))
+    existing_solicitation = result.scalars().first()
 
     if existing_solicitation:
-        areas = db.query(AreaRestrita).all()
+        areas = await _areas_solicitaveis(db, current_user)
         return templates.TemplateResponse("solicitacoes.html", {
             "request": request,
             "areas_disponiveis": areas,
@@ -857,16 +1376,18 @@ async def create_solicitacao(
 
     nova_solicitacao = Solicitacao(
         usuario_id=current_user.id,
-        usuario_nome=current_user.full_name,
+        area_id=area.id,
         area_solicitada=area.nome,
         justificativa=justificativa,
         status="pendente"
     )
     db.add(nova_solicitacao)
-    db.commit()
-    db.refresh(nova_solicitacao)
+    await db.flush()
+    await db.refresh(nova_solicitacao)
+    await registrar_rollup(db, "solicitacoes", nova_solicitacao.status, nova_solicitacao.data_criacao)
+    await db.commit()
 
-    areas = db.query(AreaRestrita).all()
+    areas = await _areas_solicitaveis(db, current_user)
     return templates.TemplateResponse("solicitacoes.html", {
         "request": request,
         "areas_disponiveis": areas,
@@ -876,24 +1397,38 @@ async def create_solicitacao(
     })
 
 
+async def _processar_uma_solicitacao(db: AsyncSession, solicitacao_id: int, acao: str, current_user: SessionUser, validade_dias: Optional[int] = None):
+    """Processa uma única solicitação pelo mesmo caminho do lote, convertendo o resultado em erro HTTP."""
+    try:
+        resultado = (await processar_solicitacoes(
+            db, acao, [solicitacao_id], processado_por=current_user.full_name, validade_dias=validade_dias
+        ))[solicitacao_id]
+    except ConflitoConcorrencia as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if resultado == "nao_encontrada":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitação não encontrada.")
+    if resultado == "ja_processada":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A solicitação já foi processada.")
+    if resultado == "area_inexistente":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A área desta solicitação não existe mais.")
+
+
+def _validar_validade(validade_dias: Optional[int]):
+    if validade_dias is not None and validade_dias <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A validade deve ser um número positivo de dias.")
+
+
 @app.post("/solicitacoes/{solicitacao_id}/aprovar")
 async def aprovar_solicitacao(
     solicitacao_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    validade_dias: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
-    """Aprova uma solicitação de acesso."""
-    solicitacao = db.query(Solicitacao).filter(Solicitacao.id == solicitacao_id).first()
-    if not solicitacao:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitação não encontrada.")
-    
-    if solicitacao.status != "pendente":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A solicitação já foi processada.")
-
-    solicitacao.status = "aprovada"
-    db.commit()
-    db.refresh(solicitacao)
+    """Aprova uma solicitação de acesso e concede ao usuário o acesso à área (opcionalmente com validade)."""
+    _validar_validade(validade_dias)
+    await _processar_uma_solicitacao(db, solicitacao_id, "aprovar", current_user, validade_dias)
     return RedirectResponse(url="/solicitacoes", status_code=status.HTTP_302_FOUND) # <-- Uso correto
 
 
@@ -901,18 +1436,46 @@ async def aprovar_solicitacao(
 async def rejeitar_solicitacao(
     solicitacao_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(manager_or_admin_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
 ):
     """Rejeita uma solicitação de acesso."""
-    solicitacao = db.query(Solicitacao).filter(Solicitacao.id == solicitacao_id).first()
-    if not solicitacao:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitação não encontrada.")
-    
-    if solicitacao.status != "pendente":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A solicitação já foi processada.")
-
-    solicitacao.status = "rejeitada"
-    db.commit()
-    db.refresh(solicitacao)
+    await _processar_uma_solicitacao(db, solicitacao_id, "rejeitar", current_user)
     return RedirectResponse(url="/solicitacoes", status_code=status.HTTP_302_FOUND) # <-- Uso correto
+
+
+@app.post("/solicitacoes/lote")
+async def processar_solicitacoes_lote(
+    acao: str = Form(...),
+    ids: List[int] = Form([]),
+    todas_pendentes: bool = Form(False),
+    area_id: Optional[int] = Form(None),
+    validade_dias: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: SessionUser = Depends(manager_or_admin_required)
+):
+    """
+    Aprova ou rejeita várias solicitações em uma transação: as dos `ids` informados ou, com
+    `todas_pendentes`, as pendentes mais antigas (opcionalmente só as de `area_id`).
+    Retorna em JSON o resultado de cada ID.
+    """
+    if acao not in ACOES_LOTE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Ação inválida. Use: {', '.join(ACOES_LOTE)}.")
+    _validar_validade(validade_dias)
+    if not todas_pendentes and not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe os IDs das solicitações ou marque todas as pendentes.")
+    if len(ids) > LOTE_MAX_SOLICITACOES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No máximo {LOTE_MAX_SOLICITACOES} solicitações por lote.")
+
+    try:
+        resultados = await processar_solicitacoes(
+            db, acao, None if todas_pendentes else list(dict.fromkeys(ids)), area_id,
+            processado_por=current_user.full_name, validade_dias=validade_dias
+        )
+    except ConflitoConcorrencia as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {
+        "acao": acao,
+        "processadas": sum(1 for resultado in resultados.values() if resultado == ACOES_LOTE[acao]),
+        "resultados": resultados
+    }
@@ -0,0 +1,197 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+from app.profiler import tempo_db_atual
+
+# --- Métricas no formato de exposição do Prometheus (/metrics) ---
+# Sem dependências externas e sem locks: todos os contadores são alterados apenas na thread
+# do event loop (a duração do bcrypt é medida no worker e registrada de volta no loop).
+# Os rótulos de cada rota são montados uma única vez, na primeira requisição da rota;
+# por requisição há apenas dois perf_counter, uma busca em dicionário e alguns incrementos.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BCRYPT = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)
+
+
+class Histograma:
+    __slots__ = ("limites", "contagens", "soma")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # o último é o +Inf
+        self.soma = 0.0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+
+    def exportar(self, nome: str, rotulos: str = "") -> list:
+        linhas = []
+        acumulado = 0
+        separador = "," if rotulos else ""
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            linhas.append(f'{nome}_bucket{{{rotulos}{separador}le="{limite}"}} {acumulado}')
+        acumulado += self.contagens[-1]
+        linhas.append(f'{nome}_bucket{{{rotulos}{separador}le="+Inf"}} {acumulado}')
+        sufixo = f"{{{rotulos}}}" if rotulos else ""
+        linhas.append(f"{nome}_sum{sufixo} {self.soma}")
+        linhas.append(f"{nome}_count{sufixo} {acumulado}")
+        return linhas
+
+
+class _MetricasRota:
+    __slots__ = ("rotulos", "duracao", "status", "tempo_db")
+
+    def __init__(self, rotulos: str):
+        self.rotulos = rotulos
+        self.duracao = Histograma(BUCKETS_HTTP)
+        self.status = [0] * 6  # respostas por classe: índice 1 = 1xx ... 5 = 5xx
+        self.tempo_db = 0.0
+
+
+_por_rota: Dict[int, _MetricasRota] = {}
+_sem_rota = _MetricasRota('metodo="",rota="<sem rota>"')
+_em_andamento = 0
+bcrypt_verificacao = Histograma(BUCKETS_BCRYPT)
+logins = {"sucesso": 0, "falha": 0}
+
+
+def _metricas_da_rota(rota) -> _MetricasRota:
+    # As rotas não são hashable (definem __eq__), mas vivem enquanto a aplicação viver: usa o id
+    metricas = _por_rota.get(id(rota))
+    if metricas is None:
+        if rota is None:
+            return _sem_rota
+        metodos = ",".join(sorted(getattr(rota, "methods", None) or ()))
+        metricas = _por_rota[id(rota)] = _MetricasRota(f'metodo="{metodos}",rota="{getattr(rota, "path", "")}"')
+    return metricas
+
+
+def registrar_login(sucesso: bool):
+    logins["sucesso" if sucesso else "falha"] += 1
+
+
+class MetricasMiddleware:
+    """Middleware ASGI que mede duração, status, tempo de banco e requisições em andamento por rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _em_andamento
+        _em_andamento += 1
+        inicio = time.perf_counter()
+        status_resposta = 500
+
+        async def send_com_status(message):
+            nonlocal status_resposta
+            if message["type"] == "http.response.start":
+                status_resposta = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            _em_andamento -= 1
+            metricas = _metricas_da_rota(scope.get("route"))
+            metricas.duracao.observar(time.perf_counter() - inicio)
+            metricas.status[min(status_resposta // 100, 5)] += 1
+            metricas.tempo_db += tempo_db_atual()
+
+
+def _metrica(linhas: list, nome: str, tipo: str, ajuda: str):
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} {tipo}")
+
+
+def gerar_metricas() -> str:
+    """Texto no formato de exposição do Prometheus com HTTP, banco, bcrypt, logins, inicialização e caches."""
+    from app.auth import get_hash_pool_stats, user_cache
+    from app.access import grant_cache
+    from app.database import get_pool_stats
+    from app import search
+    from app.ingestion import get_ingestao_stats
+    from app.startup import get_inicializacao_stats
+
+    linhas = []
+    rotas = list(_por_rota.values()) + [_sem_rota]
+
+    _metrica(linhas, "wayne_http_duracao_segundos", "histogram", "Duração das requisições HTTP por rota.")
+    for metricas in rotas:
+        linhas.extend(metricas.duracao.exportar("wayne_http_duracao_segundos", metricas.rotulos))
+    _metrica(linhas, "wayne_http_respostas_total", "counter", "Respostas HTTP por rota e classe de status.")
+    for metricas in rotas:
+        for classe in range(1, 6):
+            if metricas.status[classe]:
+                linhas.append(f'wayne_http_respostas_total{{{metricas.rotulos},status="{classe}xx"}} {metricas.status[classe]}')
+    _metrica(linhas, "wayne_http_tempo_db_segundos_total", "counter", "Tempo gasto em consultas SQL por rota.")
+    for metricas in rotas:
+        linhas.append(f"wayne_http_tempo_db_segundos_total{{{metricas.rotulos}}} {metricas.tempo_db}")
+    _metrica(linhas, "wayne_http_em_andamento", "gauge", "Requisições HTTP em andamento.")
+    linhas.append(f"wayne_http_em_andamento {_em_andamento}")
+
+    pools = get_pool_stats()
+    pools_por_nome = [("sync", pools["sync"]), ("async", pools["async"])]
+    pools_por_nome += [(f"replica_{i}", replica) for i, replica in enumerate(pools["replicas"])]
+    for nome, chave, tipo, ajuda in (
+        ("wayne_db_pool_em_uso", "em_uso", "gauge", "Conexões do pool em uso."),
+        ("wayne_db_pool_disponiveis", "disponiveis", "gauge", "Conexões ociosas no pool."),
+        ("wayne_db_pool_overflow", "overflow", "gauge", "Conexões em overflow (negativo = abaixo do tamanho do pool)."),
+        ("wayne_db_pool_checkouts_total", "checkouts", "counter", "Conexões retiradas do pool."),
+        ("wayne_db_pool_timeouts_total", "timeouts", "counter", "Checkouts que esgotaram o pool_timeout."),
+    ):
+        _metrica(linhas, nome, tipo, ajuda)
+        for engine, stats in pools_por_nome:
+            if chave in stats:
+                linhas.append(f'{nome}{{engine="{engine}"}} {stats[chave]}')
+    _metrica(linhas, "wayne_db_pool_espera_segundos_total", "counter", "Tempo total de espera por conexão.")
+    for engine, stats in pools_por_nome:
+        linhas.append(f'wayne_db_pool_espera_segundos_total{{engine="{engine}"}} {stats["espera_total_ms"] / 1000}')
+
+    _metrica(linhas, "wayne_bcrypt_verificacao_segundos", "histogram", "Duração das verificações de senha (bcrypt).")
+    linhas.extend(bcrypt_verificacao.exportar("wayne_bcrypt_verificacao_segundos"))
+    hash_pool = get_hash_pool_stats()
+    _metrica(linhas, "wayne_hash_pool_pendentes", "gauge", "Tarefas de hashing na fila ou em execução.")
+    linhas.append(f"wayne_hash_pool_pendentes {hash_pool['pendentes']}")
+    _metrica(linhas, "wayne_hash_pool_rejeitadas_total", "counter", "Tarefas de hashing rejeitadas com 503.")
+    linhas.append(f"wayne_hash_pool_rejeitadas_total {hash_pool['rejeitadas']}")
+
+    _metrica(linhas, "wayne_logins_total", "counter", "Tentativas de login por resultado.")
+    for resultado, total in logins.items():
+        linhas.append(f'wayne_logins_total{{resultado="{resultado}"}} {total}')
+
+    ingestao = get_ingestao_stats()
+    _metrica(linhas, "wayne_ingestao_eventos_total", "counter", "Eventos recebidos em /api/alertas por resultado.")
+    for resultado, chave in (("aceito", "aceitos"), ("recusado", "recusados"), ("gravado", "gravados")):
+        linhas.append(f'wayne_ingestao_eventos_total{{resultado="{resultado}"}} {ingestao[chave]}')
+    _metrica(linhas, "wayne_ingestao_fila", "gauge", "Eventos aceitos ainda não gravados no banco.")
+    linhas.append(f"wayne_ingestao_fila {ingestao['na_fila'] + ingestao['gravando']}")
+    _metrica(linhas, "wayne_ingestao_erros_gravacao_total", "counter", "Falhas ao gravar um lote de eventos (o lote é regravado).")
+    linhas.append(f"wayne_ingestao_erros_gravacao_total {ingestao['erros_gravacao']}")
+    _metrica(linhas, "wayne_ingestao_erros_pos_gravacao_total", "counter", "Falhas ao indexar ou publicar um alerta já gravado (não é regravado).")
+    linhas.append(f"wayne_ingestao_erros_pos_gravacao_total {ingestao['erros_pos_gravacao']}")
+
+    _metrica(linhas, "wayne_inicializacao_segundos", "gauge", "Duração de cada etapa da inicialização deste worker.")
+    for etapa, segundos in get_inicializacao_stats()["etapas_s"].items():
+        linhas.append(f'wayne_inicializacao_segundos{{etapa="{etapa}"}} {segundos}')
+
+    caches = {"usuarios": user_cache.stats(), "concessoes": grant_cache.stats(), "busca_bitmaps": search.indice.convertidos.stats()}
+    for nome, chave, tipo, ajuda in (
+        ("wayne_cache_acertos_total", "acertos", "counter", "Acertos do cache."),
+        ("wayne_cache_falhas_total", "falhas", "counter", "Falhas do cache."),
+        ("wayne_cache_taxa_acerto", "taxa_acerto", "gauge", "Fração de acertos do cache."),
+        ("wayne_cache_tamanho", "tamanho", "gauge", "Entradas no cache."),
+    ):
+        _metrica(linhas, nome, tipo, ajuda)
+        for cache, stats in caches.items():
+            linhas.append(f'{nome}{{cache="{cache}"}} {stats[chave]}')
+
+    return "\n".join(linhas) + "\n"
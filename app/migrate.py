@@ -0,0 +1,35 @@
+import sys
+import argparse
+
+from app.migrations import MIGRACOES, VERSAO_ATUAL, aplicar_migracoes, diferencas_esquema, versoes_aplicadas
+
+# Aplica as migrações pendentes do esquema (ver app/migrations.py). Rode uma vez por deploy,
+# antes de iniciar (ou reiniciar) os workers.
+# Ex: python -m app.migrate
+#     python -m app.migrate --status     (sai com código 1 se houver migrações pendentes ou se o
+#                                         banco não tiver alguma tabela, coluna ou índice dos modelos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações versionadas do esquema do banco.")
+    parser.add_argument("--status", action="store_true", help="Mostra as migrações aplicadas e pendentes, sem aplicar")
+    args = parser.parse_args()
+
+    if args.status:
+        aplicadas = set(versoes_aplicadas())
+        for migracao in MIGRACOES:
+            situacao = "aplicada" if migracao.versao in aplicadas else "pendente"
+            print(f"{migracao.versao:>4}  {situacao:<9} {migracao.descricao}")
+        faltando = diferencas_esquema()
+        for item in faltando:
+            print(f"Falta no banco: {item}")
+        if faltando or not aplicadas.issuperset(m.versao for m in MIGRACOES):
+            sys.exit(1)
+        return
+
+    aplicadas = aplicar_migracoes()
+    for migracao in aplicadas:
+        print(f"Aplicada {migracao.versao}: {migracao.descricao}")
+    print(f"Esquema na versão {VERSAO_ATUAL}" + ("" if aplicadas else " (nada a aplicar)") + ".")
+
+if __name__ == "__main__":
+    main()
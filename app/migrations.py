@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.access import parse_roles
+from app.database import Base, engine
+from app.models import Alert, AreaRestrita, AreaAcessoRole, Solicitacao, VersaoEsquema
+
+# --- Migrações versionadas do esquema ---
+# Cada migração tem um número crescente e roda uma única vez por banco; as aplicadas ficam em
+# schema_versao. Rodam no deploy (python -m app.migrate), uma vez, antes de subir os workers:
+# a inicialização da aplicação só confere a versão (ver app/startup.py).
+# A migração 1 cria, a partir dos modelos, as tabelas que ainda não existem: num banco novo é o
+# esquema completo, num banco anterior às migrações são só as tabelas que faltam. Por isso as
+# migrações seguintes conferem o estado atual antes de alterar algo (ex.: se a coluna já existe).
+# Novas tabelas entram pela 1 apenas em bancos novos; em bancos existentes, precisam de uma
+# migração própria (Tabela.__table__.create(conn, checkfirst=True)). O mesmo vale para colunas e
+# índices acrescentados a tabelas que já existem (ALTER TABLE / _criar_indice):
+# python -m app.migrate --status lista o que os modelos declaram e o banco ainda não tem.
+# No MySQL, DDL faz commit implícito: uma migração que falhe no meio deve poder ser reexecutada.
+
+
+class Migracao(NamedTuple):
+    versao: int
+    descricao: str
+    aplicar: Callable[[Connection], None]
+
+
+def _criar_tabelas(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+
+
+def _colunas_ocorrencias_alertas(conn: Connection):
+    existentes = {coluna["name"] for coluna in inspect(conn).get_columns("alerts")}
+    for nome, definicao in (("ocorrencias", "INTEGER NOT NULL DEFAULT 1"), ("ultima_ocorrencia", "DATETIME NULL")):
+        if nome not in existentes:
+            conn.execute(text(f"ALTER TABLE alerts ADD COLUMN {nome} {definicao}"))
+
+
+def _preencher_areas_acesso_roles(conn: Connection):
+    # Áreas criadas antes da tabela normalizada só têm a lista em acesso_liberado_para
+    areas = conn.execute(
+        select(AreaRestrita.id, AreaRestrita.acesso_liberado_para)
+        .filter(~select(AreaAcessoRole.area_id).filter(AreaAcessoRole.area_id == AreaRestrita.id).exists())
+    ).all()
+    linhas = [{"area_id": area_id, "role": role} for area_id, roles in areas for role in parse_roles(roles or "")]
+    if linhas:
+        conn.execute(insert(AreaAcessoRole), linhas)
+
+
+def _criar_indice(conn: Connection, tabela, nome: str):
+    # Índices declarados nos modelos depois que a tabela já existia (create_all não os cria)
+    next(indice for indice in tabela.indexes if indice.name == nome).create(bind=conn, checkfirst=True)
+
+
+def _coluna_area_id_solicitacoes(conn: Connection):
+    if "area_id" not in {coluna["name"] for coluna in inspect(conn).get_columns("solicitacoes")}:
+        if conn.dialect.name == "sqlite":
+            # O SQLite não aceita ADD CONSTRAINT; a referência vai na própria coluna
+            conn.execute(text(
+                "ALTER TABLE solicitacoes ADD COLUMN area_id INTEGER NULL "
+                "REFERENCES areas_restritas(id) ON DELETE SET NULL"
+            ))
+        else:
+            conn.execute(text("ALTER TABLE solicitacoes ADD COLUMN area_id INTEGER NULL"))
+            conn.execute(text(
+                "ALTER TABLE solicitacoes ADD CONSTRAINT fk_solicitacoes_area_id "
+                "FOREIGN KEY (area_id) REFERENCES areas_restritas(id) ON DELETE SET NULL"
+            ))
+    _criar_indice(conn, Solicitacao.__table__, "ix_solicitacoes_area_id")
+    # Solicitações antigas guardam só o nome da área
+    conn.execute(text(
+        "UPDATE solicitacoes SET area_id = (SELECT areas_restritas.id FROM areas_restritas "
+        "WHERE areas_restritas.nome = solicitacoes.area_solicitada) WHERE area_id IS NULL"
+    ))
+
+
+def _indices_paginacao_alertas(conn: Connection):
+    # Paginação por chave (data_criacao, id) de /alertas, com e sem filtro de nível
+    _criar_indice(conn, Alert.__table__, "ix_alerts_data_criacao_id")
+    _criar_indice(conn, Alert.__table__, "ix_alerts_nivel_data_criacao_id")
+
+
+def _indice_fila_solicitacoes(conn: Connection):
+    # Fila de /solicitacoes filtrada por status e ordenada por data
+    _criar_indice(conn, Solicitacao.__table__, "ix_solicitacoes_status_data_criacao")
+
+
+MIGRACOES: List[Migracao] = [
+    Migracao(1, "Tabelas a partir dos modelos", _criar_tabelas),
+    Migracao(2, "alerts.ocorrencias e alerts.ultima_ocorrencia (agrupamento de repetições)", _colunas_ocorrencias_alertas),
+    Migracao(3, "Preenche areas_acesso_roles das áreas anteriores à tabela", _preencher_areas_acesso_roles),
+    Migracao(4, "solicitacoes.area_id (chave estrangeira e índice) preenchida pelo nome da área", _coluna_area_id_solicitacoes),
+    Migracao(5, "Índices de paginação de alerts (data_criacao, id) e (nivel, data_criacao, id)", _indices_paginacao_alertas),
+    Migracao(6, "Índice da fila de solicitações (status, data_criacao)", _indice_fila_solicitacoes),
+]
+VERSAO_ATUAL = MIGRACOES[-1].versao
+
+
+def versoes_aplicadas(bind: Engine = engine) -> List[int]:
+    if not inspect(bind).has_table(VersaoEsquema.__tablename__):
+        return []
+    with bind.connect() as conn:
+        return list(conn.execute(select(VersaoEsquema.versao).order_by(VersaoEsquema.versao)).scalars())
+
+
+def migracoes_pendentes(bind: Engine = engine) -> List[Migracao]:
+    aplicadas = set(versoes_aplicadas(bind))
+    return [migracao for migracao in MIGRACOES if migracao.versao not in aplicadas]
+
+
+def diferencas_esquema(bind: Engine = engine) -> List[str]:
+    """Tabelas, colunas e índices declarados nos modelos que não existem no banco."""
+    inspetor = inspect(bind)
+    existentes = set(inspetor.get_table_names())
+    faltando = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            faltando.append(f"tabela {tabela.name}")
+            continue
+        colunas = {coluna["name"] for coluna in inspetor.get_columns(tabela.name)}
+        faltando += [f"coluna {tabela.name}.{coluna.name}" for coluna in tabela.columns if coluna.name not in colunas]
+        indices = {indice["name"] for indice in inspetor.get_indexes(tabela.name)}
+        faltando += [f"índice {indice.name}" for indice in tabela.indexes if indice.name not in indices]
+    return faltando
+
+
+def aplicar_migracoes(bind: Engine = engine) -> List[Migracao]:
+    """Aplica, em ordem e cada uma na própria transação, as migrações pendentes. Retorna as aplicadas."""
+    VersaoEsquema.__table__.create(bind=bind, checkfirst=True)
+    pendentes = migracoes_pendentes(bind)
+    for migracao in pendentes:
+        with bind.begin() as conn:
+            migracao.aplicar(conn)
+            conn.execute(insert(VersaoEsquema).values(
+                versao=migracao.versao, descricao=migracao.descricao, aplicada_em=datetime.now()
+            ))
+    return pendentes
+
+
+async def versao_do_banco(async_engine: AsyncEngine) -> int:
+    """Maior migração aplicada, numa única consulta; 0 se schema_versao não existir (ou o banco não responder)."""
+    try:
+        async with async_engine.connect() as conn:
+            return (await conn.execute(select(func.max(VersaoEsquema.versao)))).scalar() or 0
+    except DBAPIError:
+        return 0
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -16,6 +16,7 @@ class User(Base):
     role = Column(String(20), default="usuario")
 
     solicitacoes = relationship("Solicitacao", back_populates="solicitante")
+    acessos_concedidos = relationship("AcessoConcedido", cascade="all, delete-orphan")
 
 
 # --- Modelo de Recurso ---
@@ -39,6 +40,15 @@ class Alert(Base):
     nivel = Column(String(20), nullable=False)
     data_criacao = Column(DateTime(timezone=True), server_default=func.now()) # Usando func.now() para timezone
     criado_por = Column(String(100), nullable=False)
+    # Repetições do mesmo alerta agrupadas nesta linha pela ingestão (ver app/ingestion.py)
+    ocorrencias = Column(Integer, nullable=False, default=1, server_default="1")
+    ultima_ocorrencia = Column(DateTime(timezone=True), nullable=True)  # Nulo = ocorreu uma vez
+
+    # Índices compostos para a paginação por cursor (data_criacao, id) com e sem filtro de nível
+    __table_args__ = (
+        Index("ix_alerts_data_criacao_id", "data_criacao", "id"),
+        Index("ix_alerts_nivel_data_criacao_id", "nivel", "data_criacao", "id"),
+    )
 
 # --- Modelo de Área Restrita ---
 class AreaRestrita(Base):
@@ -51,6 +61,22 @@ class AreaRestrita(Base):
     is_ativa = Column(Boolean, default=True)
     data_criacao = Column(DateTime(timezone=True), server_default=func.now()) # Usando func.now() para timezone
 
+    roles_acesso = relationship("AreaAcessoRole", cascade="all, delete-orphan")
+    acessos_concedidos = relationship("AcessoConcedido", cascade="all, delete-orphan")
+    solicitacoes = relationship("Solicitacao", back_populates="area")
+
+# --- Modelo de Acesso por Role às Áreas (normaliza acesso_liberado_para) ---
+class AreaAcessoRole(Base):
+    __tablename__ = "areas_acesso_roles"
+
+    area_id = Column(Integer, ForeignKey("areas_restritas.id", ondelete="CASCADE"), primary_key=True)
+    role = Column(String(20), primary_key=True)
+
+    # Responde "quais áreas a role X pode acessar" sem varrer as áreas
+    __table_args__ = (
+        Index("ix_areas_acesso_roles_role_area", "role", "area_id"),
+    )
+
 # --- Modelo de Comunicado ---
 class Comunicado(Base):
     __tablename__ = "comunicados"
@@ -67,6 +93,7 @@ class Solicitacao(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    area_id = Column(Integer, ForeignKey("areas_restritas.id", ondelete="SET NULL"), nullable=True, index=True)
     area_solicitada = Column(String(100), nullable=False)
     justificativa = Column(Text, nullable=True)
     status = Column(String(20), default="pendente", nullable=False)
@@ -74,3 +101,81 @@ class Solicitacao(Base):
     data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
 
     solicitante = relationship("User", back_populates="solicitacoes")
+    area = relationship("AreaRestrita", back_populates="solicitacoes")
+
+    # Índice composto para a fila de solicitações filtrada por status e ordenada por data
+    __table_args__ = (
+        Index("ix_solicitacoes_status_data_criacao", "status", "data_criacao"),
+    )
+
+# --- Modelo de Acesso Concedido (solicitação aprovada por usuário e área) ---
+class AcessoConcedido(Base):
+    __tablename__ = "acessos_concedidos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    area_id = Column(Integer, ForeignKey("areas_restritas.id", ondelete="CASCADE"), nullable=False)
+    solicitacao_id = Column(Integer, ForeignKey("solicitacoes.id", ondelete="SET NULL"), nullable=True)
+    concedido_por = Column(String(100), nullable=False)
+    concedido_em = Column(DateTime(timezone=True), server_default=func.now())
+    expira_em = Column(DateTime, nullable=True)  # Nulo = sem expiração
+
+    # Um acesso por usuário e área; também atende à consulta da verificação de acesso
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "area_id", name="uq_acessos_concedidos_usuario_area"),
+    )
+
+# --- Modelo de Rollup dos Relatórios (séries temporais pré-agregadas) ---
+class RollupRelatorio(Base):
+    __tablename__ = "relatorio_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    serie = Column(String(20), nullable=False)          # Ex: "alertas", "solicitacoes"
+    chave = Column(String(20), nullable=False)          # Nível do alerta ou status da solicitação
+    granularidade = Column(String(10), nullable=False)  # "hora" ou "dia"
+    inicio = Column(DateTime, nullable=False)           # Início do intervalo agregado
+    total = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("serie", "granularidade", "chave", "inicio", name="uq_relatorio_rollups_bucket"),
+        Index("ix_relatorio_rollups_serie_granularidade_inicio", "serie", "granularidade", "inicio"),
+    )
+
+# --- Modelo de Token de Ingestão (dispositivos que enviam alertas pela API) ---
+class TokenIngestao(Base):
+    __tablename__ = "tokens_ingestao"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource_id = Column(Integer, ForeignKey("resources.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)  # SHA-256 do token; o token em si nunca é gravado
+    is_active = Column(Boolean, default=True, nullable=False)
+    criado_por = Column(String(100), nullable=False)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+
+# --- Modelo do Catálogo de Arquivos de Alertas (meses retirados da tabela alerts) ---
+class ArquivoAlertas(Base):
+    __tablename__ = "alertas_arquivos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(String(7), nullable=False)               # "AAAA-MM"
+    parte = Column(Integer, nullable=False, default=1)    # Um mês pode ser arquivado em mais de uma execução
+    caminho = Column(String(255), nullable=False)         # Relativo a ALERTAS_ARQUIVO_DIR
+    linhas = Column(Integer, nullable=False, default=0)
+    primeiro_id = Column(Integer, nullable=True)
+    ultimo_id = Column(Integer, nullable=True)
+    tamanho_bytes = Column(Integer, nullable=False, default=0)
+    sha256 = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="removendo")  # "removendo" até as linhas saírem de alerts
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("mes", "parte", name="uq_alertas_arquivos_mes_parte"),
+    )
+
+# --- Modelo das Migrações Aplicadas (ver app/migrations.py) ---
+class VersaoEsquema(Base):
+    __tablename__ = "schema_versao"
+
+    versao = Column(Integer, primary_key=True, autoincrement=False)
+    descricao = Column(String(200), nullable=False)
+    aplicada_em = Column(DateTime, nullable=False, default=datetime.now)
@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+# --- Profiler de SQL por requisição ---
+# Ganchos nos eventos before/after_cursor_execute dos engines somam, para a requisição em curso
+# (via ContextVar), o número de consultas, o tempo total no banco e as instruções mais lentas.
+# Instruções idênticas repetidas SQL_N_MAIS_UM_LIMITE vezes ou mais na mesma requisição são
+# marcadas como suspeitas de N+1. O resultado vai no cabeçalho Server-Timing e é agregado por
+# rota (percentis sobre as últimas SQL_PROFILER_AMOSTRAS requisições) para /debug/sql.
+SQL_PROFILER = os.getenv("SQL_PROFILER", "true").lower() in ("1", "true", "sim")
+SQL_N_MAIS_UM_LIMITE = int(os.getenv("SQL_N_MAIS_UM_LIMITE", "5"))
+SQL_PROFILER_AMOSTRAS = int(os.getenv("SQL_PROFILER_AMOSTRAS", "1000"))
+SQL_LENTAS_POR_REQUISICAO = 3
+
+_ESPACOS = re.compile(r"\s+")
+
+
+class _PerfilRequisicao:
+    __slots__ = ("consultas", "tempo_db", "instrucoes", "lentas")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.instrucoes = Counter()
+        self.lentas = []  # (duração, instrução), as SQL_LENTAS_POR_REQUISICAO mais lentas
+
+    def registrar(self, instrucao: str, duracao: float):
+        self.consultas += 1
+        self.tempo_db += duracao
+        self.instrucoes[instrucao] += 1
+        if len(self.lentas) < SQL_LENTAS_POR_REQUISICAO or duracao > self.lentas[-1][0]:
+            self.lentas.append((duracao, instrucao))
+            self.lentas.sort(key=lambda item: item[0], reverse=True)
+            del self.lentas[SQL_LENTAS_POR_REQUISICAO:]
+
+    def repetidas(self) -> Dict[str, int]:
+        return {instrucao: vezes for instrucao, vezes in self.instrucoes.items() if vezes >= SQL_N_MAIS_UM_LIMITE}
+
+
+_perfil_atual: ContextVar[Optional[_PerfilRequisicao]] = ContextVar("perfil_sql", default=None)
+
+
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_atual.get() is not None:
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_atual.get()
+    if perfil is None:
+        return
+    inicios = conn.info.get("inicio_consultas")
+    if inicios:
+        perfil.registrar(_ESPACOS.sub(" ", statement).strip(), time.perf_counter() - inicios.pop())
+
+
+def tempo_db_atual() -> float:
+    """Tempo de banco (s) acumulado pela requisição em curso (0 se o profiler estiver desligado)."""
+    perfil = _perfil_atual.get()
+    return perfil.tempo_db if perfil is not None else 0.0
+
+
+def instrumentar_engine(engine):
+    """Registra os ganchos do profiler num engine síncrono (para os assíncronos, use .sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _antes_de_executar)
+    event.listen(engine, "after_cursor_execute", _depois_de_executar)
+
+
+class _EstatisticasRota:
+    __slots__ = ("requisicoes", "duracoes", "tempos_db", "consultas", "n_mais_um", "lentas")
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.duracoes = deque(maxlen=SQL_PROFILER_AMOSTRAS)
+        self.tempos_db = deque(maxlen=SQL_PROFILER_AMOSTRAS)
+        self.consultas = deque(maxlen=SQL_PROFILER_AMOSTRAS)
+        self.n_mais_um = Counter()
+        self.lentas = []  # (duração, instrução), as mais lentas já vistas na rota
+
+
+_rotas: Dict[str, _EstatisticasRota] = {}
+_rotas_lock = threading.Lock()
+
+
+def _registrar_rota(rota: str, duracao: float, perfil: _PerfilRequisicao):
+    with _rotas_lock:
+        stats = _rotas.get(rota)
+        if stats is None:
+            stats = _rotas[rota] = _EstatisticasRota()
+        stats.requisicoes += 1
+        stats.duracoes.append(duracao)
+        stats.tempos_db.append(perfil.tempo_db)
+        stats.consultas.append(perfil.consultas)
+        for instrucao, vezes in perfil.repetidas().items():
+            stats.n_mais_um[instrucao] = max(stats.n_mais_um[instrucao], vezes)
+        if perfil.lentas:
+            stats.lentas = sorted(stats.lentas + perfil.lentas, key=lambda item: item[0], reverse=True)[:SQL_LENTAS_POR_REQUISICAO]
+
+
+def _percentis(valores, escala: float = 1.0, casas: int = 2) -> dict:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"p50": 0, "p95": 0, "p99": 0, "max": 0}
+
+    def valor(v):
+        return round(v * escala, casas) if casas else int(v * escala)
+
+    def p(q):
+        return valor(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))])
+
+    return {"p50": p(0.50), "p95": p(0.95), "p99": p(0.99), "max": valor(ordenados[-1])}
+
+
+def get_relatorio_sql() -> dict:
+    """Percentis de duração, tempo de banco e número de consultas por rota, e suspeitas de N+1."""
+    with _rotas_lock:
+        rotas = {
+            rota: {
+                "requisicoes": stats.requisicoes,
+                "duracao_ms": _percentis(stats.duracoes, 1000),
+                "tempo_db_ms": _percentis(stats.tempos_db, 1000),
+                "consultas": _percentis(stats.consultas, casas=0),
+                "mais_lentas": [
+                    {"instrucao": instrucao, "duracao_ms": round(duracao * 1000, 2)}
+                    for duracao, instrucao in stats.lentas
+                ],
+                "suspeitas_n_mais_um": [
+                    {"instrucao": instrucao, "repeticoes_max": vezes}
+                    for instrucao, vezes in stats.n_mais_um.most_common(5)
+                ]
+            }
+            for rota, stats in _rotas.items()
+        }
+    return {"ativo": SQL_PROFILER, "limite_n_mais_um": SQL_N_MAIS_UM_LIMITE, "rotas": rotas}
+
+
+def limpar_relatorio_sql():
+    with _rotas_lock:
+        _rotas.clear()
+
+
+def _server_timing(perfil: _PerfilRequisicao, duracao: float) -> bytes:
+    partes = [
+        f'db;dur={perfil.tempo_db * 1000:.2f};desc="{perfil.consultas} consultas"',
+        f"app;dur={duracao * 1000:.2f}"
+    ]
+    repetidas = perfil.repetidas()
+    if repetidas:
+        partes.append(f'n1;desc="{max(repetidas.values())}x a mesma consulta"')
+    return ", ".join(partes).encode()
+
+
+class ProfilerSQLMiddleware:
+    """Middleware ASGI que abre um perfil por requisição HTTP e publica o resultado."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_PROFILER:
+            await self.app(scope, receive, send)
+            return
+
+        perfil = _PerfilRequisicao()
+        token = _perfil_atual.set(perfil)
+        inicio = time.perf_counter()
+
+        async def send_com_timing(message):
+            if message["type"] == "http.response.start":
+                cabecalho = (b"server-timing", _server_timing(perfil, time.perf_counter() - inicio))
+                message = {**message, "headers": [*message.get("headers", []), cabecalho]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            _perfil_atual.reset(token)
+            rota = getattr(scope.get("route"), "path", "<sem rota>")
+            _registrar_rota(f"{scope['method']} {rota}", time.perf_counter() - inicio, perfil)
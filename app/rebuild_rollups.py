@@ -0,0 +1,53 @@
+from collections import Counter
+from datetime import datetime
+
+from app.archiver import consulta_partes, ler_arquivados
+from app.database import SessionLocal, create_db_and_tables
+from app.models import Alert, Solicitacao, RollupRelatorio
+from app.reports import GRANULARIDADES_ARMAZENADAS, inicio_intervalo
+
+# Recalcula a tabela relatorio_rollups a partir dos alertas e solicitações existentes.
+# Necessário apenas uma vez (dados anteriores aos rollups) ou para corrigir divergências.
+# Os alertas já arquivados (app/archiver.py) são lidos dos arquivos.
+
+def _somar(contagens, serie, pares):
+    for chave, momento in pares:
+        if momento is None or not chave:
+            continue
+        for granularidade in GRANULARIDADES_ARMAZENADAS:
+            contagens[(serie, chave, granularidade, inicio_intervalo(momento, granularidade))] += 1
+
+def _contar(db, serie, coluna_chave, coluna_data):
+    contagens = Counter()
+    _somar(contagens, serie, db.query(coluna_chave, coluna_data).yield_per(10000))
+    return contagens
+
+def _contar_arquivados(db):
+    contagens = Counter()
+    partes = db.execute(consulta_partes()).scalars().all()
+    for bloco in ler_arquivados(partes):
+        _somar(contagens, "alertas", (
+            (registro["nivel"], datetime.fromisoformat(registro["data_criacao"]) if registro.get("data_criacao") else None)
+            for registro in bloco
+        ))
+    return contagens
+
+def main():
+    create_db_and_tables()
+    db = SessionLocal()
+
+    contagens = _contar(db, "alertas", Alert.nivel, Alert.data_criacao)
+    contagens.update(_contar_arquivados(db))
+    contagens.update(_contar(db, "solicitacoes", Solicitacao.status, Solicitacao.data_criacao))
+
+    db.query(RollupRelatorio).delete()
+    db.bulk_insert_mappings(RollupRelatorio, [
+        {"serie": serie, "chave": chave, "granularidade": granularidade, "inicio": inicio, "total": total}
+        for (serie, chave, granularidade, inicio), total in contagens.items()
+    ])
+    db.commit()
+    db.close()
+    print(f"Rollups recalculados: {len(contagens)} intervalos.")
+
+if __name__ == "__main__":
+    main()
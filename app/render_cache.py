@@ -0,0 +1,93 @@
+import os
+import hashlib
+from collections import defaultdict
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from jinja2 import Environment
+
+from app.cache import TTLCache
+
+# --- Cache de páginas e fragmentos renderizados ---
+# Páginas que dependem só da role e de um conjunto de dados (ex: /comunicados, /recursos) são
+# renderizadas uma vez por (template, role, versão dos dados) e guardadas num LRU limitado a
+# RENDER_CACHE_MAX_SIZE entradas. As rotas que criam, editam ou excluem esses dados chamam
+# invalidar_dominio, que incrementa a versão. A versão e o cache são do processo: a invalidação
+# só vale no worker que atendeu a alteração, e os outros continuam servindo as páginas e os
+# fragmentos antigos até a entrada expirar (RENDER_CACHE_TTL segundos). O ETag é o hash do HTML,
+# então um navegador com a mesma versão recebe 304 sem corpo (e, no acerto do cache, sem nenhuma
+# consulta ao banco).
+RENDER_CACHE_MAX_SIZE = int(os.getenv("RENDER_CACHE_MAX_SIZE", "256"))
+RENDER_CACHE_TTL = float(os.getenv("RENDER_CACHE_TTL", "30"))
+
+render_cache = TTLCache(maxsize=RENDER_CACHE_MAX_SIZE, ttl=RENDER_CACHE_TTL)
+_versoes = defaultdict(int)
+
+
+class PaginaRenderizada(NamedTuple):
+    html: str
+    etag: str
+
+
+def invalidar_dominio(dominio: str):
+    """
+    Incrementa a versão dos dados de `dominio`; as páginas em cache da versão antiga deixam de ser
+    usadas neste processo (nos demais workers, só quando expirarem).
+    """
+    _versoes[dominio] += 1
+
+
+def versao_dominio(dominio: str) -> int:
+    return _versoes[dominio]
+
+
+def _guardar(chave, html: str) -> PaginaRenderizada:
+    pagina = PaginaRenderizada(html, '"' + hashlib.blake2b(html.encode(), digest_size=12).hexdigest() + '"')
+    render_cache.set(chave, pagina)
+    return pagina
+
+
+async def pagina_em_cache(
+    env: Environment,
+    template: str,
+    role: str,
+    dominio: str,
+    carregar_contexto: Callable[[], Awaitable[dict]]
+) -> PaginaRenderizada:
+    """
+    Retorna a página de `template` para `role` na versão atual de `dominio`. Só em caso de falha
+    no cache chama `carregar_contexto` (que consulta o banco) e renderiza o template.
+    """
+    chave = (template, role, dominio, _versoes[dominio])
+    pagina: Optional[PaginaRenderizada] = render_cache.get(chave)
+    if pagina is None:
+        contexto = await carregar_contexto()
+        pagina = _guardar(chave, env.get_template(template).render(**contexto, role=role))
+    return pagina
+
+
+def fragmento_em_cache(env: Environment, template: str, role: str, contexto: dict) -> str:
+    """Renderiza (uma vez por role) um fragmento que depende só da role, como os botões do dashboard."""
+    chave = (template, role)
+    pagina: Optional[PaginaRenderizada] = render_cache.get(chave)
+    if pagina is None:
+        pagina = _guardar(chave, env.get_template(template).render(**contexto, role=role))
+    return pagina.html
+
+
+def etag_confere(if_none_match: str, etag: str) -> bool:
+    """Se o If-None-Match contém `etag` (comparação fraca: W/ é ignorado) ou é "*"."""
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor == "*" or valor.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def resposta_com_etag(request: Request, pagina: PaginaRenderizada) -> Response:
+    """200 com o HTML e o ETag, ou 304 se o navegador já tiver essa versão (If-None-Match)."""
+    headers = {"ETag": pagina.etag, "Cache-Control": "private, no-cache"}
+    if etag_confere(request.headers.get("if-none-match", ""), pagina.etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(pagina.html, headers=headers)
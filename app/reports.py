@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User, Resource, Alert, AreaRestrita, ArquivoAlertas, RollupRelatorio
+
+# O formulário de alertas grava "critico"; registros antigos podem usar "crítico"
+NIVEIS_CRITICOS = ("critico", "crítico")
+
+# --- Métricas gerais (página de relatórios) ---
+# As contagens saem de uma única consulta e ficam num snapshot em memória por
+# METRICS_SNAPSHOT_TTL segundos, para que painéis abertos não sobrecarreguem o MySQL.
+METRICS_SNAPSHOT_TTL = float(os.getenv("METRICS_SNAPSHOT_TTL", "15"))
+
+_snapshot = None
+_snapshot_expires_at = 0.0
+_snapshot_lock = asyncio.Lock()
+
+
+def _contagem(model, *filtros):
+    return select(func.count()).select_from(model).filter(*filtros).scalar_subquery()
+
+
+async def _calcular_metricas(db: AsyncSession) -> dict:
+    query = select(
+        _contagem(Alert).label("total_alertas"),
+        _contagem(Alert, Alert.nivel.in_(NIVEIS_CRITICOS)).label("alertas_criticos"),
+        _contagem(Resource).label("total_recursos"),
+        _contagem(User).label("total_usuarios"),
+        _contagem(AreaRestrita).label("total_areas"),
+        select(func.coalesce(func.sum(ArquivoAlertas.linhas), 0)).filter(ArquivoAlertas.status == "concluido").scalar_subquery().label("alertas_arquivados"),
+    )
+    row = (await db.execute(query)).one()
+    return dict(row._mapping)
+
+
+async def get_metricas_gerais(db: AsyncSession) -> dict:
+    """Retorna o snapshot das métricas gerais, recalculando-o quando expirado."""
+    global _snapshot, _snapshot_expires_at
+    if _snapshot is not None and time.monotonic() < _snapshot_expires_at:
+        return _snapshot
+    async with _snapshot_lock:
+        if _snapshot is None or time.monotonic() >= _snapshot_expires_at:
+            metricas = await _calcular_metricas(db)
+            metricas["gerado_em"] = time.time()
+            _snapshot = metricas
+            _snapshot_expires_at = time.monotonic() + METRICS_SNAPSHOT_TTL
+    return _snapshot
+
+
+# --- Séries temporais (rollups incrementais) ---
+# Cada alerta e cada solicitação incrementa um contador por hora e por dia na tabela
+# relatorio_rollups; as rotas que criam, editam ou excluem registros ajustam esses contadores
+# na mesma transação. Consultas de tendência leem apenas os rollups, nunca as tabelas brutas.
+SERIES = {"alertas": "nivel", "solicitacoes": "status"}
+GRANULARIDADES = ("hora", "dia", "semana")
+GRANULARIDADES_ARMAZENADAS = ("hora", "dia")
+MAX_INTERVALOS_SERIE = 10000
+
+
+def inicio_intervalo(momento: datetime, granularidade: str) -> datetime:
+    """Trunca `momento` para o início da hora, do dia ou da semana (segunda-feira)."""
+    momento = momento.replace(tzinfo=None)
+    if granularidade == "hora":
+        return momento.replace(minute=0, second=0, microsecond=0)
+    dia = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularidade == "semana":
+        return dia - timedelta(days=dia.weekday())
+    return dia
+
+
+def _passo(granularidade: str) -> timedelta:
+    return {"hora": timedelta(hours=1), "dia": timedelta(days=1), "semana": timedelta(weeks=1)}[granularidade]
+
+
+async def _somar_no_intervalo(db: AsyncSession, serie: str, chave: str, granularidade: str, inicio: datetime, delta: int):
+    valores = {"serie": serie, "chave": chave, "granularidade": granularidade, "inicio": inicio, "total": delta}
+    dialeto = db.bind.dialect.name
+    if dialeto == "mysql":
+        stmt = mysql_insert(RollupRelatorio).values(**valores)
+        await db.execute(stmt.on_duplicate_key_update(total=stmt.table.c.total + delta))
+    elif dialeto == "sqlite":
+        stmt = sqlite_insert(RollupRelatorio).values(**valores)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["serie", "granularidade", "chave", "inicio"],
+            set_={"total": stmt.table.c.total + delta}
+        ))
+    else:
+        result = await db.execute(
+            update(RollupRelatorio)
+            .filter_by(serie=serie, chave=chave, granularidade=granularidade, inicio=inicio)
+            .values(total=RollupRelatorio.total + delta)
+        )
+        if result.rowcount == 0:
+            db.add(RollupRelatorio(**valores))
+
+
+async def registrar_rollup(db: AsyncSession, serie: str, chave: str, momento: datetime, delta: int = 1):
+    """Soma `delta` aos intervalos de hora e de dia de `momento`. Não faz commit."""
+    if momento is None or not chave:
+        return
+    for granularidade in GRANULARIDADES_ARMAZENADAS:
+        await _somar_no_intervalo(db, serie, chave, granularidade, inicio_intervalo(momento, granularidade), delta)
+
+
+async def mover_rollup(db: AsyncSession, serie: str, chave_antiga: str, chave_nova: str, momento: datetime):
+    """Move uma ocorrência de `chave_antiga` para `chave_nova` (ex: mudança de nível ou status)."""
+    if chave_antiga == chave_nova:
+        return
+    await registrar_rollup(db, serie, chave_antiga, momento, -1)
+    await registrar_rollup(db, serie, chave_nova, momento, 1)
+
+
+async def get_serie_temporal(db: AsyncSession, serie: str, granularidade: str, inicio: datetime, fim: datetime) -> dict:
+    """
+    Retorna as contagens de `serie` por chave em intervalos de `granularidade` entre
+    `inicio` (inclusivo) e `fim` (exclusivo), preenchendo com zero os intervalos vazios.
+    """
+    inicio = inicio_intervalo(inicio, granularidade)
+    passo = _passo(granularidade)
+    if (fim - inicio) / passo > MAX_INTERVALOS_SERIE:
+        raise ValueError(f"Intervalo muito longo para a granularidade '{granularidade}'.")
+
+    armazenada = "dia" if granularidade == "semana" else granularidade
+    rows = (await db.execute(
+        select(RollupRelatorio.chave, RollupRelatorio.inicio, RollupRelatorio.total)
+        .filter(
+            RollupRelatorio.serie == serie,
+            RollupRelatorio.granularidade == armazenada,
+            RollupRelatorio.inicio >= inicio,
+            RollupRelatorio.inicio < fim
+        )
+    )).all()
+
+    por_intervalo: Dict[str, Dict[datetime, int]] = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        por_intervalo[row.chave][inicio_intervalo(row.inicio, granularidade)] += row.total
+
+    intervalos: List[datetime] = []
+    atual = inicio
+    while atual < fim:
+        intervalos.append(atual)
+        atual += passo
+
+    return {
+        "serie": serie,
+        "granularidade": granularidade,
+        "intervalos": [intervalo.isoformat() for intervalo in intervalos],
+        "valores": {
+            chave: [contagens.get(intervalo, 0) for intervalo in intervalos]
+            for chave, contagens in sorted(por_intervalo.items())
+        },
+    }
@@ -0,0 +1,536 @@
+import os
+import re
+import time
+import random
+import asyncio
+import unicodedata
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from itertools import chain, product
+from math import log
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from app.cache import TTLCache
+from app.database import SessionLocal
+from app.models import Alert, Comunicado
+
+# --- Busca textual em alertas e comunicados ---
+# Índice invertido em memória. Cada documento tem uma chave (id << 1) | tipo, e para cada termo
+# (minúsculo, sem acento e sem stopword) o índice guarda, em dois campos separados, as chaves
+# dos documentos com o termo no título e as dos documentos com o termo só na descrição.
+# Termos raros ficam num array ordenado de chaves; termos frequentes (mais de 1/64 dos
+# documentos) viram um bitmap, um int do Python com o bit `chave` ligado, que nesse volume
+# ocupa menos memória que o array. As consultas convertem os arrays em bitmap e fazem união,
+# interseção, contagem (bit_count) e "mais novos primeiro" (bits mais altos) com operações de
+# inteiro em C: com 1 milhão de documentos, mesmo termos presentes na maioria deles são
+# respondidos em poucos milissegundos (ver benchmarks/search_index.py).
+#
+# Relevância: cada termo da consulta vale idf = log(1 + N / documentos com o termo), 3x se
+# aparece no título e 1x se só na descrição. Todos os termos são obrigatórios, e cada um casa
+# como palavra inteira ou prefixo ("servid" -> servidor, servidores). Empates: mais novos primeiro.
+#
+# Atualizações incrementais: as rotas chamam indexar_documento/remover_documento depois do
+# commit, passando o texto anterior nas edições; as operações são idempotentes. Com vários
+# workers, cada um tem o seu índice: a cada BUSCA_REFRESH_SECONDS são lidos os documentos
+# criados por outros workers (id acima do último lido) e a cada BUSCA_REBUILD_SECONDS (mais até
+# 25%, sorteado por worker, para os workers não reconstruírem ao mesmo tempo) o índice é
+# reconstruído do zero em segundo plano, o que aplica edições e exclusões feitas em outros workers.
+# A reconstrução é só Python: numa thread ela disputaria o GIL com o event loop durante toda a
+# construção. Por isso roda no próprio loop, em passos de BUSCA_PASSO documentos (e de entradas, na
+# finalização), devolvendo o controle ao loop entre um passo e outro; só a leitura do banco vai para
+# a thread. As buscas feitas durante a reconstrução usam o índice anterior.
+# Os resultados são sempre carregados do banco, então um documento excluído não é exibido.
+BUSCA_REFRESH_SECONDS = float(os.getenv("BUSCA_REFRESH_SECONDS", "30"))
+BUSCA_REBUILD_SECONDS = float(os.getenv("BUSCA_REBUILD_SECONDS", "3600"))
+BUSCA_INDEXAR_NA_INICIALIZACAO = os.getenv("BUSCA_INDEXAR_NA_INICIALIZACAO", "true").lower() in ("1", "true", "sim")
+BUSCA_PREFIXO_MIN = int(os.getenv("BUSCA_PREFIXO_MIN", "2"))
+BUSCA_MAX_EXPANSAO = int(os.getenv("BUSCA_MAX_EXPANSAO", "50"))  # termos por prefixo
+BUSCA_MAX_TERMOS = 6  # termos considerados por consulta (2^6 combinações de título/descrição)
+BUSCA_LOTE = 10000
+BUSCA_PASSO = int(os.getenv("BUSCA_PASSO", "50"))  # documentos indexados entre duas devoluções ao event loop
+RESULTADOS_POR_PAGINA = 20
+BUSCA_CACHE_BITMAPS = int(os.getenv("BUSCA_CACHE_BITMAPS", "128"))  # arrays médios já convertidos
+BITMAP_MIN_ENTRADAS = 1024
+_BLOCO_BITS = 4096
+_ESPARSO_MAX_BITS = 4096
+_BYTE_NAO_NULO = re.compile(rb"[^\x00]")
+
+ALERTA, COMUNICADO = 0, 1
+TIPOS_BUSCA = {"alertas": ALERTA, "comunicados": COMUNICADO}
+PESO_TITULO, PESO_DESCRICAO = 3, 1
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela ele eles em entre era essa esse
+esta este eu foi ha isso isto ja la lhe mais mas me mesmo meu minha na nas nao no nos num numa o os
+ou para pela pelas pelo pelos por qual quando que quem se sem ser seu seus so sua suas tambem te tem
+um uma umas uns voce
+""".split())
+
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+Postings = Union[array, int]  # array ordenado de chaves ou bitmap
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos: 'Invasão' -> 'invasao'."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    if not texto:
+        return []
+    return [t for t in _PALAVRA.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+def chave_documento(tipo: int, documento_id: int) -> int:
+    return (documento_id << 1) | tipo
+
+
+def _termos_por_campo(titulo: str, descricao: str) -> Tuple[Set[str], Set[str]]:
+    """(termos do título, termos só da descrição)."""
+    no_titulo = set(tokenizar(titulo))
+    return no_titulo, set(tokenizar(descricao)) - no_titulo
+
+
+def _para_bitmap(chaves: Iterable[int], maior_chave: int) -> int:
+    bits = bytearray(maior_chave // 8 + 1)
+    for chave in chaves:
+        bits[chave >> 3] |= 1 << (chave & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _mascara_tipo(tipo: int, maior_chave: int) -> int:
+    """Bitmap com as chaves pares (alertas) ou ímpares (comunicados)."""
+    return int.from_bytes((b"\xaa" if tipo == COMUNICADO else b"\x55") * (maior_chave // 8 + 1), "little")
+
+
+def _bits_mais_altos(bitmap: int, quantidade: int) -> List[int]:
+    """As `quantidade` chaves mais altas (os documentos mais novos) do bitmap, em ordem decrescente."""
+    chaves = []
+    if bitmap.bit_count() <= _ESPARSO_MAX_BITS:
+        # Poucos bits espalhados: acha os bytes não nulos de uma vez (regex em C) em vez de
+        # deslocar o bitmap inteiro a cada bloco
+        dados = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        for posicao in reversed([m.start() for m in _BYTE_NAO_NULO.finditer(dados)]):
+            byte = dados[posicao]
+            for bit in range(7, -1, -1):
+                if byte >> bit & 1:
+                    chaves.append(posicao * 8 + bit)
+                    if len(chaves) >= quantidade:
+                        return chaves
+        return chaves
+
+    fim = bitmap.bit_length()
+    while fim > 0 and len(chaves) < quantidade:
+        inicio = max(0, fim - _BLOCO_BITS)
+        bloco = (bitmap >> inicio) & ((1 << (fim - inicio)) - 1)
+        while bloco and len(chaves) < quantidade:
+            bit = bloco.bit_length() - 1
+            chaves.append(inicio + bit)
+            bloco ^= 1 << bit
+        # Pula direto para o próximo bit ligado abaixo do bloco
+        fim = (bitmap & ((1 << inicio) - 1)).bit_length() if inicio else 0
+    return chaves
+
+
+class IndiceInvertido:
+    """Índice invertido com ranking por relevância, busca por prefixo e atualização incremental."""
+
+    def __init__(self):
+        self.titulo: Dict[str, Postings] = {}
+        self.descricao: Dict[str, Postings] = {}
+        self.vocabulario: List[str] = []  # ordenado, para a busca por prefixo (bisect)
+        self.documentos = 0
+        self.maior_chave = 0
+        # Bitmaps dos arrays com BITMAP_MIN_ENTRADAS ou mais (converter custa um laço por entrada);
+        # a entrada de um termo é descartada quando o termo muda
+        self.convertidos = TTLCache(maxsize=BUSCA_CACHE_BITMAPS, ttl=BUSCA_REBUILD_SECONDS)
+
+    def _limite_bitmap(self) -> int:
+        # Um bitmap ocupa maior_chave / 8 bytes; um array, 8 bytes por entrada
+        return max(BITMAP_MIN_ENTRADAS, self.maior_chave >> 6)
+
+    def _inserir(self, campo: Dict[str, Postings], termo: str, chave: int, ordenar: bool) -> bool:
+        postings = campo.get(termo)
+        if postings is None:
+            campo[termo] = array("q", (chave,))
+            if not ordenar:
+                self.vocabulario.append(termo)  # finalizar() ordena e remove repetidos
+            else:
+                i = bisect_left(self.vocabulario, termo)
+                if i == len(self.vocabulario) or self.vocabulario[i] != termo:
+                    self.vocabulario.insert(i, termo)
+            return True
+        if isinstance(postings, int):
+            if postings >> chave & 1:
+                return False
+            campo[termo] = postings | (1 << chave)
+            return True
+        if not ordenar or not postings or postings[-1] < chave:
+            postings.append(chave)  # carga em massa ou documento mais novo: sem busca binária
+        else:
+            i = bisect_left(postings, chave)
+            if i < len(postings) and postings[i] == chave:
+                return False
+            postings.insert(i, chave)
+        self.convertidos.invalidate((id(campo), termo))
+        if ordenar and len(postings) > self._limite_bitmap():
+            campo[termo] = _para_bitmap(postings, self.maior_chave)
+        return True
+
+    def _retirar(self, campo: Dict[str, Postings], termo: str, chave: int) -> bool:
+        postings = campo.get(termo)
+        if postings is None:
+            return False
+        if isinstance(postings, int):
+            if not postings >> chave & 1:
+                return False
+            campo[termo] = postings ^ (1 << chave)
+            return True
+        i = bisect_left(postings, chave)
+        if i < len(postings) and postings[i] == chave:
+            postings.pop(i)
+            self.convertidos.invalidate((id(campo), termo))
+            return True
+        return False
+
+    def adicionar(self, tipo: int, documento_id: int, titulo: str, descricao: str, ordenar: bool = True) -> bool:
+        """
+        Indexa um documento (idempotente). Na carga em massa, com cada documento uma única vez,
+        use ordenar=False e chame finalizar() no fim. Retorna False se o documento já estava indexado.
+        """
+        chave = chave_documento(tipo, documento_id)
+        self.maior_chave = max(self.maior_chave, chave)
+        no_titulo, na_descricao = _termos_por_campo(titulo, descricao)
+        inserido = False
+        for termo in no_titulo:
+            inserido |= self._inserir(self.titulo, termo, chave, ordenar)
+        for termo in na_descricao:
+            inserido |= self._inserir(self.descricao, termo, chave, ordenar)
+        if inserido:
+            self.documentos += 1
+        return inserido
+
+    def finalizar(self):
+        """Fim da carga em massa: ordena o vocabulário e converte os termos frequentes em bitmap."""
+        for _ in self.finalizar_em_passos():
+            pass
+
+    def finalizar_em_passos(self) -> Iterator[None]:
+        """finalizar() em partes: para a cada BUSCA_PASSO * 20 termos ou entradas processados (ver _construir)."""
+        passo = BUSCA_PASSO * 20
+        termos = list(set(self.vocabulario))
+        yield
+        # Ordena em blocos e junta os blocos já ordenados, para nenhum passo ordenar o vocabulário inteiro
+        blocos = []
+        for i in range(0, len(termos), passo):
+            blocos.append(sorted(termos[i:i + passo]))
+            yield
+        vocabulario = []
+        for termo in merge(*blocos):
+            vocabulario.append(termo)
+            if len(vocabulario) % passo == 0:
+                yield
+        self.vocabulario = vocabulario
+        processadas = 0
+        for campo in (self.titulo, self.descricao):
+            for termo, postings in campo.items():
+                if isinstance(postings, int):
+                    continue
+                if len(postings) > self._limite_bitmap():
+                    # Mesmo que _para_bitmap, em partes: um termo pode estar em quase todos os documentos
+                    bits = bytearray(self.maior_chave // 8 + 1)
+                    for i in range(0, len(postings), passo):
+                        for chave in postings[i:i + passo]:
+                            bits[chave >> 3] |= 1 << (chave & 7)
+                        yield
+                    campo[termo] = int.from_bytes(bits, "little")
+                    continue
+                campo[termo] = array("q", sorted(postings))  # alertas e comunicados chegam em sequências separadas
+                processadas += len(postings)
+                if processadas >= passo:
+                    processadas = 0
+                    yield
+
+    def remover(self, tipo: int, documento_id: int, titulo: str, descricao: str) -> bool:
+        """Retira as entradas geradas por (titulo, descricao); idempotente."""
+        chave = chave_documento(tipo, documento_id)
+        no_titulo, na_descricao = _termos_por_campo(titulo, descricao)
+        removido = False
+        for termo in no_titulo:
+            removido |= self._retirar(self.titulo, termo, chave)
+        for termo in na_descricao:
+            removido |= self._retirar(self.descricao, termo, chave)
+        if removido:
+            self.documentos = max(0, self.documentos - 1)
+        return removido
+
+    def stats(self) -> dict:
+        postings = [*self.titulo.values(), *self.descricao.values()]
+        bitmaps = [p for p in postings if isinstance(p, int)]
+        arrays = [p for p in postings if not isinstance(p, int)]
+        return {
+            "documentos": self.documentos,
+            "termos": len(self.vocabulario),
+            "bitmaps": len(bitmaps),
+            "entradas": sum(p.bit_count() for p in bitmaps) + sum(len(p) for p in arrays),
+            "memoria_mb": round((sum(p.bit_length() // 8 for p in bitmaps) + sum(len(p) * 8 for p in arrays)) / 2 ** 20, 1),
+            "cache_bitmaps": self.convertidos.stats(),
+        }
+
+    def _expandir(self, termo: str) -> List[str]:
+        """O próprio termo e até BUSCA_MAX_EXPANSAO termos que começam com ele."""
+        if len(termo) < BUSCA_PREFIXO_MIN:
+            return [termo]
+        termos = []
+        i = bisect_left(self.vocabulario, termo)
+        while i < len(self.vocabulario) and len(termos) < BUSCA_MAX_EXPANSAO:
+            candidato = self.vocabulario[i]
+            if not candidato.startswith(termo):
+                break
+            termos.append(candidato)
+            i += 1
+        return termos
+
+    def _bitmaps(self, termo: str, mascara: Optional[int]) -> Tuple[int, int]:
+        """Documentos com o termo (ou um termo com esse prefixo) no título e só na descrição."""
+        bitmaps = []
+        for campo in (self.titulo, self.descricao):
+            uniao = 0
+            raros = []  # os arrays dos termos raros viram um único bitmap no fim
+            for expandido in self._expandir(termo):
+                postings = campo.get(expandido)
+                if not postings:
+                    continue
+                if isinstance(postings, int):
+                    uniao |= postings
+                elif len(postings) >= BITMAP_MIN_ENTRADAS:
+                    chave_cache = (id(campo), expandido)
+                    convertido = self.convertidos.get(chave_cache)
+                    if convertido is None:
+                        convertido = _para_bitmap(postings, self.maior_chave)
+                        self.convertidos.set(chave_cache, convertido)
+                    uniao |= convertido
+                else:
+                    raros.append(postings)
+            if raros:
+                uniao |= _para_bitmap(chain.from_iterable(raros), self.maior_chave)
+            bitmaps.append(uniao)
+        no_titulo, na_descricao = bitmaps
+        na_descricao &= ~no_titulo  # no título por um termo expandido vale mais que na descrição por outro
+        if mascara is not None:
+            no_titulo &= mascara
+            na_descricao &= mascara
+        return no_titulo, na_descricao
+
+    def buscar(self, consulta: str, tipo: Optional[int] = None, inicio: int = 0, limite: int = RESULTADOS_POR_PAGINA) -> Tuple[int, List[Tuple[int, float]]]:
+        """
+        Retorna (total, [(chave, pontuação), ...]) dos documentos que contêm todos os termos da
+        consulta, do mais relevante para o menos relevante.
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))[:BUSCA_MAX_TERMOS]
+        if not termos:
+            return 0, []
+        mascara = None if tipo is None else _mascara_tipo(tipo, self.maior_chave)
+
+        grupos = []
+        todos = -1  # todos os bits ligados
+        for termo in termos:
+            no_titulo, na_descricao = self._bitmaps(termo, mascara)
+            encontrados = no_titulo.bit_count() + na_descricao.bit_count()
+            if not encontrados:
+                return 0, []
+            grupos.append((log(1 + max(self.documentos, encontrados) / encontrados), no_titulo, na_descricao))
+            todos &= no_titulo | na_descricao
+        total = todos.bit_count()
+        if not total:
+            return 0, []
+
+        # Cada combinação (termo i no título ou só na descrição) tem uma pontuação fixa; percorre
+        # as combinações da melhor para a pior até preencher a página pedida
+        combinacoes = {}
+        for pesos in product((PESO_TITULO, PESO_DESCRICAO), repeat=len(grupos)):
+            pontuacao = round(sum(idf * peso for (idf, _, _), peso in zip(grupos, pesos)), 9)
+            combinacoes.setdefault(pontuacao, []).append(pesos)
+
+        necessarios = inicio + limite
+        resultados: List[Tuple[int, float]] = []
+        for pontuacao in sorted(combinacoes, reverse=True):
+            # Combinações com a mesma pontuação (termos com o mesmo idf) formam um só grupo de empate
+            empatados = 0
+            for pesos in combinacoes[pontuacao]:
+                chaves = todos
+                for (_, no_titulo, na_descricao), peso in zip(grupos, pesos):
+                    chaves &= no_titulo if peso == PESO_TITULO else na_descricao
+                    if not chaves:
+                        break
+                empatados |= chaves
+            if empatados:
+                resultados.extend((chave, pontuacao) for chave in _bits_mais_altos(empatados, necessarios - len(resultados)))
+                if len(resultados) >= necessarios:
+                    break
+        return total, resultados[inicio:necessarios]
+
+
+# --- Índice compartilhado pela aplicação ---
+
+indice = IndiceInvertido()
+_estado = {"pronto": False, "atualizado_em": 0.0, "construido_em": 0.0, "duracao_construcao": 0.0, "reconstruir_apos": 0.0}
+_ultimo_lido = {ALERTA: 0, COMUNICADO: 0}  # maior id já lido do banco, por tipo
+_pendentes: Optional[list] = None  # operações recebidas durante uma reconstrução
+_lock = asyncio.Lock()
+_tarefas: Set[asyncio.Task] = set()
+_MODELOS = ((ALERTA, Alert), (COMUNICADO, Comunicado))
+
+
+def _ler_documentos(acima_de: Dict[int, int]) -> Iterable[Tuple[int, int, str, str]]:
+    """Lê (tipo, id, titulo, descricao) do banco em lotes, em ordem de id, só acima do id informado."""
+    db = SessionLocal()
+    try:
+        for tipo, modelo in _MODELOS:
+            ultimo = acima_de[tipo]
+            while True:
+                lote = db.query(modelo.id, modelo.titulo, modelo.descricao).filter(
+                    modelo.id > ultimo
+                ).order_by(modelo.id).limit(BUSCA_LOTE).all()
+                for documento_id, titulo, descricao in lote:
+                    yield tipo, documento_id, titulo, descricao
+                if len(lote) < BUSCA_LOTE:
+                    break
+                ultimo = lote[-1][0]
+    finally:
+        db.close()
+
+
+def _ler_lote(modelo, acima_de: int) -> list:
+    db = SessionLocal()
+    try:
+        return db.query(modelo.id, modelo.titulo, modelo.descricao).filter(
+            modelo.id > acima_de
+        ).order_by(modelo.id).limit(BUSCA_LOTE).all()
+    finally:
+        db.close()
+
+
+async def _construir() -> Tuple[IndiceInvertido, Dict[int, int]]:
+    loop = asyncio.get_running_loop()
+    novo = IndiceInvertido()
+    lidos = {ALERTA: 0, COMUNICADO: 0}
+    for tipo, modelo in _MODELOS:
+        while True:
+            lote = await loop.run_in_executor(None, _ler_lote, modelo, lidos[tipo])
+            for i in range(0, len(lote), BUSCA_PASSO):
+                for documento_id, titulo, descricao in lote[i:i + BUSCA_PASSO]:
+                    novo.adicionar(tipo, documento_id, titulo, descricao, ordenar=False)
+                await asyncio.sleep(0)
+            if lote:
+                lidos[tipo] = lote[-1][0]
+            if len(lote) < BUSCA_LOTE:
+                break
+    for _ in novo.finalizar_em_passos():
+        await asyncio.sleep(0)
+    return novo, lidos
+
+
+def _novos_documentos(acima_de: Dict[int, int]) -> list:
+    return list(_ler_documentos(acima_de))
+
+
+def _aplicar(alvo: IndiceInvertido, operacao: tuple):
+    acao, tipo, documento_id, titulo, descricao, anterior = operacao
+    if anterior is not None:
+        alvo.remover(tipo, documento_id, *anterior)
+    if acao == "indexar":
+        alvo.adicionar(tipo, documento_id, titulo, descricao)
+
+
+def _registrar(operacao: tuple):
+    if _pendentes is not None:
+        _pendentes.append(operacao)
+    if _estado["pronto"]:
+        _aplicar(indice, operacao)
+
+
+def indexar_documento(tipo: int, documento_id: int, titulo: str, descricao: str, anterior: Optional[Tuple[str, str]] = None):
+    """Chamado depois do commit de uma criação ou edição; nas edições, `anterior` é o (titulo, descricao) antigo."""
+    _registrar(("indexar", tipo, documento_id, titulo, descricao, anterior))
+
+
+def remover_documento(tipo: int, documento_id: int, titulo: str, descricao: str):
+    """Chamado depois do commit de uma exclusão, com o texto do documento excluído."""
+    _registrar(("remover", tipo, documento_id, None, None, (titulo, descricao)))
+
+
+async def _reconstruir():
+    global indice, _pendentes
+    _pendentes = []
+    inicio = time.perf_counter()
+    try:
+        novo, lidos = await _construir()
+        # Operações feitas durante a leitura do banco: são idempotentes, então podem ser reaplicadas
+        for operacao in _pendentes:
+            _aplicar(novo, operacao)
+        indice = novo
+        _ultimo_lido.update(lidos)
+    finally:
+        _pendentes = None
+    agora = time.monotonic()
+    _estado.update(
+        pronto=True, atualizado_em=agora, construido_em=agora, duracao_construcao=time.perf_counter() - inicio,
+        reconstruir_apos=BUSCA_REBUILD_SECONDS * random.uniform(1.0, 1.25)
+    )
+
+
+async def _ler_novos():
+    """Indexa os documentos criados (por qualquer worker) desde a última leitura."""
+    novos = await asyncio.get_running_loop().run_in_executor(None, _novos_documentos, dict(_ultimo_lido))
+    for tipo, documento_id, titulo, descricao in novos:
+        indice.adicionar(tipo, documento_id, titulo, descricao)
+        _ultimo_lido[tipo] = max(_ultimo_lido[tipo], documento_id)
+    _estado["atualizado_em"] = time.monotonic()
+
+
+def _em_segundo_plano(corrotina):
+    tarefa = asyncio.get_running_loop().create_task(corrotina)
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+
+
+async def _reconstruir_se_vencido():
+    async with _lock:
+        if time.monotonic() - _estado["construido_em"] >= _estado["reconstruir_apos"]:
+            await _reconstruir()
+
+
+async def garantir_indice():
+    """Constrói o índice na primeira busca e o mantém atualizado (ver comentário no topo do módulo)."""
+    agora = time.monotonic()
+    if _estado["pronto"]:
+        if agora - _estado["construido_em"] >= _estado["reconstruir_apos"] and not _lock.locked():
+            _em_segundo_plano(_reconstruir_se_vencido())
+        if agora - _estado["atualizado_em"] < BUSCA_REFRESH_SECONDS or _lock.locked():
+            return  # com uma reconstrução em andamento, responde com o índice atual
+    async with _lock:
+        if not _estado["pronto"]:
+            await _reconstruir()
+        elif time.monotonic() - _estado["atualizado_em"] >= BUSCA_REFRESH_SECONDS:
+            await _ler_novos()
+
+
+def iniciar_indexacao():
+    """Constrói o índice em segundo plano na inicialização, para a primeira busca não esperar por ele."""
+    if BUSCA_INDEXAR_NA_INICIALIZACAO and not _estado["pronto"]:
+        _em_segundo_plano(garantir_indice())
+
+
+def buscar(consulta: str, tipo: Optional[int] = None, inicio: int = 0, limite: int = RESULTADOS_POR_PAGINA) -> Tuple[int, List[Tuple[int, float]]]:
+    """Consulta o índice atual (ver IndiceInvertido.buscar)."""
+    return indice.buscar(consulta, tipo, inicio, limite)
+
+
+def get_busca_stats() -> dict:
+    return {"pronto": _estado["pronto"], **indice.stats(), "duracao_construcao_s": round(_estado["duracao_construcao"], 3)}
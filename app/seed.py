@@ -0,0 +1,72 @@
+import json
+
+from app.access import parse_roles
+from app.create_resources import criar_recursos_iniciais
+from app.create_user import criar_usuario
+from app.database import SessionLocal, create_db_and_tables
+from app.models import AreaRestrita, AreaAcessoRole, Comunicado, Solicitacao, User
+
+# Dados iniciais de exemplo: usuários (um por role), comunicado de boas-vindas, a área
+# "Sala de Servidores" com uma solicitação pendente e os recursos de create_resources.py.
+# Rode uma vez, depois de python -m app.migrate; rodar de novo não duplica nada.
+# Ex: python -m app.seed
+
+USUARIOS_EXEMPLO = [
+    {"email": "bruce@wayne.com", "full_name": "Bruce Wayne", "senha": "batman123", "role": "administrador"},
+    {"email": "dick@grayson.com", "full_name": "Dick Grayson", "senha": "asanoturna123", "role": "gerente"},
+    {"email": "damian@wayne.com", "full_name": "Damian Wayne", "senha": "robin123", "role": "usuario"},
+]
+COMUNICADO_EXEMPLO = {
+    "titulo": "Comunicado de Boas-Vindas",
+    "descricao": "Bem-vindo(a) ao sistema! Explore as novas funcionalidades.",
+    "criado_por": "Sistema",
+}
+AREA_EXEMPLO = {"nome": "Sala de Servidores", "descricao": "Acesso a servidores críticos.", "acesso_liberado_para": "administrador,gerente"}
+
+
+def semear(db) -> dict:
+    """Insere os dados de exemplo que ainda não existem, numa única transação. Retorna o que foi criado."""
+    criados = {"usuarios": 0, "comunicados": 0, "areas": 0, "solicitacoes": 0, "recursos": 0}
+    for dados in USUARIOS_EXEMPLO:
+        if criar_usuario(db, dados["email"], dados["full_name"], dados["senha"], dados["role"]):
+            criados["usuarios"] += 1
+
+    if not db.query(Comunicado.id).filter(Comunicado.titulo == COMUNICADO_EXEMPLO["titulo"]).first():
+        db.add(Comunicado(**COMUNICADO_EXEMPLO))
+        criados["comunicados"] += 1
+
+    area = db.query(AreaRestrita).filter(AreaRestrita.nome == AREA_EXEMPLO["nome"]).first()
+    if not area:
+        area = AreaRestrita(**AREA_EXEMPLO)
+        area.roles_acesso = [AreaAcessoRole(role=role) for role in parse_roles(AREA_EXEMPLO["acesso_liberado_para"])]
+        db.add(area)
+        criados["areas"] += 1
+    db.flush()
+
+    bruce = db.query(User).filter(User.email == USUARIOS_EXEMPLO[0]["email"]).first()
+    if not db.query(Solicitacao.id).filter(Solicitacao.usuario_id == bruce.id, Solicitacao.area_solicitada == area.nome).first():
+        db.add(Solicitacao(
+            usuario_id=bruce.id,
+            area_id=area.id,
+            area_solicitada=area.nome,
+            justificativa="Necessário para manutenção de rotina.",
+            status="pendente"
+        ))
+        criados["solicitacoes"] += 1
+
+    criados["recursos"] = criar_recursos_iniciais(db)
+    db.commit()
+    return criados
+
+
+def main():
+    create_db_and_tables()
+    db = SessionLocal()
+    try:
+        print(json.dumps({"criados": semear(db)}, ensure_ascii=False))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.access import conceder_acessos, invalidar_concessao
+from app.models import AreaRestrita, Solicitacao
+from app.reports import inicio_intervalo, registrar_rollup
+
+# --- Processamento de solicitações em lote ---
+# Aprova ou rejeita várias solicitações com um único UPDATE ... WHERE status = 'pendente'.
+# Controle otimista: se o UPDATE alterar menos linhas do que as pendentes lidas, outro gerente
+# processou parte delas no meio do caminho; a transação é desfeita e repetida (até
+# LOTE_MAX_TENTATIVAS vezes) e as que deixaram de estar pendentes saem como "ja_processada".
+LOTE_MAX_SOLICITACOES = int(os.getenv("LOTE_MAX_SOLICITACOES", "1000"))
+LOTE_MAX_TENTATIVAS = 3
+ACOES_LOTE = {"aprovar": "aprovada", "rejeitar": "rejeitada"}
+
+
+class ConflitoConcorrencia(Exception):
+    """As solicitações continuaram sendo alteradas por outro processo em todas as tentativas."""
+
+
+async def _resolver_areas(db: AsyncSession, pendentes) -> Dict[int, Optional[int]]:
+    """area_id de cada solicitação; as antigas (sem area_id) são resolvidas pelo nome da área."""
+    nomes = {linha.area_solicitada for linha in pendentes if linha.area_id is None}
+    ids_por_nome = {}
+    if nomes:
+        ids_por_nome = dict((await db.execute(
+            select(AreaRestrita.nome, AreaRestrita.id).filter(AreaRestrita.nome.in_(nomes))
+        )).all())
+    return {
+        linha.id: linha.area_id if linha.area_id is not None else ids_por_nome.get(linha.area_solicitada)
+        for linha in pendentes
+    }
+
+
+async def _preencher_area_id(db: AsyncSession, pendentes, areas: Dict[int, int]):
+    """Grava o area_id resolvido nas solicitações antigas (um UPDATE por área)."""
+    por_area = defaultdict(list)
+    for linha in pendentes:
+        if linha.area_id is None:
+            por_area[areas[linha.id]].append(linha.id)
+    for area_id, ids in por_area.items():
+        await db.execute(
+            update(Solicitacao).where(Solicitacao.id.in_(ids)).values(area_id=area_id)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def _mover_rollups(db: AsyncSession, pendentes, status_novo: str):
+    """Move os contadores de 'pendente' para o novo status, agrupando por hora de criação."""
+    por_hora = Counter(inicio_intervalo(linha.data_criacao, "hora") for linha in pendentes if linha.data_criacao)
+    for hora, total in por_hora.items():
+        await registrar_rollup(db, "solicitacoes", "pendente", hora, -total)
+        await registrar_rollup(db, "solicitacoes", status_novo, hora, total)
+
+
+async def processar_solicitacoes(
+    db: AsyncSession,
+    acao: str,
+    ids: Optional[List[int]] = None,
+    area_id: Optional[int] = None,
+    processado_por: str = "",
+    validade_dias: Optional[int] = None
+) -> Dict[int, str]:
+    """
+    Aprova ou rejeita as solicitações com os `ids` informados ou, se `ids` for None, as pendentes
+    mais antigas (opcionalmente só as de `area_id`), até LOTE_MAX_SOLICITACOES. Faz commit.
+
+    Retorna o resultado por ID: o novo status, "ja_processada", "nao_encontrada" ou
+    "area_inexistente" (aprovação de solicitação cuja área foi excluída).
+    """
+    status_novo = ACOES_LOTE[acao]
+    expira_em = datetime.now() + timedelta(days=validade_dias) if validade_dias else None
+
+    for _ in range(LOTE_MAX_TENTATIVAS):
+        query = select(
+            Solicitacao.id, Solicitacao.usuario_id, Solicitacao.area_id,
+            Solicitacao.area_solicitada, Solicitacao.status, Solicitacao.data_criacao
+        )
+        if ids is not None:
+            query = query.filter(Solicitacao.id.in_(ids))
+        else:
+            query = query.filter(Solicitacao.status == "pendente")
+            if area_id is not None:
+                query = query.filter(Solicitacao.area_id == area_id)
+            query = query.order_by(Solicitacao.data_criacao, Solicitacao.id).limit(LOTE_MAX_SOLICITACOES)
+        linhas = (await db.execute(query)).all()
+
+        resultados = dict.fromkeys(ids or [], "nao_encontrada")
+        pendentes = []
+        for linha in linhas:
+            if linha.status == "pendente":
+                pendentes.append(linha)
+            else:
+                resultados[linha.id] = "ja_processada"
+
+        areas = {}
+        if status_novo == "aprovada":
+            areas = await _resolver_areas(db, pendentes)
+            for linha in pendentes:
+                if areas[linha.id] is None:
+                    resultados[linha.id] = "area_inexistente"
+            pendentes = [linha for linha in pendentes if areas[linha.id] is not None]
+
+        if not pendentes:
+            await db.rollback()
+            return resultados
+
+        alteradas = (await db.execute(
+            update(Solicitacao)
+            .where(Solicitacao.id.in_([linha.id for linha in pendentes]), Solicitacao.status == "pendente")
+            .values(status=status_novo)
+            .execution_options(synchronize_session=False)
+        )).rowcount
+        if alteradas != len(pendentes):
+            # Outro gerente processou parte do lote: desfaz e relê
+            await db.rollback()
+            continue
+
+        await _mover_rollups(db, pendentes, status_novo)
+        if status_novo == "aprovada":
+            await _preencher_area_id(db, pendentes, areas)
+            await conceder_acessos(
+                db, [(linha.usuario_id, areas[linha.id], linha.id) for linha in pendentes], processado_por, expira_em
+            )
+        await db.commit()
+
+        for linha in pendentes:
+            resultados[linha.id] = status_novo
+            if status_novo == "aprovada":
+                invalidar_concessao(linha.usuario_id, areas[linha.id])
+        return resultados
+
+    raise ConflitoConcorrencia("As solicitações foram alteradas por outro usuário durante o processamento.")
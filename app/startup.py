@@ -0,0 +1,95 @@
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+
+from fastapi.templating import Jinja2Templates
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import configure_mappers
+
+from app.database import DB_POOL_SIZE, async_engine, replica_engines
+from app.migrations import VERSAO_ATUAL, versao_do_banco
+
+# --- Inicialização enxuta dos workers ---
+# Cada worker do uvicorn só prepara o que é dele: abre INICIALIZACAO_CONEXOES conexões do pool
+# (em paralelo, no primário e em cada réplica), configura os mappers do SQLAlchemy e compila os
+# templates Jinja2, para que as primeiras requisições não paguem por isso. O esquema e os dados de
+# exemplo não são tocados aqui: ficam com python -m app.migrate e python -m app.seed, uma vez por
+# deploy. A versão do esquema é conferida com uma consulta; enquanto houver migração pendente,
+# /health/ready responde 503. Falhas ao conectar não derrubam o worker (a prontidão as reporta).
+INICIALIZACAO_CONEXOES = int(os.getenv("INICIALIZACAO_CONEXOES", str(min(DB_POOL_SIZE, 2))))
+
+_etapas: Dict[str, float] = {}
+_estado = {"templates": 0, "conexoes": 0, "versao_esquema": 0, "erro_conexao": None}
+
+
+async def aquecer_pool(engine: AsyncEngine, conexoes: int) -> int:
+    """Abre `conexoes` conexões ao mesmo tempo e as devolve ao pool, já autenticadas."""
+    abertas = await asyncio.gather(*(engine.connect().start() for _ in range(conexoes)))
+    for conn in abertas:
+        await conn.close()
+    return len(abertas)
+
+
+def precompilar_templates(templates: Jinja2Templates) -> int:
+    """Compila todos os templates HTML, que ficam no cache do ambiente Jinja2."""
+    nomes = templates.env.list_templates(extensions=["html"])
+    for nome in nomes:
+        templates.env.get_template(nome)
+    return len(nomes)
+
+
+def _compilar(templates: Jinja2Templates):
+    configure_mappers()
+    _estado["templates"] = precompilar_templates(templates)
+
+
+async def _conectar():
+    try:
+        totais = await asyncio.gather(*(aquecer_pool(e, INICIALIZACAO_CONEXOES) for e in (async_engine, *replica_engines)))
+        _estado["conexoes"] = sum(totais)
+        _estado["versao_esquema"] = await versao_do_banco(async_engine)
+    except Exception as e:
+        _estado["erro_conexao"] = type(e).__name__
+
+
+async def _medir(etapa: str, tarefa):
+    inicio = time.perf_counter()
+    try:
+        return await tarefa
+    finally:
+        _etapas[etapa] = time.perf_counter() - inicio
+
+
+async def inicializar(templates: Jinja2Templates, inicio_importacao: Optional[float] = None):
+    """Aquece o pool e compila mappers e templates, registrando a duração de cada etapa."""
+    inicio = time.perf_counter()
+    if inicio_importacao is not None:
+        _etapas["importacao"] = inicio - inicio_importacao
+    # A compilação é só CPU e roda numa thread enquanto as conexões esperam a rede
+    await asyncio.gather(
+        _medir("pool", _conectar()),
+        _medir("templates", asyncio.to_thread(_compilar, templates)),
+    )
+    _etapas["inicializacao"] = time.perf_counter() - inicio
+
+
+async def esquema_pendente() -> Optional[str]:
+    """Motivo para /health/ready recusar enquanto o banco não estiver na versão do código; None se estiver."""
+    if _estado["versao_esquema"] < VERSAO_ATUAL:
+        # Reconfere a cada chamada até o deploy rodar as migrações; depois disso não consulta mais
+        _estado["versao_esquema"] = await versao_do_banco(async_engine)
+    if _estado["versao_esquema"] < VERSAO_ATUAL:
+        return f"esquema do banco na versão {_estado['versao_esquema']}, esperada {VERSAO_ATUAL} (rode python -m app.migrate)"
+    return None
+
+
+def get_inicializacao_stats() -> dict:
+    return {
+        "etapas_s": {etapa: round(segundos, 4) for etapa, segundos in _etapas.items()},
+        "conexoes_abertas": _estado["conexoes"],
+        "templates_compilados": _estado["templates"],
+        "versao_esquema": _estado["versao_esquema"],
+        "versao_esperada": VERSAO_ATUAL,
+        "erro_conexao": _estado["erro_conexao"],
+    }
@@ -0,0 +1,105 @@
+"""
+Mede o tempo de inicialização da aplicação: de o processo do uvicorn ser criado até cada worker
+registrar "Application startup complete", até o primeiro 200 em /health/ready e a duração da
+primeira página renderizada (/).
+
+    SESSION_SECRET_DEV=true DATABASE_URL=sqlite:///bench.db ASYNC_DATABASE_URL=sqlite+aiosqlite:///bench.db \\
+        python -m benchmarks.boot --workers 4 --repeticoes 5
+
+Antes das medições o banco é preparado uma vez, como num deploy (python -m app.migrate e
+python -m app.seed); --sem-preparar pula essa etapa. Quando /metrics expõe as etapas da
+inicialização de um worker (wayne_inicializacao_segundos), elas também são mostradas.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from statistics import median
+
+import httpx
+
+MARCA_PRONTO = "Application startup complete"
+ETAPA = re.compile(r'^wayne_inicializacao_segundos\{etapa="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+def preparar_banco():
+    for modulo in ("app.migrate", "app.seed"):
+        subprocess.run([sys.executable, "-m", modulo], check=True, stdout=subprocess.DEVNULL)
+
+
+def _ler_saida(processo: subprocess.Popen, inicio: float, prontos: list):
+    for linha in processo.stderr:
+        if MARCA_PRONTO in linha:
+            prontos.append(time.perf_counter() - inicio)
+
+
+def medir(workers: int, porta: int, limite: float) -> dict:
+    comando = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--workers", str(workers)]
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, env=os.environ.copy())
+    prontos = []
+    leitor = threading.Thread(target=_ler_saida, args=(processo, inicio, prontos), daemon=True)
+    leitor.start()
+    resultado = {"primeiro_200": None, "workers_prontos": None, "primeira_pagina": None, "etapas": {}}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{porta}", timeout=2.0) as client:
+            while time.perf_counter() - inicio < limite:
+                try:
+                    if resultado["primeiro_200"] is None and client.get("/health/ready").status_code == 200:
+                        resultado["primeiro_200"] = time.perf_counter() - inicio
+                except httpx.TransportError:
+                    pass
+                if resultado["primeiro_200"] is not None and len(prontos) >= workers:
+                    resultado["workers_prontos"] = prontos[workers - 1]
+                    break
+                time.sleep(0.01)
+            if resultado["primeiro_200"] is not None:
+                # Primeira página renderizada: paga o que não foi aquecido na inicialização
+                inicio_pagina = time.perf_counter()
+                client.get("/")
+                resultado["primeira_pagina"] = time.perf_counter() - inicio_pagina
+            metricas = client.get("/metrics").text if resultado["primeiro_200"] is not None else ""
+            resultado["etapas"] = {etapa: float(valor) for etapa, valor in ETAPA.findall(metricas)}
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--limite", type=float, default=120.0, help="Segundos máximos de espera por inicialização")
+    parser.add_argument("--sem-preparar", action="store_true", help="Não roda app.migrate e app.seed antes")
+    args = parser.parse_args()
+
+    if not args.sem_preparar:
+        preparar_banco()
+    medicoes = []
+    for repeticao in range(args.repeticoes):
+        resultado = medir(args.workers, args.porta, args.limite)
+        if resultado["workers_prontos"] is None:
+            print(f"Repetição {repeticao + 1}: a aplicação não ficou pronta em {args.limite:.0f}s.")
+            continue
+        medicoes.append(resultado)
+        print(f"Repetição {repeticao + 1}: primeiro 200 em {resultado['primeiro_200'] * 1000:.0f} ms, "
+              f"{args.workers} workers prontos em {resultado['workers_prontos'] * 1000:.0f} ms, "
+              f"primeira página (/) em {resultado['primeira_pagina'] * 1000:.1f} ms")
+    if not medicoes:
+        return
+    print(f"Mediana ({len(medicoes)} repetições, {args.workers} workers): primeiro 200 em "
+          f"{median(m['primeiro_200'] for m in medicoes) * 1000:.0f} ms, todos os workers prontos em "
+          f"{median(m['workers_prontos'] for m in medicoes) * 1000:.0f} ms, primeira página em "
+          f"{median(m['primeira_pagina'] for m in medicoes) * 1000:.1f} ms")
+    etapas = medicoes[-1]["etapas"]
+    if etapas:
+        print("Etapas de um worker: " + ", ".join(f"{etapa} {segundos * 1000:.0f} ms" for etapa, segundos in etapas.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Mede a vazão sustentada da ingestão de alertas (POST /api/alertas) contra a aplicação real:
+vários dispositivos simulados enviam lotes de eventos pelo tempo definido; ao receber 503
+(fila cheia), cada um espera o Retry-After e reenvia o mesmo lote, como um dispositivo real.
+
+    SESSION_SECRET_DEV=true DATABASE_URL=sqlite:///bench.db ASYNC_DATABASE_URL=sqlite+aiosqlite:///bench.db \\
+        python -m benchmarks.ingestion --dispositivos 20 --eventos-por-requisicao 50 --duracao 30
+
+Os títulos se repetem (100 zonas por dispositivo), então boa parte dos eventos não críticos é
+agrupada pela janela de repetições (INGESTAO_DEDUP_JANELAS); com INGESTAO_DEDUP_JANELAS= (vazio)
+todo evento vira uma linha. A vazão que importa é a de eventos gravados por segundo, medida até a fila esvaziar; a de
+eventos aceitos só é maior enquanto a fila ainda tem espaço. Com --url, usa um servidor em
+execução e um token já gerado (--token).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from benchmarks.user_flows import _percentil
+
+NIVEIS = ["baixo", "baixo", "baixo", "medio", "medio", "alto", "critico"]
+
+
+async def dispositivo(numero: int, client: httpx.AsyncClient, token: str, tamanho: int, fim: float, resultado: dict):
+    aleatorio = random.Random(numero)
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < fim:
+        eventos = [
+            {"titulo": f"Movimento detectado na zona {aleatorio.randrange(100)}",
+             "descricao": f"Sensor {numero} registrou atividade fora do horário.", "nivel": aleatorio.choice(NIVEIS)}
+            for _ in range(tamanho)
+        ]
+        inicio = time.perf_counter()
+        response = await client.post("/api/alertas", json=eventos, headers=headers)
+        resultado["latencias"].append(time.perf_counter() - inicio)
+        if response.status_code == 202:
+            resultado["aceitos"] += tamanho
+        elif response.status_code == 503:
+            resultado["recusas"] += 1
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+        else:
+            resultado["erros"] += 1
+
+
+async def _token_local() -> str:
+    from app.database import AsyncSessionLocal
+    from app.ingestion import gerar_token
+    from app.models import Resource
+
+    async with AsyncSessionLocal() as db:
+        recurso = Resource(name="Sensor de benchmark", type="dispositivo", description="benchmarks.ingestion", quantity=1)
+        db.add(recurso)
+        await db.commit()
+        return await gerar_token(db, recurso.id, "benchmark")
+
+
+async def executar(args) -> dict:
+    resultado = {"aceitos": 0, "recusas": 0, "erros": 0, "latencias": []}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60.0)
+        token = args.token
+    else:
+        from app.database import create_db_and_tables
+        from app.main import app
+        create_db_and_tables()  # como no deploy: migrações antes de iniciar a aplicação
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60.0)
+        token = await _token_local()
+
+    inicio = time.perf_counter()
+    async with client:
+        await asyncio.gather(*(
+            dispositivo(i, client, token, args.eventos_por_requisicao, inicio + args.duracao, resultado)
+            for i in range(args.dispositivos)
+        ))
+    envio = time.perf_counter() - inicio
+
+    if not args.url:
+        from app.database import async_engine, replica_engines
+        from app.ingestion import get_ingestao_stats
+        await app.router.shutdown()  # grava o que restou na fila
+        drenagem = time.perf_counter() - inicio
+        resultado["ingestao"] = get_ingestao_stats()
+        resultado["gravados_por_s"] = resultado["ingestao"]["gravados"] / drenagem
+        for engine in (async_engine, *replica_engines):
+            await engine.dispose()
+    resultado["aceitos_por_s"] = resultado["aceitos"] / envio
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor em execução (padrão: aplicação no próprio processo)")
+    parser.add_argument("--token", help="Token de ingestão (obrigatório com --url)")
+    parser.add_argument("--dispositivos", type=int, default=20, help="Dispositivos enviando ao mesmo tempo")
+    parser.add_argument("--eventos-por-requisicao", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=30.0, help="Segundos de envio")
+    args = parser.parse_args()
+    if args.url and not args.token:
+        parser.error("--token é obrigatório com --url")
+
+    resultado = asyncio.run(executar(args))
+    latencias = sorted(resultado["latencias"])
+    print(f"Requisições: {len(latencias)} ({resultado['recusas']} recusadas com 503, {resultado['erros']} erros)")
+    print(f"Latência da requisição: p50 {_percentil(latencias, 0.5):.2f} ms, p95 {_percentil(latencias, 0.95):.2f} ms, "
+          f"p99 {_percentil(latencias, 0.99):.2f} ms")
+    print(f"Eventos aceitos: {resultado['aceitos']} ({resultado['aceitos_por_s']:.0f}/s)")
+    if "ingestao" in resultado:
+        ingestao = resultado["ingestao"]
+        print(f"Eventos gravados: {ingestao['gravados']} ({resultado['gravados_por_s']:.0f}/s sustentados) em "
+              f"{ingestao['lotes']} lotes de {ingestao['eventos_por_lote']} em média; "
+              f"atraso máximo até o banco {ingestao['atraso_max_s'] * 1000:.0f} ms, erros de gravação {ingestao['erros_gravacao']}")
+        print(f"Linhas inseridas: {ingestao['linhas_inseridas']}; repetições agrupadas em linhas existentes: {ingestao['agrupados']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Teste de carga simples para comparar a vazão (req/s) das rotas do sistema
+sob requisições concorrentes.
+
+Uso (com o servidor rodando via `uvicorn app.main:app`):
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concorrencia 50 --duracao 15
+
+Rode uma vez antes e outra depois de uma alteração para comparar os números.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+ROTAS_PADRAO = ["/dashboard", "/alertas", "/comunicados", "/areas", "/recursos", "/solicitacoes"]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str):
+    response = await client.post("/login", data={"email": email, "password": password})
+    if response.status_code != 302:
+        raise SystemExit(f"Falha no login de {email} (status {response.status_code}).")
+
+
+async def worker(client: httpx.AsyncClient, rotas, fim: float, latencias, erros):
+    i = 0
+    while time.perf_counter() < fim:
+        rota = rotas[i % len(rotas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            response = await client.get(rota)
+            if response.status_code >= 400:
+                erros.append(rota)
+        except httpx.HTTPError:
+            erros.append(rota)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def executar(url: str, email: str, password: str, concorrencia: int, duracao: float, rotas):
+    limits = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        await login(client, email, password)
+        latencias, erros = [], []
+        fim = time.perf_counter() + duracao
+        inicio = time.perf_counter()
+        await asyncio.gather(*(worker(client, rotas, fim, latencias, erros) for _ in range(concorrencia)))
+        total = time.perf_counter() - inicio
+
+    print(f"Requisições: {len(latencias)} em {total:.1f}s com concorrência {concorrencia}")
+    print(f"Vazão: {len(latencias) / total:.1f} req/s | Erros: {len(erros)}")
+    if latencias:
+        latencias.sort()
+        print(f"Latência média: {statistics.mean(latencias) * 1000:.1f} ms | "
+              f"p95: {latencias[int(len(latencias) * 0.95) - 1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas do Projeto Wayne.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default="bruce@wayne.com")
+    parser.add_argument("--password", default="batman123")
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=15.0)
+    parser.add_argument("--rotas", nargs="*", default=ROTAS_PADRAO)
+    args = parser.parse_args()
+    asyncio.run(executar(args.url, args.email, args.password, args.concorrencia, args.duracao, args.rotas))
+
+
+if __name__ == "__main__":
+    main()
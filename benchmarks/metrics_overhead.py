@@ -0,0 +1,63 @@
+"""
+Mede o custo por requisição do MetricasMiddleware (e, opcionalmente, do ProfilerSQLMiddleware),
+chamando-o diretamente com uma aplicação ASGI vazia, sem servidor nem rede.
+
+Uso:
+
+    python -m benchmarks.metrics_overhead --requisicoes 200000
+
+O alvo é ficar abaixo de poucos microssegundos por requisição.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.routing import APIRoute
+
+from app.metrics import MetricasMiddleware
+from app.profiler import ProfilerSQLMiddleware
+
+ROTA = APIRoute("/alertas", endpoint=lambda: None, methods=["GET"])
+INICIO = {"type": "http.response.start", "status": 200, "headers": []}
+CORPO = {"type": "http.response.body", "body": b""}
+
+
+async def app_vazia(scope, receive, send):
+    scope["route"] = ROTA
+    await send(INICIO)
+    await send(CORPO)
+
+
+async def receive():
+    return {"type": "http.request"}
+
+
+async def send(message):
+    pass
+
+
+async def medir(app, requisicoes: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/alertas"}
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        await app(scope, receive, send)
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=200000)
+    args = parser.parse_args()
+
+    await medir(MetricasMiddleware(app_vazia), 1000)  # aquecimento
+    base = await medir(app_vazia, args.requisicoes)
+    com_metricas = await medir(MetricasMiddleware(app_vazia), args.requisicoes)
+    com_profiler = await medir(ProfilerSQLMiddleware(MetricasMiddleware(app_vazia)), args.requisicoes)
+
+    print(f"Aplicação vazia:           {base:.2f} µs/req")
+    print(f"+ MetricasMiddleware:      {com_metricas:.2f} µs/req (custo {com_metricas - base:.2f} µs)")
+    print(f"+ ProfilerSQLMiddleware:   {com_profiler:.2f} µs/req (custo {com_profiler - com_metricas:.2f} µs)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Mede o índice de busca (app/search.py) com um volume grande de documentos sintéticos:
+tempo de construção, memória e latência p50/p95/p99 das consultas, sem banco de dados
+(o custo do banco numa busca é só a carga por chave primária dos 20 resultados da página).
+
+Uso:
+
+    python -m benchmarks.search_index --documentos 1000000
+
+Os textos são gerados com semente fixa a partir de um vocabulário de segurança em português,
+com distribuição de Zipf (poucas palavras muito comuns, muitas raras), como em textos reais.
+"""
+import argparse
+import random
+import resource
+import time
+from itertools import accumulate
+
+from app.search import IndiceInvertido, ALERTA, COMUNICADO
+
+RADICAIS = [
+    "invasão", "servidor", "acesso", "porta", "câmera", "sensor", "alarme", "perímetro", "laboratório",
+    "cofre", "credencial", "firewall", "vazamento", "intrusão", "falha", "energia", "backup", "rede",
+    "veículo", "batcaverna", "torre", "doca", "arsenal", "protocolo", "auditoria", "criptografia",
+    "incêndio", "evacuação", "biometria", "drone", "satélite", "radar", "comunicação", "manutenção",
+]
+SUFIXOS = ["", "es", "s", "ado", "ados", "ção", "ções", "mente", "ivo", "iva", "al", "ário"]
+VOCABULARIO = [radical + sufixo for radical in RADICAIS for sufixo in SUFIXOS] + [f"zona{i}" for i in range(5000)]
+PESOS_ACUMULADOS = list(accumulate(1 / (posicao + 1) for posicao in range(len(VOCABULARIO))))
+
+CONSULTAS = [
+    ("termo raro", "zona4321"),
+    ("termo comum", "servidor"),
+    ("dois termos", "invasão servidor"),
+    ("prefixo", "biom"),
+    ("prefixo curto", "cr"),
+    ("sem acento", "intrusao perimetro"),
+    ("três termos", "falha energia backup"),
+    ("sem resultado", "inexistente"),
+]
+
+
+def gerar_textos(aleatorio: random.Random, palavras: int) -> str:
+    return " ".join(aleatorio.choices(VOCABULARIO, cum_weights=PESOS_ACUMULADOS, k=palavras))
+
+
+def _memoria_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documentos", type=int, default=1000000)
+    parser.add_argument("--repeticoes", type=int, default=50, help="Execuções de cada consulta")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semente)
+    memoria_antes = _memoria_mb()
+    indice = IndiceInvertido()
+    # Um em cada 10 documentos é um comunicado; os ids de cada tipo são crescentes, como no banco
+    documentos = [
+        (COMUNICADO if i % 10 == 0 else ALERTA, i, gerar_textos(aleatorio, 4), gerar_textos(aleatorio, 12))
+        for i in range(1, args.documentos + 1)
+    ]
+    print(f"{args.documentos} documentos gerados.")
+    inicio = time.perf_counter()
+    for tipo, documento_id, titulo, descricao in documentos:
+        indice.adicionar(tipo, documento_id, titulo, descricao, ordenar=False)
+    indice.finalizar()
+    construcao = time.perf_counter() - inicio
+    editados = documentos[::997]
+    del documentos
+    stats = indice.stats()
+    print(f"Índice construído em {construcao:.1f}s: {stats['termos']} termos, {stats['entradas']} entradas, "
+          f"{stats['bitmaps']} bitmaps, ~{stats['memoria_mb']} MB (pico do processo com os textos gerados: "
+          f"{_memoria_mb() - memoria_antes:.0f} MB)")
+
+    # Atualizações incrementais, como as feitas pela rota de edição (retira o texto antigo e indexa o novo)
+    inicio = time.perf_counter()
+    for tipo, documento_id, titulo, descricao in editados:
+        indice.remover(tipo, documento_id, titulo, descricao)
+        indice.adicionar(tipo, documento_id, gerar_textos(aleatorio, 4), gerar_textos(aleatorio, 12))
+    print(f"{len(editados)} documentos editados em {(time.perf_counter() - inicio) / len(editados) * 1000:.2f} ms cada")
+
+    print(f"{'Consulta':<16} {'texto':<24} {'total':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for nome, consulta in CONSULTAS:
+        latencias = []
+        for repeticao in range(args.repeticoes):
+            inicio = time.perf_counter()
+            total, _ = indice.buscar(consulta, inicio=(repeticao % 5) * 20)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        latencias.sort()
+
+        def percentil(q):
+            return latencias[min(len(latencias) - 1, int(q * len(latencias)))]
+
+        print(f"{nome:<16} {consulta:<24} {total:>8} {percentil(0.5):>8.2f} {percentil(0.95):>8.2f} {percentil(0.99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Popula o banco configurado (DATABASE_URL) com volumes realistas para os benchmarks:
+por padrão 100 mil alertas, 10 mil usuários e 50 mil solicitações, além de algumas áreas.
+Os dados são gerados com semente fixa, então duas execuções produzem o mesmo banco.
+
+Uso (ex: com um SQLite local no lugar do MySQL):
+
+    DATABASE_URL=sqlite:///bench.db ASYNC_DATABASE_URL=sqlite+aiosqlite:///bench.db \\
+        python -m benchmarks.seed --recriar
+
+Todos os usuários gerados (usuario{N}@wayne.bench) têm a senha SENHA_BENCH; o hash é
+calculado uma única vez, para não gastar horas de bcrypt. Os dados de exemplo de app.seed
+(bruce@wayne.com etc.) também são inseridos, já que a aplicação não os cria ao iniciar.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.auth import get_password_hash
+from app.database import Base, SessionLocal, engine, create_db_and_tables
+from app.models import User, Alert, AreaRestrita, AreaAcessoRole, Solicitacao
+from app import rebuild_rollups
+from app.seed import semear as semear_exemplos
+
+SENHA_BENCH = "bench123"
+LOTE = 5000
+NIVEIS = ["baixo", "medio", "alto", "critico"]
+STATUS = ["pendente", "aprovada", "rejeitada"]
+ROLES_AREAS = [["administrador"], ["administrador", "gerente"], ["administrador", "gerente", "usuario"]]
+
+
+def _inserir_em_lotes(db, modelo, registros):
+    for i in range(0, len(registros), LOTE):
+        db.execute(insert(modelo), registros[i:i + LOTE])
+    db.commit()
+
+
+def email_bench(indice: int) -> str:
+    return f"usuario{indice}@wayne.bench"
+
+
+def role_bench(indice: int) -> str:
+    """5% administradores, 15% gerentes e o restante usuários comuns."""
+    if indice % 20 == 0:
+        return "administrador"
+    if indice % 20 <= 3:
+        return "gerente"
+    return "usuario"
+
+
+def semear(alertas: int, usuarios: int, solicitacoes: int, areas: int, dias: int, semente: int = 42):
+    aleatorio = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+
+    def momento_aleatorio():
+        return agora - timedelta(seconds=aleatorio.randrange(dias * 24 * 3600))
+
+    db = SessionLocal()
+    inicio = time.perf_counter()
+
+    senha = get_password_hash(SENHA_BENCH)
+    _inserir_em_lotes(db, User, [
+        {"email": email_bench(i), "hashed_password": senha, "full_name": f"Usuário Bench {i}",
+         "is_active": True, "role": role_bench(i)}
+        for i in range(usuarios)
+    ])
+    ids_usuarios = [id_ for (id_,) in db.query(User.id).filter(User.email.like("%@wayne.bench")).all()]
+
+    nomes_areas = [f"Área Bench {i}" for i in range(areas)]
+    _inserir_em_lotes(db, AreaRestrita, [
+        {"nome": nome, "descricao": "Área gerada para benchmark.",
+         "acesso_liberado_para": ",".join(ROLES_AREAS[i % len(ROLES_AREAS)]), "is_ativa": True}
+        for i, nome in enumerate(nomes_areas)
+    ])
+    areas_criadas = db.query(AreaRestrita.id, AreaRestrita.nome).filter(AreaRestrita.nome.in_(nomes_areas)).all()
+    _inserir_em_lotes(db, AreaAcessoRole, [
+        {"area_id": area_id, "role": role}
+        for area_id, nome in areas_criadas
+        for role in ROLES_AREAS[nomes_areas.index(nome) % len(ROLES_AREAS)]
+    ])
+
+    _inserir_em_lotes(db, Alert, [
+        {"titulo": f"Alerta {i}", "descricao": f"Ocorrência simulada número {i} detectada pelos sensores.",
+         "nivel": aleatorio.choice(NIVEIS), "data_criacao": momento_aleatorio(), "criado_por": "Benchmark"}
+        for i in range(alertas)
+    ])
+
+    registros = []
+    for i in range(solicitacoes):
+        area_id, nome = aleatorio.choice(areas_criadas)
+        criada_em = momento_aleatorio()
+        status = aleatorio.choices(STATUS, weights=[2, 5, 3])[0]
+        registros.append({
+            "usuario_id": aleatorio.choice(ids_usuarios), "area_id": area_id, "area_solicitada": nome,
+            "justificativa": "Solicitação gerada para benchmark.", "status": status,
+            "data_criacao": criada_em, "data_atualizacao": None if status == "pendente" else criada_em + timedelta(hours=1)
+        })
+    _inserir_em_lotes(db, Solicitacao, registros)
+    db.close()
+
+    rebuild_rollups.main()
+    print(f"Banco populado em {time.perf_counter() - inicio:.1f}s: {alertas} alertas, {usuarios} usuários, "
+          f"{solicitacoes} solicitações, {areas} áreas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alertas", type=int, default=100000)
+    parser.add_argument("--usuarios", type=int, default=10000)
+    parser.add_argument("--solicitacoes", type=int, default=50000)
+    parser.add_argument("--areas", type=int, default=30)
+    parser.add_argument("--dias", type=int, default=90, help="Período coberto pelas datas geradas")
+    parser.add_argument("--recriar", action="store_true", help="Apaga e recria todas as tabelas antes")
+    args = parser.parse_args()
+
+    if args.recriar:
+        Base.metadata.drop_all(bind=engine)
+    create_db_and_tables()
+    db = SessionLocal()
+    semear_exemplos(db)
+    db.close()
+    semear(args.alertas, args.usuarios, args.solicitacoes, args.areas, args.dias)
+
+
+if __name__ == "__main__":
+    main()
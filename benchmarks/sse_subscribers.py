@@ -0,0 +1,79 @@
+"""
+Benchmark do broker de alertas ao vivo (app/events.py) num único processo/worker.
+
+Abre N assinantes ociosos consumindo o mesmo gerador SSE usado por /alertas/stream,
+mede a memória por assinante e o tempo de distribuição (fan-out) de cada evento.
+
+    python -m benchmarks.sse_subscribers --assinantes 5000 --eventos 200
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.events import AlertBroker, stream_alertas
+import app.events as events
+
+
+async def nunca_desconecta():
+    return False
+
+
+async def consumir(gerador, recebidos, total_esperado, pronto: asyncio.Event):
+    async for mensagem in gerador:
+        if mensagem.startswith("event:"):
+            recebidos[0] += 1
+            if recebidos[0] == total_esperado:
+                pronto.set()
+
+
+async def executar(assinantes: int, eventos: int):
+    broker = AlertBroker()
+    events.alert_broker = broker  # stream_alertas cancela a assinatura no broker do módulo
+
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    recebidos = [0]
+    pronto = asyncio.Event()
+    tarefas = [
+        asyncio.create_task(consumir(stream_alertas(broker.assinar(), nunca_desconecta), recebidos, assinantes * eventos, pronto))
+        for _ in range(assinantes)
+    ]
+    await asyncio.sleep(0)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+
+    print(f"Assinantes ociosos: {len(broker._assinantes)}")
+    print(f"Memória: {memoria / 1024 / 1024:.1f} MiB ({memoria / assinantes / 1024:.1f} KiB por assinante)")
+
+    dados = {"id": 1, "titulo": "Sensor", "descricao": "Teste", "nivel": "alto", "criado_por": "bench", "data_criacao": None}
+    duracoes = []
+    inicio_total = time.perf_counter()
+    for _ in range(eventos):
+        inicio = time.perf_counter()
+        broker.publicar("criado", dados)
+        duracoes.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0)
+    await asyncio.wait_for(pronto.wait(), timeout=120)
+    total = time.perf_counter() - inicio_total
+
+    duracoes.sort()
+    print(f"Publicação (fan-out p/ {assinantes}): média {sum(duracoes) / len(duracoes) * 1000:.2f} ms | "
+          f"p99 {duracoes[int(len(duracoes) * 0.99) - 1] * 1000:.2f} ms")
+    print(f"Entregas: {recebidos[0]} em {total:.2f}s ({recebidos[0] / total:,.0f} mensagens/s) | Descartados: {broker.descartados}")
+
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do broker de alertas ao vivo.")
+    parser.add_argument("--assinantes", type=int, default=5000)
+    parser.add_argument("--eventos", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(executar(args.assinantes, args.eventos))
+
+
+if __name__ == "__main__":
+    main()
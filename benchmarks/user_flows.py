@@ -0,0 +1,214 @@
+"""
+Benchmark dos fluxos principais do sistema contra a aplicação FastAPI real.
+
+Cada usuário virtual faz login em /login e repete o seu fluxo até o fim da duração:
+  * usuário comum: /dashboard, /alertas (e a página seguinte), /solicitacoes e envio de uma solicitação;
+  * gerente: /dashboard, /alertas, /relatorios, /relatorios/dados, /solicitacoes e aprovação de uma pendente.
+
+Por padrão a aplicação roda no próprio processo (httpx.ASGITransport, sem rede); com --url,
+o benchmark usa um servidor já em execução. Popule o banco antes com benchmarks.seed.
+
+    SESSION_SECRET_DEV=true DATABASE_URL=sqlite:///bench.db ASYNC_DATABASE_URL=sqlite+aiosqlite:///bench.db \\
+        python -m benchmarks.user_flows --concorrencia 20 --duracao 30
+
+Ao final imprime vazão e latências p50/p95/p99 por rota e grava tudo em JSON
+(benchmarks/resultados/<data>-<commit>.json). Use --comparar com um JSON anterior para
+ver a variação entre commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+from benchmarks.seed import SENHA_BENCH, email_bench, role_bench
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+_NUMEROS = re.compile(r"/\d+")
+
+
+class Coletor:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+
+    async def requisitar(self, client: httpx.AsyncClient, metodo: str, url: str, esperado=(200, 302), **kwargs):
+        rota = f"{metodo} {_NUMEROS.sub('/{id}', url.split('?')[0])}"
+        inicio = time.perf_counter()
+        try:
+            response = await client.request(metodo, url, **kwargs)
+        except httpx.HTTPError:
+            self.erros[rota] += 1
+            return None
+        self.latencias[rota].append(time.perf_counter() - inicio)
+        if response.status_code not in esperado:
+            self.erros[rota] += 1
+        return response
+
+
+async def login(coletor: Coletor, client: httpx.AsyncClient, indice: int):
+    await coletor.requisitar(client, "POST", "/login", data={"email": email_bench(indice), "password": SENHA_BENCH})
+
+
+async def fluxo_usuario(coletor: Coletor, client: httpx.AsyncClient, aleatorio: random.Random):
+    await coletor.requisitar(client, "GET", "/dashboard")
+    response = await coletor.requisitar(client, "GET", "/alertas")
+    if response is not None:
+        proxima = re.search(r'href="(/alertas\?[^"]*cursor=[^"]+)"', response.text)
+        if proxima:
+            await coletor.requisitar(client, "GET", proxima.group(1).replace("&amp;", "&"))
+    response = await coletor.requisitar(client, "GET", "/solicitacoes")
+    if response is not None:
+        areas = re.findall(r'<option value="(\d+)">', response.text)
+        if areas:
+            await coletor.requisitar(client, "POST", "/solicitacoes/nova", data={
+                "area_id": aleatorio.choice(areas), "justificativa": "Benchmark de fluxo de usuário."
+            })
+
+
+async def fluxo_gerente(coletor: Coletor, client: httpx.AsyncClient, aleatorio: random.Random):
+    await coletor.requisitar(client, "GET", "/dashboard")
+    await coletor.requisitar(client, "GET", "/alertas")
+    await coletor.requisitar(client, "GET", "/relatorios")
+    await coletor.requisitar(client, "GET", "/relatorios/dados")
+    response = await coletor.requisitar(client, "GET", "/solicitacoes")
+    if response is not None:
+        pendentes = re.findall(r"/solicitacoes/(\d+)/aprovar", response.text)
+        if pendentes:
+            # 400 = outro gerente aprovou a mesma solicitação antes (concorrência esperada)
+            await coletor.requisitar(client, "POST", f"/solicitacoes/{aleatorio.choice(pendentes)}/aprovar", esperado=(200, 302, 400))
+
+
+async def usuario_virtual(numero: int, coletor: Coletor, criar_client, fim: float, proporcao_gerentes: float, usuarios: int):
+    aleatorio = random.Random(numero)
+    gerente = aleatorio.random() < proporcao_gerentes
+    # Escolhe um usuário semeado com a role desejada (ver role_bench)
+    while True:
+        indice = aleatorio.randrange(usuarios)
+        if role_bench(indice) == ("gerente" if gerente else "usuario"):
+            break
+    async with criar_client() as client:
+        await login(coletor, client, indice)
+        fluxo = fluxo_gerente if gerente else fluxo_usuario
+        while time.perf_counter() < fim:
+            await fluxo(coletor, client, aleatorio)
+
+
+def _percentil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000
+
+
+def resumir(coletor: Coletor, duracao: float) -> dict:
+    rotas = {}
+    for rota, latencias in sorted(coletor.latencias.items()):
+        ordenadas = sorted(latencias)
+        rotas[rota] = {
+            "requisicoes": len(ordenadas),
+            "erros": coletor.erros.get(rota, 0),
+            "vazao_rps": round(len(ordenadas) / duracao, 2),
+            "p50_ms": round(_percentil(ordenadas, 0.50), 2),
+            "p95_ms": round(_percentil(ordenadas, 0.95), 2),
+            "p99_ms": round(_percentil(ordenadas, 0.99), 2),
+        }
+    total = sum(r["requisicoes"] for r in rotas.values())
+    return {
+        "total": {"requisicoes": total, "erros": sum(coletor.erros.values()), "vazao_rps": round(total / duracao, 2)},
+        "rotas": rotas
+    }
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def imprimir(resultado: dict, anterior: dict = None):
+    print(f"{'Rota':<40} {'req':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for rota, r in resultado["rotas"].items():
+        linha = f"{rota:<40} {r['requisicoes']:>7} {r['erros']:>5} {r['vazao_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}"
+        antes = (anterior or {}).get("rotas", {}).get(rota)
+        if antes and antes["p95_ms"]:
+            linha += f"  (p95 {(r['p95_ms'] / antes['p95_ms'] - 1) * 100:+.0f}%)"
+        print(linha)
+    total = resultado["total"]
+    print(f"Total: {total['requisicoes']} requisições, {total['erros']} erros, {total['vazao_rps']} req/s")
+
+
+async def executar(args) -> dict:
+    if args.url:
+        def criar_client():
+            return httpx.AsyncClient(base_url=args.url, timeout=60.0)
+    else:
+        from app.main import app
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+
+        def criar_client():
+            return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0)
+
+    coletor = Coletor()
+    inicio = time.perf_counter()
+    fim = inicio + args.duracao
+    await asyncio.gather(*(
+        usuario_virtual(i, coletor, criar_client, fim, args.gerentes, args.usuarios)
+        for i in range(args.concorrencia)
+    ))
+    duracao = time.perf_counter() - inicio
+
+    if not args.url:
+        from app.database import async_engine, replica_engines
+        await app.router.shutdown()
+        for engine in (async_engine, *replica_engines):
+            await engine.dispose()  # fecha as conexões (e threads do aiosqlite) antes de sair
+
+    resultado = resumir(coletor, duracao)
+    resultado.update({
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "concorrencia": args.concorrencia, "duracao_s": round(duracao, 2), "gerentes": args.gerentes,
+            "alvo": args.url or "em processo", "banco": os.getenv("DATABASE_URL", "padrão (MySQL)")
+        }
+    })
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor em execução (padrão: aplicação no próprio processo)")
+    parser.add_argument("--concorrencia", type=int, default=20, help="Usuários virtuais simultâneos")
+    parser.add_argument("--duracao", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--gerentes", type=float, default=0.2, help="Fração de usuários virtuais gerentes")
+    parser.add_argument("--usuarios", type=int, default=10000, help="Usuários semeados por benchmarks.seed")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado (padrão: benchmarks/resultados/<data>-<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar o p95")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(executar(args))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+    imprimir(resultado, anterior)
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['commit']}.json")
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultado gravado em {saida}")
+
+
+if __name__ == "__main__":
+    main()
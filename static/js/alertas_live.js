@@ -0,0 +1,126 @@
+// projetp-wayne/static/js/alertas_live.js
+// Recebe alertas criados, editados e excluídos via Server-Sent Events (/alertas/stream)
+// e atualiza a lista sem recarregar a página.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const lista = document.getElementById('lista-alertas');
+    if (!lista || !window.EventSource) {
+        return;
+    }
+
+    const podeGerenciar = ['administrador', 'gerente'].includes(lista.dataset.role);
+    const aoVivo = lista.dataset.aoVivo === 'sim';
+
+    function capitalizar(texto) {
+        return texto ? texto.charAt(0).toUpperCase() + texto.slice(1).toLowerCase() : '';
+    }
+
+    function formatarData(iso) {
+        if (!iso) {
+            return 'Data não informada';
+        }
+        const data = new Date(iso);
+        const pad = n => String(n).padStart(2, '0');
+        return `${pad(data.getDate())}/${pad(data.getMonth() + 1)}/${data.getFullYear()} ${pad(data.getHours())}:${pad(data.getMinutes())}`;
+    }
+
+    function preencherOcorrencias(cartao, ocorrencias, ultimaOcorrencia) {
+        let paragrafo = cartao.querySelector('.alerta-ocorrencias');
+        if (!ocorrencias || ocorrencias <= 1) {
+            if (paragrafo) {
+                paragrafo.remove();
+            }
+            return;
+        }
+        if (!paragrafo) {
+            paragrafo = document.createElement('p');
+            paragrafo.className = 'alerta-ocorrencias';
+            cartao.querySelector('.alerta-descricao').after(paragrafo);
+        }
+        paragrafo.innerHTML = '';
+        const total = document.createElement('strong');
+        total.textContent = `Repetido ${ocorrencias} vezes`;
+        paragrafo.appendChild(total);
+        if (ultimaOcorrencia) {
+            paragrafo.appendChild(document.createTextNode(`, a última em ${formatarData(ultimaOcorrencia)}`));
+        }
+    }
+
+    function preencherCartao(cartao, alerta) {
+        cartao.querySelector('h3').textContent = `${alerta.titulo} - Nível: ${capitalizar(alerta.nivel)}`;
+        cartao.querySelector('.alerta-descricao').textContent = alerta.descricao;
+        preencherOcorrencias(cartao, alerta.ocorrencias, alerta.ultima_ocorrencia);
+    }
+
+    function criarCartao(alerta) {
+        const cartao = document.createElement('div');
+        cartao.className = 'card-item';
+        cartao.dataset.alertaId = alerta.id;
+        cartao.appendChild(document.createElement('h3'));
+
+        const autoria = document.createElement('p');
+        const em = document.createElement('em');
+        em.textContent = `Criado por ${alerta.criado_por} em ${formatarData(alerta.data_criacao)}`;
+        autoria.appendChild(em);
+        cartao.appendChild(autoria);
+
+        const descricao = document.createElement('p');
+        descricao.className = 'alerta-descricao';
+        cartao.appendChild(descricao);
+
+        if (podeGerenciar) {
+            const acoes = document.createElement('div');
+            acoes.className = 'table-actions';
+            acoes.innerHTML = `
+                <a href="/alertas/${alerta.id}/editar" class="btn btn-warning">Editar</a>
+                <form method="post" action="/alertas/${alerta.id}/excluir" style="display:inline;" onsubmit="return confirm('Tem certeza que deseja excluir este alerta?');">
+                    <button type="submit" class="btn btn-danger">Excluir</button>
+                </form>`;
+            cartao.appendChild(acoes);
+        }
+        preencherCartao(cartao, alerta);
+        return cartao;
+    }
+
+    function cartaoDoAlerta(id) {
+        return lista.querySelector(`[data-alerta-id="${id}"]`);
+    }
+
+    const fonte = new EventSource('/alertas/stream');
+
+    fonte.addEventListener('criado', function(evento) {
+        if (!aoVivo) {
+            return;
+        }
+        const alerta = JSON.parse(evento.data);
+        const vazio = document.getElementById('sem-alertas');
+        if (vazio) {
+            vazio.remove();
+        }
+        lista.prepend(criarCartao(alerta));
+    });
+
+    fonte.addEventListener('editado', function(evento) {
+        const alerta = JSON.parse(evento.data);
+        const cartao = cartaoDoAlerta(alerta.id);
+        if (cartao) {
+            preencherCartao(cartao, alerta);
+        }
+    });
+
+    // Repetições agrupadas pela ingestão de dispositivos: só o contador e a data mudam
+    fonte.addEventListener('repetido', function(evento) {
+        const repeticao = JSON.parse(evento.data);
+        const cartao = cartaoDoAlerta(repeticao.id);
+        if (cartao) {
+            preencherOcorrencias(cartao, repeticao.ocorrencias, repeticao.ultima_ocorrencia);
+        }
+    });
+
+    fonte.addEventListener('excluido', function(evento) {
+        const cartao = cartaoDoAlerta(JSON.parse(evento.data).id);
+        if (cartao) {
+            cartao.remove();
+        }
+    });
+});
@@ -75,4 +75,96 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
     });
-});
\ No newline at end of file
+
+    // Atualiza os números periodicamente a partir do snapshot em /relatorios/dados,
+    // sem recarregar a página inteira.
+    const campos = ['total_alertas', 'alertas_criticos', 'total_recursos', 'total_usuarios', 'total_areas'];
+    const intervaloSegundos = Math.max(parseInt(canvas.getAttribute('data-intervalo-atualizacao'), 10) || 30, 5);
+
+    async function atualizarDados() {
+        if (document.hidden) {
+            return;
+        }
+        try {
+            const resposta = await fetch('/relatorios/dados', { credentials: 'same-origin' });
+            if (!resposta.ok) {
+                return;
+            }
+            const dados = await resposta.json();
+            dataChart.data.datasets[0].data = campos.map(campo => dados[campo]);
+            dataChart.update();
+            campos.forEach(campo => {
+                const elemento = document.getElementById(campo);
+                if (elemento) {
+                    elemento.textContent = dados[campo];
+                }
+            });
+            // Fora do gráfico: alertas já movidos para os arquivos de retenção
+            const arquivados = document.getElementById('alertas_arquivados');
+            if (arquivados && dados.alertas_arquivados !== undefined) {
+                arquivados.textContent = dados.alertas_arquivados;
+            }
+        } catch (erro) {
+            console.warn("Não foi possível atualizar os dados dos relatórios.", erro);
+        }
+    }
+
+    setInterval(atualizarDados, intervaloSegundos * 1000);
+});
+
+// --- Gráfico de tendências (séries temporais pré-agregadas em /relatorios/series) ---
+document.addEventListener('DOMContentLoaded', function() {
+    const canvas = document.getElementById('trendChart');
+    const form = document.getElementById('tendenciaForm');
+    if (!canvas || !form) {
+        return;
+    }
+
+    const cores = ['rgba(52, 152, 219, 1)', 'rgba(231, 76, 60, 1)', 'rgba(46, 204, 113, 1)',
+                   'rgba(155, 89, 182, 1)', 'rgba(241, 196, 15, 1)', 'rgba(230, 126, 34, 1)'];
+
+    const trendChart = new Chart(canvas.getContext('2d'), {
+        type: 'line',
+        data: { labels: [], datasets: [] },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            scales: { y: { beginAtZero: true, precision: 0 } },
+            plugins: { title: { display: true, text: 'Tendências' } }
+        }
+    });
+
+    async function carregarSerie() {
+        const params = new URLSearchParams();
+        new FormData(form).forEach((valor, chave) => {
+            if (valor) {
+                params.append(chave, valor);
+            }
+        });
+        try {
+            const resposta = await fetch('/relatorios/series?' + params.toString(), { credentials: 'same-origin' });
+            if (!resposta.ok) {
+                const erro = await resposta.json().catch(() => ({}));
+                alert(erro.detail || 'Não foi possível carregar a série.');
+                return;
+            }
+            const dados = await resposta.json();
+            trendChart.data.labels = dados.intervalos.map(intervalo => intervalo.replace('T', ' ').slice(0, dados.granularidade === 'hora' ? 16 : 10));
+            trendChart.data.datasets = Object.entries(dados.valores).map(([chave, valores], i) => ({
+                label: chave,
+                data: valores,
+                borderColor: cores[i % cores.length],
+                fill: false
+            }));
+            trendChart.update();
+        } catch (erro) {
+            console.warn("Não foi possível carregar a série temporal.", erro);
+        }
+    }
+
+    form.addEventListener('submit', function(event) {
+        event.preventDefault();
+        carregarSerie();
+    });
+    carregarSerie();
+});
@@ -0,0 +1,57 @@
+// projetp-wayne/static/js/solicitacoes_lote.js
+// Aprova ou rejeita de uma vez as solicitações marcadas (POST /solicitacoes/lote)
+// e mostra o resultado de cada ID antes de recarregar a fila.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('lote-form');
+    if (!form) {
+        return;
+    }
+
+    const marcarTodas = document.getElementById('marcar-todas');
+    const caixas = () => document.querySelectorAll('input.lote-checkbox');
+    const resumo = document.getElementById('lote-resumo');
+
+    marcarTodas.addEventListener('change', function() {
+        caixas().forEach(caixa => { caixa.checked = marcarTodas.checked; });
+    });
+
+    form.querySelectorAll('button[data-acao]').forEach(botao => {
+        botao.addEventListener('click', async function() {
+            const acao = botao.dataset.acao;
+            const todas = botao.dataset.todas === 'sim';
+            const dados = new FormData();
+            dados.append('acao', acao);
+            if (todas) {
+                dados.append('todas_pendentes', 'true');
+            } else {
+                caixas().forEach(caixa => { if (caixa.checked) dados.append('ids', caixa.value); });
+                if (!dados.has('ids')) {
+                    resumo.textContent = 'Selecione ao menos uma solicitação.';
+                    return;
+                }
+            }
+            const validade = form.querySelector('input[name="validade_dias"]').value;
+            if (acao === 'aprovar' && validade) {
+                dados.append('validade_dias', validade);
+            }
+            const alvo = todas ? 'TODAS as solicitações pendentes' : 'as solicitações selecionadas';
+            if (!confirm(`Tem certeza que deseja ${acao.toUpperCase()} ${alvo}?`)) {
+                return;
+            }
+
+            const resposta = await fetch('/solicitacoes/lote', { method: 'POST', body: dados });
+            const corpo = await resposta.json();
+            if (!resposta.ok) {
+                resumo.textContent = corpo.detail || 'Erro ao processar o lote.';
+                return;
+            }
+            const ignoradas = Object.entries(corpo.resultados)
+                .filter(([, resultado]) => !['aprovada', 'rejeitada'].includes(resultado))
+                .map(([id, resultado]) => `#${id}: ${resultado}`);
+            resumo.textContent = `${corpo.processadas} solicitação(ões) processada(s).` +
+                (ignoradas.length ? ` Não processadas: ${ignoradas.join(', ')}.` : '');
+            setTimeout(() => window.location.reload(), ignoradas.length ? 3000 : 800);
+        });
+    });
+});